@@ -0,0 +1,160 @@
+# apresentacao.py
+from markupsafe import Markup, escape
+from resultados import Criatura, Encontro, DiaViagem, ConteudoHex, Hexagono
+
+# ========== APRESENTAÇÃO DOS RESULTADOS (TXT, JSON E HTML) ==========
+# Converte os registros de resultados.py para cada formato de saída. Os geradores não
+# formatam nada; só as páginas, os relatórios e as APIs chamam estas funções.
+
+NOMES_TIPOS_ENCONTRO = {
+    'false_alarm': 'Alarme falso',
+    'creatures': 'Criaturas',
+    'anomaly': 'Anomalia',
+    'creatures_anomaly': 'Criaturas + Anomalia',
+    'temporary_obstacle': 'Obstáculo temporário',
+    'obstacle_creatures': 'Obstáculo + Criaturas',
+    'event': 'Evento especial',
+    'double_roll': 'Evento duplo'
+}
+
+ROTULOS_PARTES_HEX = {'obstaculo': 'Obstáculo', 'ruina': 'Ruína'}
+
+
+# ----- Texto (relatórios TXT e descrições) -----
+
+def texto_criatura(criatura: Criatura) -> str:
+    """Ex.: "Morto-vivo - Zumbi (Faminto)" ou "Humanoide - Bandido (Ferido, Humano)"."""
+    if criatura.categoria is None:
+        return criatura.nome
+    extras = criatura.condicao if criatura.raca is None else f"{criatura.condicao}, {criatura.raca}"
+    return f"{criatura.categoria} - {criatura.nome} ({extras})"
+
+
+def corpo_encontro(encontro: Encontro) -> str:
+    """Descrição do encontro sem o nome do tipo (é o que aparece dentro de um 'Evento duplo')."""
+    if encontro.mensagem is not None:
+        return encontro.mensagem
+    textos = []
+    for elemento in encontro.elementos:
+        if isinstance(elemento, Encontro):
+            textos.append(corpo_encontro(elemento))
+        elif isinstance(elemento, Criatura):
+            textos.append(texto_criatura(elemento))
+        else:
+            textos.append(elemento)
+    return (" e também " if encontro.tipo == 'double_roll' else " e ").join(textos)
+
+
+def descricao_encontro(encontro: Encontro) -> str:
+    """Ex.: "Criaturas + Anomalia: Animal - Lobo (Faminto) e Névoa densa"."""
+    if encontro is None:
+        return None
+    if encontro.mensagem is not None:
+        return encontro.mensagem
+    return f"{NOMES_TIPOS_ENCONTRO[encontro.tipo]}: {corpo_encontro(encontro)}"
+
+
+def linha_txt(dia: DiaViagem, descricao: str = None) -> str:
+    """Linha do dia no relatório TXT ('descricao' reaproveita a descrição do encontro já montada)."""
+    if dia.encontro:
+        encontro = f"{descricao or descricao_encontro(dia.encontro)} ({dia.horario})"
+    else:
+        encontro = "Sem encontros"
+    return f"Dia {dia.dia}: {encontro}"
+
+
+# ----- JSON -----
+
+def dia_json(dia: DiaViagem) -> dict:
+    """Dia da viagem no formato do /api/travel/stream."""
+    encontro = dia.encontro
+    criatura = encontro.criatura if encontro else None
+    return {
+        'day': dia.dia,
+        'encounter': descricao_encontro(encontro),
+        'encounter_type': encontro.tipo if encontro else None,
+        'time_of_day': dia.horario,
+        'encounter_data': {'tipo': criatura.tipo, 'raridade': criatura.raridade} if criatura else None
+    }
+
+
+def conteudo_hex_json(conteudo: ConteudoHex) -> dict:
+    """Ponto de interesse com os detalhes como {rótulo: valor}; campos vazios são omitidos."""
+    dados = {'tipo': conteudo.tipo, 'titulo': conteudo.titulo}
+    if conteudo.categoria is not None:
+        dados['categoria'] = conteudo.categoria
+    if conteudo.texto is not None:
+        dados['texto'] = conteudo.texto
+    if conteudo.detalhes:
+        dados['detalhes'] = dict(conteudo.detalhes)
+    if conteudo.partes:
+        dados['partes'] = [conteudo_hex_json(parte) for parte in conteudo.partes]
+    return dados
+
+
+def conteudo_hex_de_json(dados: dict) -> ConteudoHex:
+    return ConteudoHex(
+        tipo=dados['tipo'],
+        titulo=dados['titulo'],
+        detalhes=tuple(dados.get('detalhes', {}).items()),
+        texto=dados.get('texto'),
+        categoria=dados.get('categoria'),
+        partes=tuple(conteudo_hex_de_json(parte) for parte in dados.get('partes', ()))
+    )
+
+
+def hexagono_json(hexagono: Hexagono, incluir_terreno: bool = True) -> dict:
+    """Hexágono para as APIs e para o cache em disco ('incluir_terreno' = False nos mapas de um só terreno)."""
+    if hexagono.erro is not None:
+        dados = {'error': hexagono.erro}
+    else:
+        dados = {
+            'terreno': hexagono.terreno,
+            'paisagem': hexagono.paisagem,
+            'sons': hexagono.sons,
+            'odores': hexagono.odores,
+            'conteudo': conteudo_hex_json(hexagono.conteudo)
+        }
+        if not incluir_terreno:
+            del dados['terreno']
+    if hexagono.seed is not None:
+        dados['seed'] = hexagono.seed
+    return dados
+
+
+def hexagono_de_json(dados: dict) -> Hexagono:
+    """Inverso de 'hexagono_json' (usado ao ler o cache em disco)."""
+    if 'error' in dados:
+        return Hexagono(terreno=dados.get('terreno'), seed=dados.get('seed'), erro=dados['error'])
+    return Hexagono(
+        terreno=dados['terreno'],
+        paisagem=dados['paisagem'],
+        sons=dados['sons'],
+        odores=dados['odores'],
+        conteudo=conteudo_hex_de_json(dados['conteudo']),
+        seed=dados.get('seed')
+    )
+
+
+# ----- HTML -----
+
+def detalhes_html(conteudo: ConteudoHex) -> Markup:
+    """Detalhes do ponto de interesse em HTML ("<b>Rótulo:</b> valor" por linha), com os valores escapados."""
+    if conteudo is None:
+        return Markup('')
+    if conteudo.partes:
+        return Markup('<br><br>').join(
+            Markup('<b>{}:</b><br>{}').format(ROTULOS_PARTES_HEX.get(parte.tipo, parte.titulo), detalhes_html(parte))
+            for parte in conteudo.partes
+        )
+    linhas = [Markup('<b>{}:</b> {}').format(rotulo, valor) for rotulo, valor in conteudo.detalhes if valor]
+    if conteudo.texto:
+        linhas.insert(0, escape(conteudo.texto))
+    return Markup('<br>').join(linhas)
+
+
+def registrar_filtros(ambiente):
+    """Registra os filtros usados pelos templates em um ambiente Jinja (Flask ou Starlette)."""
+    ambiente.filters['descricao_encontro'] = descricao_encontro
+    ambiente.filters['detalhes_html'] = detalhes_html
+    return ambiente
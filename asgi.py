@@ -0,0 +1,317 @@
+# asgi.py
+"""
+Modo assíncrono (ASGI) dos dois geradores, com Starlette por cima das mesmas funções do travel.py e do hex.py.
+Tudo o que lê disco ou gera muitos resultados roda no pool de threads, então o event loop
+fica livre para atender outras sessões enquanto uma viagem longa é rolada.
+
+Uso:
+    uvicorn asgi:travel_app
+    uvicorn asgi:hex_app --port 5001
+"""
+import asyncio
+import contextlib
+import json
+from urllib.parse import urlencode
+
+import jinja2
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+
+import travel
+import hex as hexmap
+from tabelas import registro, load_json
+from sorteio import criar_rng
+from relatorios import gravador
+from vigia import vigia
+from metricas import metricas
+from apresentacao import registrar_filtros, dia_json
+
+# ========== UTILITÁRIOS ==========
+
+@jinja2.pass_context
+def _url_for(context, name, **params):
+    """'url_for' no estilo do Flask para os templates: 'static' usa 'filename' e o resultado é um caminho relativo."""
+    if name == 'static':
+        params = {'path': params.pop('filename')}
+    return context['request'].app.url_path_for(name, **params)
+
+templates = Jinja2Templates(directory='templates')
+templates.env.globals['url_for'] = _url_for
+registrar_filtros(templates.env)
+
+def _inteiro(valor, padrao=None):
+    """Converte um parâmetro para int como o 'type=int' do Flask: valor inválido vira o padrão."""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return padrao
+
+@contextlib.asynccontextmanager
+async def _sincronizar_tabelas(app):
+    """
+    Confere em segundo plano se outro worker publicou tabelas novas, fora do caminho das requisições,
+    e inicia o vigia dos arquivos editados (com TABELAS_VIGIAR).
+    """
+    vigia.garantir()
+
+    async def laco():
+        while True:
+            await run_in_threadpool(registro.sincronizar)
+            await asyncio.sleep(registro.intervalo_sincronizacao or 1.0)
+
+    tarefa = asyncio.create_task(laco())
+    try:
+        yield
+    finally:
+        tarefa.cancel()
+
+# ========== GERADOR DE VIAGENS ==========
+
+async def index(request):
+    terrains = load_json('tipos_terreno.json')
+    return templates.TemplateResponse(request, 'index.html', {'terrains': terrains})
+
+def _gerar_viagem(terrain, days, is_night, seed):
+    """Parte bloqueante do /generate: rola os dias e grava o relatório TXT."""
+    rng, seed = criar_rng(seed)
+    results = travel.generate_trip(terrain, days, is_night, rng)
+    terrains = load_json('tipos_terreno.json')
+    txt_file = travel.save_to_txt(results, terrains.get(terrain, terrain), days, is_night, seed, terrain)
+    return results, terrains, txt_file, seed
+
+async def generate(request):
+    if request.method == 'POST':
+        form = await request.form()
+        terrain = form.get('terrain')
+        days = _inteiro(form.get('days'))
+        if terrain is None or days is None:
+            return JSONResponse({'error': "'terrain' e 'days' são obrigatórios"}, status_code=400)
+        is_night = form.get('time') == 'night'
+        seed = _inteiro(form.get('seed'))
+
+        request.session['viagem_params'] = {
+            'terrain': terrain,
+            'days': days,
+            'is_night': is_night
+        }
+    else:
+        # Parâmetros na URL (ex.: link de repetição com seed) têm prioridade sobre a sessão
+        args = request.query_params
+        params = request.session.get('viagem_params', {})
+        terrain = args.get('terrain', params.get('terrain', 'floresta'))
+        days = _inteiro(args.get('days'), params.get('days', 1))
+        is_night = args.get('time', 'night' if params.get('is_night', False) else 'day') == 'night'
+        seed = _inteiro(args.get('seed'))
+
+    if not travel.terreno_conhecido(terrain):
+        return JSONResponse({'error': f"Terreno desconhecido: '{terrain}'"}, status_code=400)
+
+    results, terrains, txt_file, seed = await run_in_threadpool(_gerar_viagem, terrain, days, is_night, seed)
+    replay_url = request.app.url_path_for('generate') + '?' + urlencode(
+        {'terrain': terrain, 'days': days, 'time': 'night' if is_night else 'day', 'seed': seed}
+    )
+
+    return templates.TemplateResponse(request, 'results.html', {
+        'results': results,
+        'terrain': terrains.get(terrain, terrain),
+        'days': days,
+        'txt_file': txt_file,
+        'qtd_caracteristicas': _inteiro(request.query_params.get('qtd_carac'), 1),
+        'seed': seed,
+        'replay_url': replay_url
+    })
+
+async def travel_stream(request):
+    """Gera a viagem como NDJSON; o gerador síncrono é consumido no pool de threads"""
+    params = dict(request.query_params)
+    if request.method == 'POST':
+        params.update(await request.form())
+    terrain = params.get('terrain', 'floresta')
+    days = _inteiro(params.get('days', 1))
+    is_night = params.get('time') == 'night'
+
+    if days is None or not 1 <= days <= travel.MAX_STREAM_DAYS:
+        return JSONResponse({'error': f"'days' deve estar entre 1 e {travel.MAX_STREAM_DAYS}"}, status_code=400)
+    if not travel.terreno_conhecido(terrain):
+        return JSONResponse({'error': f"Terreno desconhecido: '{terrain}'"}, status_code=400)
+
+    rng, seed = criar_rng(_inteiro(params.get('seed')))
+
+    def linhas():
+        for dia in travel.generate_trip_days(terrain, days, is_night, rng):
+            yield json.dumps(dia_json(dia), ensure_ascii=False) + '\n'
+
+    return StreamingResponse(linhas(), media_type='application/x-ndjson', headers={'X-Seed': str(seed)})
+
+async def gerar_caracteristicas(request):
+    """Gera múltiplas características para o tipo especificado (a seed usada volta no cabeçalho X-Seed)"""
+    try:
+        qtd = _inteiro(request.query_params.get('qtd'), 1)
+        rng, seed = criar_rng(_inteiro(request.query_params.get('seed')))
+        resultados = await run_in_threadpool(travel.sortear_caracteristicas, request.path_params['tipo'], qtd, rng)
+        return JSONResponse(resultados, headers={'X-Seed': str(seed)})
+    except Exception as e:
+        print(f"Erro ao gerar características: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+async def caracteristicas_lote(request):
+    """Gera as características de vários tipos em uma única requisição (mesmo formato do app Flask)."""
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = {}
+    try:
+        pedidos = travel.ler_pedidos_caracteristicas(payload)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    rng, seed = criar_rng(payload.get('seed') if isinstance(payload.get('seed'), int) else None)
+    resultados = await run_in_threadpool(travel.sortear_caracteristicas_lote, pedidos, rng)
+    return JSONResponse({'seed': seed, 'resultados': resultados})
+
+async def gerar_equipamentos(request):
+    """Gera armas e armaduras usando o GeradorEquipamentos."""
+    try:
+        qtd_armas = _inteiro(request.query_params.get('qtd_armas'), 0)
+        qtd_armaduras = _inteiro(request.query_params.get('qtd_armaduras'), 0)
+        return JSONResponse(await run_in_threadpool(travel.gerar_equipamentos, qtd_armas, qtd_armaduras))
+    except FileNotFoundError:
+        return JSONResponse({'error': "Arquivo 'equipamentos.json' não encontrado no servidor."}, status_code=500)
+    except Exception as e:
+        print(f"Erro ao gerar equipamentos: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+async def equipamentos_lote(request):
+    """Equipa um grupo inteiro de NPCs em uma única requisição (mesmo formato do app Flask)."""
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    try:
+        npcs = travel.ler_pedido_equipamentos(payload)
+        formatar = payload.get('formatar', True) is not False
+        return JSONResponse({'npcs': await run_in_threadpool(travel.equipar_grupo, npcs, formatar)})
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except FileNotFoundError:
+        return JSONResponse({'error': "Arquivo 'equipamentos.json' não encontrado no servidor."}, status_code=500)
+
+async def limpar_cache(request):
+    total = await run_in_threadpool(registro.publicar)
+    return JSONResponse({'status': f'Cache de características limpo e tabelas recarregadas ({total} arquivos)'})
+
+async def metrics(request):
+    """Mesmos histogramas do /metrics do Flask (as funções de geração são as mesmas)."""
+    if not metricas.ativas:
+        return PlainTextResponse('Not Found', status_code=404)
+    return PlainTextResponse(metricas.exportar(), media_type='text/plain; version=0.0.4')
+
+async def serve_log(request):
+    conteudo = await run_in_threadpool(gravador.ler, request.path_params['filename'])
+    if conteudo is None:
+        return PlainTextResponse('Not Found', status_code=404)
+    return PlainTextResponse(conteudo)
+
+async def api_logs(request):
+    """Busca paginada nos relatórios de viagem (mesmos parâmetros do app Flask)."""
+    args = request.query_params
+    try:
+        pagina = await run_in_threadpool(
+            gravador.buscar, travel._filtros_logs(args),
+            _inteiro(args.get('limite'), 50), _inteiro(args.get('antes'))
+        )
+    except ValueError as e:
+        return JSONResponse({'error': f"Data inválida: {str(e)}"}, status_code=400)
+    except RuntimeError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    for viagem in pagina['viagens']:
+        viagem['url'] = request.app.url_path_for('serve_log', filename=viagem['nome'])
+    return JSONResponse(pagina)
+
+async def api_logs_export(request):
+    """Exporta as viagens filtradas como NDJSON; o cursor do SQLite é consumido no pool de threads."""
+    viagens = gravador.exportar(travel._filtros_logs(request.query_params))
+    try:
+        primeira = await run_in_threadpool(next, viagens, None)
+    except ValueError as e:
+        return JSONResponse({'error': f"Data inválida: {str(e)}"}, status_code=400)
+    except RuntimeError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    def linhas():
+        if primeira is None:
+            return
+        yield json.dumps(primeira, ensure_ascii=False) + '\n'
+        for viagem in viagens:
+            yield json.dumps(viagem, ensure_ascii=False) + '\n'
+
+    return StreamingResponse(linhas(), media_type='application/x-ndjson')
+
+travel_app = Starlette(
+    routes=[
+        Route('/', index, name='index'),
+        Route('/generate', generate, methods=['GET', 'POST'], name='generate'),
+        Route('/api/travel/stream', travel_stream, methods=['GET', 'POST'], name='travel_stream'),
+        Route('/gerar-caracteristicas/{tipo}', gerar_caracteristicas, name='gerar_caracteristicas'),
+        Route('/api/caracteristicas', caracteristicas_lote, methods=['POST'], name='caracteristicas_lote'),
+        Route('/gerar-equipamentos', gerar_equipamentos, name='gerar_equipamentos_route'),
+        Route('/api/equipamentos', equipamentos_lote, methods=['POST'], name='equipamentos_lote'),
+        Route('/limpar-cache', limpar_cache, name='limpar_cache'),
+        Route('/logs/{filename}', serve_log, name='serve_log'),
+        Route('/api/logs', api_logs, name='api_logs'),
+        Route('/metrics', metrics, name='metrics'),
+        Route('/api/logs/export', api_logs_export, name='api_logs_export'),
+        Mount('/static', StaticFiles(directory='static'), name='static'),
+    ],
+    middleware=[Middleware(SessionMiddleware, secret_key=travel.app.secret_key)],
+    lifespan=_sincronizar_tabelas,
+)
+
+# ========== GERADOR DE HEXÁGONOS ==========
+
+async def hex_form(request):
+    """Exibe o formulário para gerar um hexágono."""
+    try:
+        terrains = load_json('tipos_terreno.json')
+    except Exception as e:
+        print(f"Erro ao carregar 'tipos_terreno.json': {e}")
+        terrains = {'floresta': 'Floresta (Padrão)'}
+    return templates.TemplateResponse(request, 'hex_form.html', {'terrains': terrains})
+
+async def render_hex(request, terreno_selecionado, seed=None):
+    """Gera (ou busca no cache) o hexágono no pool de threads e renderiza a página de resultado."""
+    if seed is None:
+        seed = hexmap.nova_seed()
+    hex_data = await run_in_threadpool(hexmap.generate_hex_cached, terreno_selecionado, seed)
+
+    try:
+        terrains = load_json('tipos_terreno.json')
+    except Exception as e:
+        print(f"Erro ao carregar 'tipos_terreno.json': {e}")
+        terrains = {terreno_selecionado: terreno_selecionado.capitalize()}
+
+    return templates.TemplateResponse(request, 'hex_result.html', {'hex': hex_data, 'terrains': terrains})
+
+async def generate_hex(request):
+    """Processa o formulário e exibe o resultado do hexágono gerado."""
+    form = await request.form()
+    return await render_hex(request, form.get('terreno'), _inteiro(form.get('seed')))
+
+async def replay_hex(request):
+    """Gera novamente um hexágono a partir do terreno e da seed."""
+    return await render_hex(request, request.path_params['terrain'], request.path_params['seed'])
+
+hex_app = Starlette(
+    routes=[
+        Route('/', hex_form, name='hex_form'),
+        Route('/generate', generate_hex, methods=['POST'], name='generate_hex'),
+        Route('/hex/{terrain}/{seed:int}', replay_hex, name='replay_hex'),
+        Mount('/static', StaticFiles(directory='static'), name='static'),
+    ],
+    lifespan=_sincronizar_tabelas,
+)
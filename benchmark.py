@@ -0,0 +1,171 @@
+# benchmark.py
+"""
+Benchmarks dos caminhos mais usados dos geradores (sorteio por peso, criaturas, encontros,
+hexágonos e as rotas completas pelo test client do Flask).
+
+Uso:
+    python benchmark.py                                # roda tudo e imprime a tabela
+    python benchmark.py -k encontro                    # só os benchmarks cujo nome contém 'encontro'
+    python benchmark.py --salvar bench/base.json       # guarda os resultados para comparar depois
+    python benchmark.py --comparar bench/base.json     # sai com código 1 se algo ficou mais lento que a tolerância
+
+Os tempos só são comparáveis na mesma máquina e versão do Python: gere a base com '--salvar'
+no commit de referência e rode '--comparar' no mesmo ambiente logo em seguida.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.getcwd())
+# Os relatórios das viagens de benchmark não entram no arquivo de viagens de verdade
+os.environ.setdefault('RELATORIOS_DB', os.path.join(tempfile.mkdtemp(prefix='benchmark-'), 'relatorios.db'))
+
+import travel
+import hex as hexmap
+from sorteio import AmostradorPesos
+
+# ========== CASOS ==========
+
+TAMANHOS_TABELA = (10, 100, 1_000, 10_000)
+TIPOS_ENCONTRO = ('false_alarm', 'creatures', 'anomaly', 'creatures_anomaly',
+                  'temporary_obstacle', 'obstacle_creatures', 'event', 'double_roll')
+CONTEUDOS_HEX = {
+    'assentamento': hexmap.generate_assentamento,
+    'ruina': hexmap.generate_ruina,
+    'obstaculo': hexmap.generate_obstaculo,
+    'marco_paisagem': hexmap.generate_marco_paisagem,
+}
+
+
+def casos():
+    """Devolve {nome: função sem argumentos}; cada caso usa um gerador com seed fixa."""
+    rng = random.Random(0)
+    lista = {}
+
+    for tamanho in TAMANHOS_TABELA:
+        tabela = {f"opcao_{i}": rng.randint(1, 100) for i in range(tamanho)}
+        amostrador = AmostradorPesos(tabela)
+        lista[f"select_by_weight/travel/{tamanho}"] = lambda t=tabela: travel.select_by_weight(t, rng)
+        lista[f"select_by_weight/hex/{tamanho}"] = lambda t=tabela: hexmap.select_by_weight(t, rng)
+        lista[f"select_by_weight/pre-compilado/{tamanho}"] = lambda a=amostrador: a.sortear(rng)
+
+    lista["generate_creature/floresta"] = lambda: travel.generate_creature('floresta', rng)
+    for tipo in TIPOS_ENCONTRO:
+        lista[f"generate_single_encounter/{tipo}"] = (
+            lambda t=tipo: travel.generate_single_encounter(False, 'floresta', t, rng))
+
+    for conteudo, funcao in CONTEUDOS_HEX.items():
+        lista[f"hex/{conteudo}"] = lambda f=funcao: f('floresta', rng)
+    lista["generate_hex_description/floresta"] = lambda: hexmap.generate_hex_description('floresta', rng=rng)
+
+    cliente_viagem = travel.app.test_client()
+    cliente_hex = hexmap.app.test_client()
+    lista["rota/travel/generate"] = lambda: cliente_viagem.post(
+        '/generate', data={'terrain': 'floresta', 'days': '30', 'time': 'day'})
+    lista["rota/hex/generate"] = lambda: cliente_hex.post('/generate', data={'terreno': 'floresta'})
+    lista["rota/gerar-caracteristicas"] = lambda: cliente_viagem.get('/gerar-caracteristicas/lefeu?qtd=3')
+    lote = {'pedidos': [{'tipo': 'lefeu', 'qtd': 3}] * 100}
+    lista["rota/api/caracteristicas/100"] = lambda: cliente_viagem.post('/api/caracteristicas', json=lote)
+
+    return lista
+
+
+# ========== MEDIÇÃO ==========
+
+def medir(funcao, repeticoes: int = 5) -> dict:
+    """Mede o tempo por chamada (em µs): calibra o nº de chamadas por rodada (>= 0,2 s) e repete a medição."""
+    timer = timeit.Timer(funcao)
+    numero, _ = timer.autorange()
+    tempos = [t / numero * 1e6 for t in timer.repeat(repeat=repeticoes, number=numero)]
+    return {
+        'mediana_us': statistics.median(tempos),
+        'melhor_us': min(tempos),
+        'chamadas': numero,
+        'repeticoes': repeticoes,
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list:
+    """Lista os benchmarks cuja mediana passou de base * (1 + tolerância)."""
+    regressoes = []
+    for nome, medida in atual.items():
+        anterior = base.get(nome)
+        if anterior is None:
+            continue
+        razao = medida['mediana_us'] / anterior['mediana_us']
+        if razao > 1 + tolerancia:
+            regressoes.append((nome, anterior['mediana_us'], medida['mediana_us'], razao))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks dos geradores de viagem e de hexágonos.")
+    parser.add_argument('-k', dest='filtro', help="roda só os benchmarks cujo nome contém o texto")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--salvar', help="grava os resultados em JSON")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help="aumento relativo da mediana aceito antes de acusar regressão (padrão: 0.25)")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for nome, funcao in casos().items():
+        if args.filtro and args.filtro not in nome:
+            continue
+        # Os avisos que os geradores imprimem (ex.: tabela ausente) não entram na saída nem na medição
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultados[nome] = medir(funcao, args.repeticoes)
+        print(f"{nome:<45} {resultados[nome]['mediana_us']:>12.2f} µs")
+
+    travel.gravador.esvaziar()
+
+    if args.salvar:
+        os.makedirs(os.path.dirname(args.salvar) or '.', exist_ok=True)
+        with open(args.salvar, 'w', encoding='utf-8') as f:
+            json.dump({
+                'commit': commit_atual(),
+                'data': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'maquina': platform.platform(),
+                'resultados': resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados salvos em {args.salvar}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        if (base.get('maquina'), base.get('python')) != (platform.platform(), platform.python_version()):
+            print(f"\nAVISO: a base foi medida em outro ambiente ({base.get('maquina')}, Python {base.get('python')}); "
+                  f"a comparação pode acusar diferenças que não são regressões")
+        regressoes = comparar(resultados, base['resultados'], args.tolerancia)
+        if regressoes:
+            print(f"\nRegressões em relação a {base.get('commit') or args.comparar}:")
+            for nome, antes, depois, razao in regressoes:
+                print(f"  {nome}: {antes:.2f} µs -> {depois:.2f} µs ({razao:.2f}x)")
+            return 1
+        print(f"\nSem regressões em relação a {base.get('commit') or args.comparar} "
+              f"(tolerância de {args.tolerancia:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# cache_resultados.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ========== CACHE DE RESULTADOS GERADOS ==========
+
+class CacheResultados:
+    """
+    Cache LRU com validade (TTL) para resultados que podem ser gerados de novo a partir da chave.
+    Opcionalmente mantém uma segunda camada em SQLite ('caminho_disco'), que sobrevive a reinícios.
+    As chaves são tuplas simples (str/int) e os valores precisam ser serializáveis em JSON;
+    valores de outros tipos (ex.: registros) passam por 'codificar'/'decodificar' na ida e na volta do disco.
+    As linhas expiradas do SQLite (inclusive as de versões antigas das tabelas, que nunca mais são lidas)
+    são apagadas durante os 'set', no máximo uma vez a cada décimo do TTL.
+    A conexão com o SQLite é aberta no primeiro uso e de novo em cada processo depois de um fork
+    (workers do gunicorn com preload), para que os processos não dividam a mesma conexão.
+    """
+
+    def __init__(self, maximo: int = 10_000, ttl: float = 3600, caminho_disco: str = None,
+                 codificar=None, decodificar=None):
+        self.maximo = maximo
+        self.ttl = ttl
+        self.codificar = codificar
+        self.decodificar = decodificar
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self.caminho_disco = caminho_disco
+        self._disco = None
+        self._pid = None
+        self._ultima_limpeza = time.time()
+
+    def _conexao(self):
+        # Chamado sempre com _lock; None se não houver camada em disco
+        if not self.caminho_disco:
+            return None
+        if self._disco is None or self._pid != os.getpid():
+            disco = sqlite3.connect(self.caminho_disco, check_same_thread=False)
+            disco.execute(
+                "CREATE TABLE IF NOT EXISTS resultados (chave TEXT PRIMARY KEY, valor TEXT NOT NULL, criado REAL NOT NULL)"
+            )
+            disco.execute("CREATE INDEX IF NOT EXISTS resultados_criado ON resultados (criado)")
+            disco.commit()
+            self._disco, self._pid = disco, os.getpid()
+        return self._disco
+
+    def _expirado(self, criado: float) -> bool:
+        return self.ttl is not None and time.time() - criado > self.ttl
+
+    def get(self, chave):
+        """Devolve o valor guardado para a chave, ou None se não houver (ou se tiver expirado)."""
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item is not None:
+                criado, valor = item
+                if not self._expirado(criado):
+                    self._memoria.move_to_end(chave)
+                    return valor
+                del self._memoria[chave]
+
+            disco = self._conexao()
+            if disco is None:
+                return None
+
+            linha = disco.execute(
+                "SELECT valor, criado FROM resultados WHERE chave = ?", (json.dumps(chave),)
+            ).fetchone()
+            if linha is None or self._expirado(linha[1]):
+                return None
+            valor = json.loads(linha[0])
+            if self.decodificar is not None:
+                valor = self.decodificar(valor)
+            self._guardar_memoria(chave, valor, linha[1])
+            return valor
+
+    def set(self, chave, valor):
+        """Guarda o valor nas duas camadas."""
+        criado = time.time()
+        with self._lock:
+            self._guardar_memoria(chave, valor, criado)
+            disco = self._conexao()
+            if disco is not None:
+                disco.execute(
+                    "INSERT OR REPLACE INTO resultados (chave, valor, criado) VALUES (?, ?, ?)",
+                    (json.dumps(chave),
+                     json.dumps(self.codificar(valor) if self.codificar else valor, ensure_ascii=False), criado)
+                )
+                if self.ttl is not None and criado - self._ultima_limpeza > self.ttl / 10:
+                    disco.execute("DELETE FROM resultados WHERE criado < ?", (criado - self.ttl,))
+                    self._ultima_limpeza = criado
+                disco.commit()
+
+    def _guardar_memoria(self, chave, valor, criado):
+        self._memoria[chave] = (criado, valor)
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.maximo:
+            self._memoria.popitem(last=False)
+
+    def limpar(self):
+        """Esvazia as duas camadas."""
+        with self._lock:
+            self._memoria.clear()
+            disco = self._conexao()
+            if disco is not None:
+                disco.execute("DELETE FROM resultados")
+                disco.commit()
+
+    def __len__(self):
+        return len(self._memoria)
@@ -0,0 +1,329 @@
+# esquemas.py
+import json
+import os
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from functools import lru_cache
+from typing import Optional
+from tabelas import registro, normalizar_caminho
+from sorteio import (AmostradorPesos, TabelaD20, formato, PESOS, CATEGORIAS_POR_PESO, FAIXAS_POR_CHAVE, FAIXAS_POR_VALOR,
+                     RARIDADES, TEXTOS, LISTA)
+from apresentacao import NOMES_TIPOS_ENCONTRO
+
+# ========== ESQUEMAS E COMPILAÇÃO DAS TABELAS DE ENCONTRO ==========
+# O formato de cada tabela é conferido uma vez por carga: os geradores recebem sorteadores já
+# compilados, com os caminhos derivados (pasta de cada categoria de criatura, arquivo de cada
+# categoria de obstáculo) resolvidos, e os problemas aparecem como avisos quando os apps sobem.
+
+TIPOS_CONTEUDO_HEX = ('paisagem_mundana', 'assentamento', 'ruina', 'obstaculo', 'marco_paisagem',
+                      'evento', 'obstaculo_ruina')
+
+
+def category_folder(category):
+    """Nome da pasta de uma categoria de criatura (ex.: "Espírito" -> "espirito")"""
+    return category.lower().replace('í', 'i').replace(' ', '-')
+
+
+def obstacle_file_name(categoria: str) -> str:
+    """
+    Mapeia a categoria para o nome do arquivo JSON correspondente
+    Ex: "Causado por humanos" -> "causado_por_humanos.json"
+    """
+    return categoria.lower().replace("ç", "c").replace("ã", "a").replace(" ", "_") + ".json"
+
+
+# ========== TABELAS COMPILADAS ==========
+
+@dataclass(frozen=True, slots=True)
+class CategoriaCriatura:
+    """Categoria sorteada em categories.json, com a pasta e os arquivos dela já resolvidos."""
+    categoria: str          # categoria exibida (ex.: 'Morto-vivo')
+    tipo: str               # pasta da categoria, usada nas características
+    tipos: str              # tipos.json (por raridade)
+    condicoes: str
+    racas: Optional[str]    # só os humanoides rolam raça
+
+
+def categoria_criatura(terreno: str, categoria: str) -> CategoriaCriatura:
+    pasta = category_folder(categoria)
+    base_path = f'encounters/{terreno}/creatures/{pasta}/'
+    if categoria.lower() == 'humanoide':
+        return CategoriaCriatura('Humanoide', 'humanoide', base_path + 'tipos.json',
+                                 base_path + 'condicoes.json', base_path + 'racas.json')
+    return CategoriaCriatura(categoria, pasta, base_path + 'tipos.json', base_path + 'condicoes.json', None)
+
+
+@lru_cache(maxsize=None)
+def sorteio_categorias(terreno: str):
+    """
+    Sorteador das categorias de criatura do terreno, nos dois formatos de categories.json:
+    cada sorteio devolve a CategoriaCriatura (ou None, em uma face do d20 sem categoria).
+    None se a tabela não estiver em um formato reconhecido; levanta FileNotFoundError se ela não existir.
+    """
+    caminho = f'encounters/{terreno}/creatures/categories.json'
+    formato_tabela = formato(registro.get(caminho))
+    if formato_tabela == CATEGORIAS_POR_PESO:
+        return registro.amostrador(caminho).mapear(
+            lambda chave: categoria_criatura(terreno, chave.split('|')[0].strip()))
+    if formato_tabela == FAIXAS_POR_CHAVE:
+        tabela = registro.tabela_d20(caminho)
+        if tabela is not None:
+            return tabela.mapear(lambda dados: categoria_criatura(terreno, dados['category'])
+                                 if isinstance(dados, dict) and dados.get('category') else None)
+    return None
+
+
+@lru_cache(maxsize=None)
+def sorteio_raridades(caminho: str) -> dict:
+    """
+    {raridade: sorteador} de um tipos.json por raridade, só com as raridades que têm opções
+    (um tipos.json só de pesos, sem raridades, fica vazio e cai no "Tipo Padrão").
+    Levanta FileNotFoundError se a tabela não existir e TypeError se ela não for um objeto.
+    """
+    tabela = registro.get(caminho)
+    if not isinstance(tabela, dict):
+        raise TypeError(f"'{caminho}' não está no formato de tipos por raridade")
+    return {raridade: registro.amostrador(caminho, raridade)
+            for raridade, tipos in tabela.items() if tipos and formato(tipos) == PESOS}
+
+
+@lru_cache(maxsize=None)
+def sorteio_tipos_encontro(terreno: str):
+    """Sorteador dos tipos de encontro do terreno (pesos ou faixas do d20), ou None se não houver um válido."""
+    terrain_config = registro.get('tipos_encontro.json').get(terreno, {})
+    if formato(terrain_config) == PESOS:
+        return registro.amostrador('tipos_encontro.json', terreno)
+    return registro.tabela_d20('tipos_encontro.json', terreno)
+
+
+@lru_cache(maxsize=None)
+def arquivos_obstaculos(terreno: str) -> dict:
+    """{categoria: caminho da tabela de obstáculos} do terreno, a partir de obstaculo/categorias.json."""
+    base_path = os.path.join('encounters', 'hex', terreno, 'obstaculo')
+    try:
+        categorias = registro.get(os.path.join(base_path, 'categorias.json'))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if not isinstance(categorias, dict):
+        return {}
+    return {categoria: os.path.join(base_path, obstacle_file_name(categoria)) for categoria in categorias}
+
+
+# ----- Planos de viagem -----
+
+CHANCE_ENCONTRO_PADRAO = 8  # peso (em 100) de um terreno que não está em chance_encontro.json
+
+# Tabelas de texto de cada tipo de encontro simples ({texto: descrição}; só o texto é sorteado)
+ARQUIVOS_TEXTOS_ENCONTRO = {
+    'false_alarm': 'false_alarms.json',
+    'anomaly': 'anomalies.json',
+    'temporary_obstacle': 'temporary_obstacles.json',
+    'event': 'events.json',
+}
+
+
+@dataclass(frozen=True, slots=True)
+class PlanoEncontros:
+    """
+    Tudo o que um encontro do terreno sorteia, já compilado: o sorteador dos tipos de encontro
+    (None se o terreno não tiver um válido) e os textos de cada tipo simples, em 'textos[tipo]'.
+    As criaturas vêm de 'sorteio_categorias', que só falha nos encontros com criaturas.
+    """
+    terreno: str
+    tipos: object   # AmostradorPesos ou TabelaD20 (os dois têm 'sortear'), ou None
+    textos: dict
+
+
+@dataclass(frozen=True, slots=True)
+class PlanoViagem:
+    """
+    Plano de uma viagem em um terreno e período: o sorteio diário de "encontro" / "sem_encontro"
+    (peso do encontro em 100) e a tabela de horários. Uma viagem de N dias faz só N sorteios nele,
+    sem reler tabelas; os encontros sorteados usam o PlanoEncontros do terreno ('plano_encontros').
+    """
+    terreno: str
+    noite: bool
+    peso_encontro: float
+    chance: AmostradorPesos
+    horarios: Optional[TabelaD20]
+
+
+@lru_cache(maxsize=None)
+def plano_encontros(terreno: str) -> PlanoEncontros:
+    """
+    PlanoEncontros do terreno, compilado uma vez por carga. Levanta FileNotFoundError ou
+    json.JSONDecodeError se faltar alguma tabela (nada fica em cache; cada encontro volta a tentar).
+    """
+    textos = {tipo: tuple(registro.get(f'encounters/{terreno}/{arquivo}'))
+              for tipo, arquivo in ARQUIVOS_TEXTOS_ENCONTRO.items()}
+    return PlanoEncontros(terreno, sorteio_tipos_encontro(terreno), textos)
+
+
+MAX_PLANOS_VIAGEM = 256  # as rotas só aceitam terrenos conhecidos; o limite protege os demais chamadores
+
+
+@lru_cache(maxsize=MAX_PLANOS_VIAGEM)
+def plano_viagem(terreno: str, noite: bool) -> PlanoViagem:
+    """PlanoViagem do terreno e período, compilado uma vez por carga e reaproveitado entre requisições."""
+    chances = registro.get('chance_encontro.json')
+    peso_encontro = chances.get(terreno, {}).get("noite" if noite else "dia", CHANCE_ENCONTRO_PADRAO)
+    # O peso total da rolagem é 100; "sem_encontro" fica com o que falta (nunca negativo)
+    chance = AmostradorPesos({"encontro": peso_encontro, "sem_encontro": max(0, 100 - peso_encontro)})
+    return PlanoViagem(terreno, noite, peso_encontro, chance, registro.tabela_d20('horario.json'))
+
+
+for _compilado in (sorteio_categorias, sorteio_raridades, sorteio_tipos_encontro, arquivos_obstaculos,
+                   plano_encontros, plano_viagem):
+    registro.ao_recarregar(_compilado.cache_clear)
+
+
+# ========== VALIDAÇÃO ==========
+
+def _opcoes(tabela: dict) -> list:
+    """Opções que podem ser sorteadas (peso maior que zero) de uma tabela de pesos."""
+    return [opcao for opcao, peso in tabela.items() if peso > 0]
+
+
+def _verificar_tipos_encontro(caminho, tabela):
+    for terreno, subtabela in tabela.items():
+        for tipo in subtabela if isinstance(subtabela, dict) else ():
+            if tipo not in NOMES_TIPOS_ENCONTRO:
+                yield f"{caminho} ({terreno}): tipo de encontro desconhecido '{tipo}'"
+
+
+def _verificar_categorias(caminho, tabela):
+    terreno = caminho.split(os.sep)[1]
+    formato_tabela = formato(tabela)
+    if formato_tabela == CATEGORIAS_POR_PESO:
+        categorias = [chave.split('|')[0].strip() for chave in _opcoes(tabela)]
+    elif formato_tabela == FAIXAS_POR_CHAVE:
+        categorias = []
+        for faixa, dados in tabela.items():
+            if isinstance(dados, dict) and dados.get('category'):
+                categorias.append(dados['category'])
+            else:
+                yield f"{caminho}: faixa '{faixa}' sem 'category'"
+    else:
+        return
+    for categoria in dict.fromkeys(categorias):
+        compilada = categoria_criatura(terreno, categoria)
+        for arquivo in (compilada.tipos, compilada.condicoes, compilada.racas):
+            if arquivo and not registro.existe(arquivo):
+                yield f"{caminho}: a categoria '{categoria}' não tem o arquivo '{arquivo}'"
+
+
+def _verificar_distribuicao(caminho, tabela):
+    for terreno, subtabela in tabela.items():
+        for tipo in subtabela if isinstance(subtabela, dict) else ():
+            if tipo not in TIPOS_CONTEUDO_HEX:
+                yield f"{caminho} ({terreno}): tipo de conteúdo desconhecido '{tipo}'"
+
+
+def _verificar_obstaculos(caminho, tabela):
+    if formato(tabela) != PESOS:
+        return
+    for categoria in _opcoes(tabela):
+        arquivo = os.path.join(os.path.dirname(caminho), obstacle_file_name(categoria))
+        if not registro.existe(arquivo):
+            yield f"{caminho}: a categoria '{categoria}' não tem o arquivo '{arquivo}'"
+
+
+def _verificar_marcos(caminho, tabela):
+    if formato(tabela) != PESOS:
+        return
+    for tipo in _opcoes(tabela):
+        arquivo = os.path.join(os.path.dirname(caminho), tipo, 'entrada.json')
+        if not registro.existe(arquivo):
+            yield f"{caminho}: o marco '{tipo}' não tem o arquivo '{arquivo}'"
+
+
+# (padrão do caminho, formatos aceitos da tabela, formatos aceitos de cada subtabela, verificação extra)
+# Vale o primeiro padrão que casar; os arquivos que não casam com nenhum (ex.: as pastas de cada
+# marco, processadas sob demanda) não são conferidos.
+ESQUEMAS = (
+    ('horario.json', (FAIXAS_POR_VALOR,), None, None),
+    ('tipos_encontro.json', None, (PESOS, FAIXAS_POR_VALOR), _verificar_tipos_encontro),
+    ('chance_encontro.json', None, (PESOS,), None),
+    ('encounters/*/false_alarms.json', (TEXTOS, PESOS), None, None),
+    ('encounters/*/anomalies.json', (TEXTOS, PESOS), None, None),
+    ('encounters/*/temporary_obstacles.json', (TEXTOS, PESOS), None, None),
+    ('encounters/*/events.json', (TEXTOS, PESOS), None, None),
+    ('encounters/*/creatures/categories.json', (CATEGORIAS_POR_PESO, FAIXAS_POR_CHAVE), None, _verificar_categorias),
+    ('encounters/*/creatures/rarity_weights.json', (PESOS,), None, None),
+    ('encounters/*/creatures/*/tipos.json', (RARIDADES,), None, None),
+    ('encounters/*/creatures/*/condicoes.json', (PESOS,), None, None),
+    ('encounters/*/creatures/*/racas.json', (PESOS,), None, None),
+    ('encounters/hex/distribuicao.json', None, (PESOS,), _verificar_distribuicao),
+    ('encounters/hex/*/*.json', (PESOS,), None, None),
+    ('encounters/hex/*/*/palavras_chave.json', (LISTA, PESOS, TEXTOS), None, None),
+    ('encounters/hex/*/obstaculo/categorias.json', (PESOS,), None, _verificar_obstaculos),
+    ('encounters/hex/*/marcos_paisagem/tipos.json', (PESOS,), None, _verificar_marcos),
+    ('encounters/hex/*/*/*.json', (PESOS,), None, None),
+)
+
+
+def esquema(caminho: str):
+    """Esquema do primeiro padrão de ESQUEMAS que casa com o caminho, ou None."""
+    partes = normalizar_caminho(caminho).split(os.sep)
+    for padrao, *regras in ESQUEMAS:
+        padrao = padrao.split('/')
+        if len(padrao) == len(partes) and all(fnmatch(parte, p) for parte, p in zip(partes, padrao)):
+            return regras
+    return None
+
+
+def _conferir_formato(nome: str, tabela, aceitos) -> Optional[str]:
+    formato_tabela = formato(tabela)
+    if formato_tabela not in aceitos:
+        return f"{nome}: formato '{formato_tabela}', esperado {' ou '.join(aceitos)}"
+    return None
+
+
+def validar() -> list:
+    """
+    Confere todas as tabelas carregadas contra ESQUEMAS e devolve a lista de problemas
+    (JSON inválido, formato inesperado, categorias sem arquivos, tipos desconhecidos).
+    """
+    caminhos = [a for a in registro.avulsos if registro.existe(a)]
+    caminhos += registro.listar(registro.raiz)
+    problemas = []
+    for caminho in caminhos:
+        regras = esquema(caminho)
+        if regras is None:
+            continue
+        aceitos, aceitos_subtabelas, verificar = regras
+        try:
+            tabela = registro.get(caminho)
+        except json.JSONDecodeError as e:
+            problemas.append(f"{caminho}: JSON inválido ({e})")
+            continue
+        if aceitos is not None:
+            problema = _conferir_formato(caminho, tabela, aceitos)
+            if problema:
+                problemas.append(problema)
+                continue
+        if aceitos_subtabelas is not None:
+            if not isinstance(tabela, dict):
+                problemas.append(f"{caminho}: esperado um objeto com uma tabela por terreno")
+                continue
+            for chave, subtabela in tabela.items():
+                problema = _conferir_formato(f"{caminho} ({chave})", subtabela, aceitos_subtabelas)
+                if problema:
+                    problemas.append(problema)
+        if verificar is not None:
+            problemas.extend(verificar(caminho, tabela))
+    return problemas
+
+
+@lru_cache(maxsize=1)
+def validar_carga() -> tuple:
+    """
+    Valida a carga atual e imprime os problemas como avisos. Roda uma vez por carga,
+    mesmo com os dois apps no mesmo processo (os dois chamam ao subir).
+    """
+    problemas = tuple(validar())
+    for problema in problemas:
+        print(f"AVISO: {problema}")
+    return problemas
+
+registro.ao_recarregar(validar_carga.cache_clear)
@@ -1,39 +1,42 @@
 # hex.py
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify
 import json
 import random
 import os
+import hashlib
+import threading
+from dataclasses import replace
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from tabelas import registro, load_json
+from vigia import vigia
+from sorteio import AmostradorPesos, como_rng, criar_rng, nova_seed
+from cache_resultados import CacheResultados
+from probabilidades import distribuicao, arvore
+from metricas import metricas, instrumentar, rotulo
+from resultados import ConteudoHex, Hexagono
+from apresentacao import registrar_filtros, hexagono_json, hexagono_de_json
+from esquemas import obstacle_file_name, arquivos_obstaculos, validar_carga
 
 app = Flask(__name__)
 app.secret_key = 'chave_secreta_para_o_gerador_de_hex'
+instrumentar(app, 'hex')
+registrar_filtros(app.jinja_env)
 
 # ========== FUNÇÕES UTILITÁRIAS ESSENCIAIS ==========
 
-def select_by_weight(options: dict):
+def select_by_weight(options: dict, rng=random):
     """Seleciona uma chave de um dicionário com base em seus valores (pesos)."""
     if not isinstance(options, dict):
         print(f"Erro: 'select_by_weight' esperava um dicionário, mas recebeu {type(options)}")
         return "Opção Inválida"
 
-    items = list(options.items())
-    total_weight = sum(item[1] for item in items)
-    if total_weight == 0:
-        return random.choice([item[0] for item in items])
-
-    r = random.uniform(0, total_weight)
-    upto = 0
-    for key, weight in items:
-        if upto + weight >= r:
-            return key
-        upto += weight
-    return items[-1][0]  # Fallback
-
-def roll_for_detail(file_path: str):
-    """Carrega um arquivo JSON e seleciona um item com base nos pesos."""
+    return AmostradorPesos(options).sortear(rng)
+
+def roll_for_detail(file_path: str, rng=random):
+    """Seleciona um item de um arquivo JSON com base nos pesos, usando o sorteador em cache."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            details = json.load(f)
-        return select_by_weight(details)
+        return registro.amostrador(file_path).sortear(rng)
     except FileNotFoundError:
         print(f"AVISO: Arquivo não encontrado em '{file_path}'")
         return "Detalhe não encontrado (arquivo ausente)"
@@ -41,11 +44,10 @@ def roll_for_detail(file_path: str):
         print(f"Erro ao processar o arquivo JSON '{file_path}': {e}")
         return "Detalhe não encontrado (erro no JSON)"
 
-def select_multiple(file_path: str, min_select: int = 1, max_select: int = 3):
+def select_multiple(file_path: str, min_select: int = 1, max_select: int = 3, rng=random):
     """Seleciona um número aleatório de itens de um arquivo JSON."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            options = json.load(f)
+        options = load_json(file_path)
 
         if isinstance(options, dict):
             options = list(options.keys())
@@ -53,8 +55,8 @@ def select_multiple(file_path: str, min_select: int = 1, max_select: int = 3):
         if not options:
             return ""
 
-        num_to_select = random.randint(min_select, min(max_select, len(options)))
-        selected = random.sample(options, num_to_select)
+        num_to_select = rng.randint(min_select, min(max_select, len(options)))
+        selected = rng.sample(options, num_to_select)
         return ", ".join(selected)
     except FileNotFoundError:
         print(f"AVISO: Arquivo não encontrado em '{file_path}'")
@@ -67,97 +69,110 @@ def select_multiple(file_path: str, min_select: int = 1, max_select: int = 3):
 # ========== FUNÇÕES DE GERAÇÃO DE CONTEÚDO DO HEXÁGONO ==========
 
 def load_hex_tables(terrain: str):
-    """Carrega as tabelas sensoriais (paisagem, som, etc.) para um terreno."""
+    """Carrega os sorteadores das tabelas sensoriais (paisagem, som, etc.) para um terreno."""
     tables = {}
     terrain_path = os.path.join('encounters', 'hex', terrain)
     
     for table_name in ['paisagens', 'sons', 'odores', 'eventos']:
         file_path = os.path.join(terrain_path, f'{table_name}.json')
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                tables[table_name] = json.load(f)
+            tables[table_name] = registro.amostrador(file_path)
         except Exception as e:
             print(f"Erro ao carregar '{file_path}': {e}")
-            tables[table_name] = {"Erro": f"Arquivo {table_name}.json não encontrado ou inválido"}
+            tables[table_name] = AmostradorPesos({f"Erro: arquivo {table_name}.json não encontrado ou inválido": 1})
             
     return tables
 
-def generate_assentamento(terrain: str):
+def generate_assentamento(terrain: str, rng=random):
     """Gera detalhes completos de um assentamento."""
     base_path = os.path.join('encounters', 'hex', terrain, 'assentamentos')
-    ocupacao = roll_for_detail(os.path.join(base_path, 'ocupacao.json'))
-    condicoes = roll_for_detail(os.path.join(base_path, 'condicoes.json'))
-    tipo = roll_for_detail(os.path.join(base_path, 'tipos.json'))
+    ocupacao = roll_for_detail(os.path.join(base_path, 'ocupacao.json'), rng)
+    condicoes = roll_for_detail(os.path.join(base_path, 'condicoes.json'), rng)
+    tipo = roll_for_detail(os.path.join(base_path, 'tipos.json'), rng)
 
-    detalhes = f"Tipo: {tipo}<br>Ocupação: {ocupacao}<br>Condições: {condicoes}"
+    detalhes = [("Tipo", tipo), ("Ocupação", ocupacao), ("Condições", condicoes)]
     
     if 'Ocupado' in ocupacao:
-        ocupantes = roll_for_detail(os.path.join(base_path, 'ocupantes.json'))
-        detalhes += f"<br>Ocupantes: {ocupantes}"
+        ocupantes = roll_for_detail(os.path.join(base_path, 'ocupantes.json'), rng)
+        detalhes.append(("Ocupantes", ocupantes))
     else: # Abandonado
-        motivo_abandono = roll_for_detail(os.path.join(base_path, 'abandono.json'))
-        detalhes += f"<br>Motivo do Abandono: {motivo_abandono}"
+        motivo_abandono = roll_for_detail(os.path.join(base_path, 'abandono.json'), rng)
+        detalhes.append(("Motivo do Abandono", motivo_abandono))
         
-    return {'conteudo': f"Assentamento: {tipo}", 'detalhes': detalhes}
+    return ConteudoHex('assentamento', f"Assentamento: {tipo}", tuple(detalhes))
 
-def generate_ruina(terrain: str):
+def generate_ruina(terrain: str, rng=random):
     """Gera detalhes completos de uma ruína."""
     base_path = os.path.join('encounters', 'hex', terrain, 'ruinas')
-    tipo_ruina = roll_for_detail(os.path.join(base_path, 'tipos.json'))
-    ocupacao = roll_for_detail(os.path.join(base_path, 'ocupacao.json'))
+    tipo_ruina = roll_for_detail(os.path.join(base_path, 'tipos.json'), rng)
+    ocupacao = roll_for_detail(os.path.join(base_path, 'ocupacao.json'), rng)
 
     detalhes_dict = {
         "Tipo": tipo_ruina,
-        "Propósito Original": roll_for_detail(os.path.join(base_path, 'proposito_original.json')),
-        "Propósito Atual": roll_for_detail(os.path.join(base_path, 'proposito_atual.json')),
-        "Localização": roll_for_detail(os.path.join(base_path, 'localizacao.json')),
-        "Peculiaridade": roll_for_detail(os.path.join(base_path, 'peculiaridade.json')),
-        "Idade": roll_for_detail(os.path.join(base_path, 'idade.json')),
+        "Propósito Original": roll_for_detail(os.path.join(base_path, 'proposito_original.json'), rng),
+        "Propósito Atual": roll_for_detail(os.path.join(base_path, 'proposito_atual.json'), rng),
+        "Localização": roll_for_detail(os.path.join(base_path, 'localizacao.json'), rng),
+        "Peculiaridade": roll_for_detail(os.path.join(base_path, 'peculiaridade.json'), rng),
+        "Idade": roll_for_detail(os.path.join(base_path, 'idade.json'), rng),
         "Ocupação": ocupacao
     }
 
     if 'Ocupado' in ocupacao:
-        detalhes_dict["Ocupantes"] = roll_for_detail(os.path.join(base_path, 'ocupantes.json'))
+        detalhes_dict["Ocupantes"] = roll_for_detail(os.path.join(base_path, 'ocupantes.json'), rng)
 
-    detalhes_dict["Palavras-chave"] = select_multiple(os.path.join(base_path, 'palavras_chave.json'), 1, 3)
+    detalhes_dict["Palavras-chave"] = select_multiple(os.path.join(base_path, 'palavras_chave.json'), 1, 3, rng)
 
-    detalhes = "<br>".join(f"{key}: {value}" for key, value in detalhes_dict.items() if value)
-    
-    return {'conteudo': f"Ruína: {tipo_ruina}", 'detalhes': detalhes}
+    return ConteudoHex('ruina', f"Ruína: {tipo_ruina}", tuple(detalhes_dict.items()))
 
-def generate_obstaculo(terrain: str):
+def generate_obstaculo(terrain: str, rng=random):
     """Gera detalhes completos de um obstáculo."""
     base_path = os.path.join('encounters', 'hex', terrain, 'obstaculo')
-    categoria = roll_for_detail(os.path.join(base_path, 'categorias.json'))
+    categoria = roll_for_detail(os.path.join(base_path, 'categorias.json'), rng)
     
-    # Mapeia a categoria para o nome do arquivo JSON correspondente
-    # Ex: "Causado por humanoides" -> "humanos.json"
-    file_name = categoria.lower().replace("ç", "c").replace("ã", "a").replace(" ", "_") + ".json"
+    # Arquivo de cada categoria resolvido na carga; só as mensagens de erro caem no nome derivado
+    file_path = arquivos_obstaculos(terrain).get(categoria) or os.path.join(base_path, obstacle_file_name(categoria))
     
-    obstaculo_especifico = roll_for_detail(os.path.join(base_path, file_name))
+    obstaculo_especifico = roll_for_detail(file_path, rng)
     
-    detalhes = f"Categoria: {categoria}<br>Obstáculo: {obstaculo_especifico}"
-    return {'conteudo': f"Obstáculo:", 'detalhes': detalhes, 'categoria': categoria}
+    detalhes = (("Categoria", categoria), ("Obstáculo", obstaculo_especifico))
+    return ConteudoHex('obstaculo', f"Obstáculo: {categoria}", detalhes, categoria=categoria)
+
+@lru_cache(maxsize=None)
+def indice_marcos(terrain: str) -> dict:
+    """
+    Índice {tipo de marco: arquivos da pasta do marco}, montado uma vez por terreno a partir da
+    listagem do registro (sem processar as tabelas dos marcos). Limpo a cada recarga das tabelas.
+    """
+    base_path = os.path.join('encounters', 'hex', terrain, 'marcos_paisagem')
+    indice = {}
+    for caminho in registro.listar(base_path):
+        partes = os.path.relpath(caminho, base_path).split(os.sep)
+        if len(partes) == 2:
+            indice.setdefault(partes[0], set()).add(partes[1])
+    return {tipo: frozenset(arquivos) for tipo, arquivos in indice.items()}
 
-def generate_marco_paisagem(terrain: str):
+registro.ao_recarregar(indice_marcos.cache_clear)
+
+def generate_marco_paisagem(terrain: str, rng=random):
     """
     Gera detalhes completos de um marco na paisagem,
     verificando a existência de arquivos opcionais como 'peculiaridade.json' e 'habitantes.json'.
     """
     base_path = os.path.join('encounters', 'hex', terrain, 'marcos_paisagem')
-    tipo_marco = roll_for_detail(os.path.join(base_path, 'tipos.json'))
+    tipo_marco = roll_for_detail(os.path.join(base_path, 'tipos.json'), rng)
     
     # Se o tipo de marco não for encontrado, retorna um erro amigável.
     if "não encontrado" in tipo_marco:
-        return {'conteudo': "Erro: Tipo de Marco na Paisagem inválido.", 'detalhes': f"Verifique o arquivo 'tipos.json' em {base_path}"}
+        return ConteudoHex('marco_paisagem', "Erro: Tipo de Marco na Paisagem inválido.",
+                           texto=f"Verifique o arquivo 'tipos.json' em {base_path}")
         
     marco_path = os.path.join(base_path, tipo_marco)
 
     # Inicia o dicionário com os detalhes que sempre existem.
     detalhes_dict = {
         "Tipo": tipo_marco,
-        "Entrada": roll_for_detail(os.path.join(marco_path, 'entrada.json')),
-        "Peculiaridade Geral": roll_for_detail(os.path.join(base_path, 'peculiaridade.json'))
+        "Entrada": roll_for_detail(os.path.join(marco_path, 'entrada.json'), rng),
+        "Peculiaridade Geral": roll_for_detail(os.path.join(base_path, 'peculiaridade.json'), rng)
     }
 
     # --- LÓGICA DE VERIFICAÇÃO DE ARQUIVOS ---
@@ -168,73 +183,236 @@ def generate_marco_paisagem(terrain: str):
         "Habitantes": "habitantes.json"
     }
 
-    # Itera sobre os arquivos opcionais. Se um existir, lê e adiciona ao dicionário.
+    # Itera sobre os arquivos opcionais. Se o índice do terreno tiver o arquivo, rola e adiciona ao dicionário.
+    arquivos_marco = indice_marcos(terrain).get(tipo_marco, frozenset())
     for display_name, file_name in optional_files.items():
-        file_path_to_check = os.path.join(marco_path, file_name)
-        if os.path.exists(file_path_to_check):
-            detalhes_dict[display_name] = roll_for_detail(file_path_to_check)
+        if file_name in arquivos_marco:
+            detalhes_dict[display_name] = roll_for_detail(os.path.join(marco_path, file_name), rng)
     
     # Adiciona as palavras-chave no final.
-    detalhes_dict["Palavras-chave"] = select_multiple(os.path.join(base_path, 'palavras_chave.json'), 0, 3)
+    detalhes_dict["Palavras-chave"] = select_multiple(os.path.join(base_path, 'palavras_chave.json'), 0, 3, rng)
 
-    # Monta a string de detalhes formatada, ignorando valores vazios.
-    # Adicionei <b> para deixar os títulos em negrito na exibição.
-    detalhes = "<br>".join(f"<b>{key}:</b> {value}" for key, value in detalhes_dict.items() if value)
-    
-    return {'conteudo': f"Marco na Paisagem: {tipo_marco}", 'detalhes': detalhes}
+    return ConteudoHex('marco_paisagem', f"Marco na Paisagem: {tipo_marco}", tuple(detalhes_dict.items()))
 
-def generate_hex_description(terrain: str):
-    """Gera a descrição completa de um hexágono, orquestrando as outras funções."""
+def generate_hex_description(terrain: str, tabelas: dict = None, rng=None):
+    """
+    Gera a descrição completa de um hexágono (um Hexagono), orquestrando as outras funções.
+    'tabelas' permite reaproveitar o resultado de 'load_hex_tables' ao gerar vários hexágonos do mesmo terreno.
+    'rng' pode ser uma seed ou um random.Random; a mesma seed sempre gera o mesmo hexágono.
+    """
+    rng = como_rng(rng)
     dist_path = os.path.join('encounters', 'hex', 'distribuicao.json')
-    with open(dist_path, 'r', encoding='utf-8') as f:
-        distribuicao = json.load(f).get(terrain, {})
+    distribuicao = load_json(dist_path).get(terrain, {})
 
     if not distribuicao:
-        return {'error': f"Dados de distribuição não encontrados para o terreno '{terrain}'."}
-
-    tipo_conteudo = select_by_weight(distribuicao)
-    tabelas = load_hex_tables(terrain)
-
-    resultado = {
-        'terreno': terrain,
-        'paisagem': select_by_weight(tabelas.get('paisagens', {})),
-        'sons': select_by_weight(tabelas.get('sons', {})),
-        'odores': select_by_weight(tabelas.get('odores', {})),
-        'conteudo': "Não definido",
-        'detalhes': ""
-    }
+        return Hexagono(terrain, erro=f"Dados de distribuição não encontrados para o terreno '{terrain}'.")
+
+    tipo_conteudo = registro.amostrador(dist_path, terrain).sortear(rng)
+    if tabelas is None:
+        tabelas = load_hex_tables(terrain)
+
+    paisagem = tabelas['paisagens'].sortear(rng)
+    sons = tabelas['sons'].sortear(rng)
+    odores = tabelas['odores'].sortear(rng)
 
     if tipo_conteudo == 'paisagem_mundana':
-        resultado['conteudo'] = "Paisagem Mundana"
-        resultado['detalhes'] = "Nada de especial além da paisagem, sons e odores típicos do terreno."
+        conteudo = ConteudoHex(tipo_conteudo, "Paisagem Mundana",
+                               texto="Nada de especial além da paisagem, sons e odores típicos do terreno.")
     elif tipo_conteudo == 'assentamento':
-        resultado.update(generate_assentamento(terrain))
+        conteudo = generate_assentamento(terrain, rng)
     elif tipo_conteudo == 'ruina':
-        resultado.update(generate_ruina(terrain))
+        conteudo = generate_ruina(terrain, rng)
     elif tipo_conteudo == 'obstaculo':
-        resultado.update(generate_obstaculo(terrain))
+        conteudo = generate_obstaculo(terrain, rng)
     elif tipo_conteudo == 'marco_paisagem':
-        resultado.update(generate_marco_paisagem(terrain))
+        conteudo = generate_marco_paisagem(terrain, rng)
     elif tipo_conteudo == 'evento':
-        resultado['conteudo'] = "Evento Especial"
-        resultado['detalhes'] = select_by_weight(tabelas.get('eventos', {}))
+        conteudo = ConteudoHex(tipo_conteudo, "Evento Especial", texto=tabelas['eventos'].sortear(rng))
     elif tipo_conteudo == 'obstaculo_ruina':
-        obstaculo_data = generate_obstaculo(terrain)
-        ruina_data = generate_ruina(terrain)
-        resultado['conteudo'] = f"{obstaculo_data['conteudo']} e {ruina_data['conteudo']}"
-        resultado['detalhes'] = f"<b>Obstáculo:</b><br>{obstaculo_data['detalhes']}<br><br><b>Ruína:</b><br>{ruina_data['detalhes']}"
+        obstaculo = generate_obstaculo(terrain, rng)
+        ruina = generate_ruina(terrain, rng)
+        conteudo = ConteudoHex(tipo_conteudo, f"{obstaculo.titulo} e {ruina.titulo}", partes=(obstaculo, ruina))
+    else:
+        conteudo = ConteudoHex(tipo_conteudo, "Não definido")
     
+    return Hexagono(terrain, paisagem, sons, odores, conteudo)
+
+
+# ========== PROBABILIDADES EXATAS ==========
+
+def exact_detail(file_path: str, peso: float = 1.0) -> dict:
+    """Árvore de uma tabela de detalhe (mesmas mensagens de erro de 'roll_for_detail')."""
+    try:
+        return arvore(distribuicao(registro.amostrador(file_path)), peso=peso)
+    except FileNotFoundError:
+        return {"Detalhe não encontrado (arquivo ausente)": {'probabilidade': peso}}
+    except (json.JSONDecodeError, TypeError):
+        return {"Detalhe não encontrado (erro no JSON)": {'probabilidade': peso}}
+
+def exact_obstacles(terrain: str, peso: float = 1.0) -> dict:
+    """Árvore exata categoria -> obstáculo específico de 'generate_obstaculo'."""
+    base_path = os.path.join('encounters', 'hex', terrain, 'obstaculo')
+    categorias_path = os.path.join(base_path, 'categorias.json')
+    if not registro.existe(categorias_path):
+        return exact_detail(categorias_path, peso)
+
+    def especificos(categoria, p):
+        return exact_detail(arquivos_obstaculos(terrain)[categoria], p)
+
+    return arvore(distribuicao(registro.amostrador(categorias_path)), especificos, peso)
+
+def exact_hex_contents(terrain: str) -> dict:
+    """
+    Árvore exata distribuicao.json -> tipo de conteúdo -> subtabela principal de cada conteúdo
+    (tipo do assentamento, da ruína e do marco, categoria -> obstáculo, evento).
+    Em 'obstaculo_ruina' as duas partes são sorteadas de forma independente e aparecem lado a lado.
+    """
+    dist_path = os.path.join('encounters', 'hex', 'distribuicao.json')
+    base_path = os.path.join('encounters', 'hex', terrain)
+    conteudos = distribuicao(registro.amostrador(dist_path, terrain))
+
+    def subtabela(tipo_conteudo, p):
+        if tipo_conteudo == 'assentamento':
+            return exact_detail(os.path.join(base_path, 'assentamentos', 'tipos.json'), p)
+        if tipo_conteudo == 'ruina':
+            return exact_detail(os.path.join(base_path, 'ruinas', 'tipos.json'), p)
+        if tipo_conteudo == 'marco_paisagem':
+            return exact_detail(os.path.join(base_path, 'marcos_paisagem', 'tipos.json'), p)
+        if tipo_conteudo == 'obstaculo':
+            return exact_obstacles(terrain, p)
+        if tipo_conteudo == 'evento':
+            return exact_detail(os.path.join(base_path, 'eventos.json'), p)
+        if tipo_conteudo == 'obstaculo_ruina':
+            return {
+                'obstaculo': {'probabilidade': p, 'resultados': exact_obstacles(terrain, p)},
+                'ruina': {'probabilidade': p, 'resultados': exact_detail(os.path.join(base_path, 'ruinas', 'tipos.json'), p)}
+            }
+        return None
+
+    return arvore(conteudos, subtabela)
+
+
+# ========== CACHE DE HEXÁGONOS ==========
+
+# Um hexágono é definido por (terreno, seed, versão das tabelas): o mesmo trio sempre gera o mesmo resultado.
+# FORMATO_CACHE_HEX entra na chave para que mudanças no formato gravado não reaproveitem entradas antigas do disco.
+FORMATO_CACHE_HEX = 2
+# HEX_CACHE_DB liga a camada em SQLite, que sobrevive a reinícios.
+cache_hexes = CacheResultados(
+    maximo=int(os.environ.get('HEX_CACHE_MAX', 10_000)),
+    ttl=float(os.environ.get('HEX_CACHE_TTL', 3600)),
+    caminho_disco=os.environ.get('HEX_CACHE_DB'),
+    codificar=hexagono_json,
+    decodificar=hexagono_de_json
+)
+
+def versao_tabelas_hex(terrain: str) -> str:
+    """Hash das tabelas que influenciam um hexágono do terreno (a pasta do terreno e a distribuição)."""
+    return registro.versao(os.path.join('encounters', 'hex', terrain),
+                           os.path.join('encounters', 'hex', 'distribuicao.json'))
+
+def generate_hex_cached(terrain: str, seed: int):
+    """
+    Gera o hexágono da seed, reaproveitando o resultado se ele já foi gerado com as mesmas tabelas.
+    Terrenos fora de distribuicao.json (ou ausentes) não passam pelo cache nem calculam versão:
+    geram direto o Hexagono de erro.
+    """
+    terrenos = load_json(os.path.join('encounters', 'hex', 'distribuicao.json'))
+    if terrain not in terrenos:
+        return replace(generate_hex_description(terrain, rng=random.Random(seed)), seed=seed)
+    chave = (terrain, seed, versao_tabelas_hex(terrain), FORMATO_CACHE_HEX)
+    hex_data = cache_hexes.get(chave)
+    if hex_data is None:
+        with metricas.medir('hexagono_segundos', terreno=rotulo(terrain, terrenos)):
+            hex_data = replace(generate_hex_description(terrain, rng=random.Random(seed)), seed=seed)
+        if hex_data.erro is None:
+            cache_hexes.set(chave, hex_data)
+    return hex_data
+
+
+# ========== GERAÇÃO DE MAPAS EM LOTE ==========
+
+MAX_HEXES_POR_MAPA = 100_000
+MIN_HEXES_POR_PROCESSO = 2_000
+# Processos extras por worker web para os mapas grandes; '?workers=N' só escolhe quantos usar, até este limite
+MAX_PROCESSOS_MAPA = int(os.environ.get('HEX_MAPA_PROCESSOS', min(4, os.cpu_count() or 1)))
+
+_pool_mapas = None
+_pid_pool_mapas = None
+_lock_pool_mapas = threading.Lock()
+
+def offset_para_axial(col: int, row: int):
+    """Converte coordenadas de grade (linhas ímpares deslocadas) para coordenadas axiais (q, r)."""
+    return col - (row - (row & 1)) // 2, row
+
+def semente_celula(seed: int, q: int, r: int) -> int:
+    """Deriva a seed de uma célula a partir da seed do mapa, para que cada hexágono possa ser repetido sozinho."""
+    digest = hashlib.sha256(f"{seed}:{q},{r}".encode()).digest()
+    return int.from_bytes(digest[:6], 'big')
+
+def generate_hex_cells(cells):
+    """
+    Gera uma lista de células [(q, r, terreno, seed), ...] e devolve [(chave, hex), ...].
+    As tabelas de cada terreno são buscadas uma única vez para todo o lote.
+    """
+    tabelas_por_terreno = {}
+    resultado = []
+    for q, r, terrain, seed in cells:
+        if terrain not in tabelas_por_terreno:
+            tabelas_por_terreno[terrain] = load_hex_tables(terrain)
+        hex_data = generate_hex_description(terrain, tabelas_por_terreno[terrain], random.Random(seed))
+        resultado.append((f"{q},{r}", replace(hex_data, seed=seed)))
     return resultado
 
+def pool_mapas() -> ProcessPoolExecutor:
+    """
+    Pool de processos dos mapas grandes, com MAX_PROCESSOS_MAPA processos, criado no primeiro uso
+    e reaproveitado entre requisições. Como o pool não sobrevive a um fork, cada processo cria o seu.
+    """
+    global _pool_mapas, _pid_pool_mapas
+    if _pool_mapas is None or _pid_pool_mapas != os.getpid():
+        with _lock_pool_mapas:
+            if _pool_mapas is None or _pid_pool_mapas != os.getpid():
+                _pool_mapas = ProcessPoolExecutor(max_workers=MAX_PROCESSOS_MAPA)
+                _pid_pool_mapas = os.getpid()
+    return _pool_mapas
+
+def generate_hex_map(cells, workers: int = 1, seed: int = 0):
+    """
+    Gera um mapa inteiro a partir de células (q, r, terreno). Cada célula usa uma seed
+    derivada de 'seed', então o resultado é o mesmo com ou sem processos extras.
+    Com 'workers' > 1 e mapas grandes, divide as células em blocos e distribui entre os processos
+    de 'pool_mapas' ('workers' é limitado a MAX_PROCESSOS_MAPA).
+    """
+    cells = [(q, r, terrain, semente_celula(seed, q, r)) for q, r, terrain in cells]
+    workers = min(workers, MAX_PROCESSOS_MAPA)
+    if workers <= 1 or len(cells) < MIN_HEXES_POR_PROCESSO:
+        return dict(generate_hex_cells(cells))
+
+    tamanho_bloco = -(-len(cells) // workers)
+    blocos = [cells[i:i + tamanho_bloco] for i in range(0, len(cells), tamanho_bloco)]
+    mapa = {}
+    for parte in pool_mapas().map(generate_hex_cells, blocos):
+        mapa.update(parte)
+    return mapa
+
 
 # ========== ROTAS FLASK ==========
 
+registro.carregar()
+validar_carga()
+
+@app.before_request
+def sincronizar_tabelas():
+    """Recarrega as tabelas se outro worker publicou uma versão nova (e inicia o vigia, se ativo)."""
+    vigia.garantir()
+    registro.sincronizar()
+
 @app.route('/', methods=['GET'])
 def hex_form():
     """Exibe o formulário para gerar um hexágono."""
     try:
-        with open('tipos_terreno.json', 'r', encoding='utf-8') as f:
-            terrains = json.load(f)
+        terrains = load_json('tipos_terreno.json')
     except Exception as e:
         print(f"Erro ao carregar 'tipos_terreno.json': {e}")
         terrains = {'floresta': 'Floresta (Padrão)'}
@@ -244,16 +422,85 @@ def hex_form():
 def generate_hex():
     """Processa o formulário e exibe o resultado do hexágono gerado."""
     terreno_selecionado = request.form.get('terreno')
-    hex_data = generate_hex_description(terreno_selecionado)
+    return render_hex(terreno_selecionado, request.form.get('seed', type=int))
+
+@app.route('/hex/<terrain>/<int:seed>', methods=['GET'])
+def replay_hex(terrain, seed):
+    """Gera novamente um hexágono a partir do terreno e da seed."""
+    return render_hex(terrain, seed)
+
+def render_hex(terreno_selecionado, seed=None):
+    """Gera (ou busca no cache) o hexágono da seed e renderiza a página de resultado."""
+    if seed is None:
+        seed = nova_seed()
+    hex_data = generate_hex_cached(terreno_selecionado, seed)
     
     try:
-        with open('tipos_terreno.json', 'r', encoding='utf-8') as f:
-            terrains = json.load(f)
+        terrains = load_json('tipos_terreno.json')
     except Exception as e:
         print(f"Erro ao carregar 'tipos_terreno.json': {e}")
         terrains = {terreno_selecionado: terreno_selecionado.capitalize()}
 
-    return render_template('hex_result.html', hex=hex_data, terrains=terrains)
+    with metricas.medir('renderizacao_segundos', template='hex_result.html'):
+        return render_template('hex_result.html', hex=hex_data, terrains=terrains)
+
+@app.route('/api/hexmap', methods=['GET', 'POST'])
+def api_hexmap():
+    """
+    Gera vários hexágonos de uma vez, em JSON indexado por coordenadas axiais "q,r".
+    GET: ?terrain=...&width=...&height=... gera um retângulo de um único terreno.
+    POST: {"cells": [{"q": 0, "r": 0, "terrain": "floresta"}, ...]} gera um terreno por célula.
+    Em ambos, ?workers=N distribui mapas grandes entre N processos (no máximo MAX_PROCESSOS_MAPA)
+    e ?seed=N repete um mapa já gerado.
+    """
+    workers = request.args.get('workers', default=1, type=int)
+    _, seed = criar_rng(request.args.get('seed', type=int))
+
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        try:
+            cells = [(int(c['q']), int(c['r']), c['terrain']) for c in payload.get('cells', [])]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return jsonify({'error': "Cada célula precisa de 'q', 'r' e 'terrain'."}), 400
+        if not all(isinstance(terrain, str) for _, _, terrain in cells):
+            return jsonify({'error': "Cada célula precisa de 'q', 'r' e 'terrain'."}), 400
+        terrain = None
+    else:
+        terrain = request.args.get('terrain', 'floresta')
+        width = request.args.get('width', default=1, type=int)
+        height = request.args.get('height', default=1, type=int)
+        if width is None or height is None or width < 1 or height < 1:
+            return jsonify({'error': "'width' e 'height' devem ser inteiros positivos."}), 400
+        if width * height > MAX_HEXES_POR_MAPA:
+            return jsonify({'error': f"O mapa pode ter no máximo {MAX_HEXES_POR_MAPA} hexágonos."}), 400
+        cells = [offset_para_axial(col, row) + (terrain,) for row in range(height) for col in range(width)]
+
+    if len(cells) > MAX_HEXES_POR_MAPA:
+        return jsonify({'error': f"O mapa pode ter no máximo {MAX_HEXES_POR_MAPA} hexágonos."}), 400
+
+    mapa = generate_hex_map(cells, workers, seed)
+    if terrain is not None:
+        # Mapa de um único terreno: o terreno vai uma vez só, fora das células
+        hexes = {chave: hexagono_json(hex_data, incluir_terreno=False) for chave, hex_data in mapa.items()}
+        return jsonify({'terreno': terrain, 'seed': seed, 'hexes': hexes})
+    return jsonify({'seed': seed, 'hexes': {chave: hexagono_json(hex_data) for chave, hex_data in mapa.items()}})
+
+@app.route('/api/probabilidades/<terrain>')
+def api_probabilidades(terrain):
+    """Probabilidades exatas de cada conteúdo do hexágono e das suas subtabelas, calculadas dos pesos."""
+    try:
+        return jsonify({'terreno': terrain, 'conteudos': exact_hex_contents(terrain)})
+    except KeyError:
+        return jsonify({'error': f"Dados de distribuição não encontrados para o terreno '{terrain}'."}), 404
+    except Exception as e:
+        print(f"Erro ao calcular probabilidades: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/limpar-cache')
+def limpar_cache():
+    """Relê as tabelas do disco para o registro em memória (em todos os workers, se houver snapshot)."""
+    total = registro.publicar()
+    return jsonify({'status': f'Tabelas recarregadas ({total} arquivos)'})
 
 
 if __name__ == '__main__':
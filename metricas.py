@@ -0,0 +1,180 @@
+# metricas.py
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from flask import Response, abort, current_app, g, request
+
+# ========== MÉTRICAS E PERFIL POR REQUISIÇÃO ==========
+# Instrumentação opcional: com INSTRUMENTACAO=1 os tempos de rotas, cargas de tabelas, rolagens,
+# renderização e relatórios viram histogramas servidos em /metrics (formato texto do Prometheus).
+# Cada processo tem os próprios contadores; com vários workers, cada um responde pelos seus.
+
+INSTRUMENTACAO_ATIVA = os.environ.get('INSTRUMENTACAO') == '1'
+LIMITES_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LINHAS_PERFIL = 40
+ROTULO_DESCONHECIDO = 'desconhecido'
+
+DESCRICOES = {
+    'requisicao_segundos': "Duração das requisições por app, rota, método e status",
+    'tabelas_carga_segundos': "Duração das (re)cargas do registro de tabelas",
+    'viagem_segundos': "Duração da rolagem de uma viagem completa, por terreno",
+    'encontro_segundos': "Duração da geração de um encontro, por terreno e tipo",
+    'hexagono_segundos': "Duração da geração de um hexágono, por terreno",
+    'renderizacao_segundos': "Duração da renderização de templates",
+    'relatorio_segundos': "Duração da montagem e envio do relatório da viagem",
+}
+
+_NULO = nullcontext()
+
+
+def rotulo(valor, conhecidos) -> str:
+    """
+    Valor de rótulo vindo do usuário (ex.: o terreno pedido): fora de 'conhecidos' vira
+    ROTULO_DESCONHECIDO, para que valores arbitrários não criem uma série nova cada um.
+    """
+    return valor if valor in conhecidos else ROTULO_DESCONHECIDO
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(rotulos: tuple, extra: str = None) -> str:
+    partes = [f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+class Histograma:
+    """Histograma cumulativo no estilo do Prometheus, com uma série por combinação de rótulos."""
+
+    def __init__(self, nome: str, descricao: str = '', limites=LIMITES_PADRAO):
+        self.nome = nome
+        self.descricao = descricao
+        self.limites = tuple(limites)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * len(self.limites), 0.0, 0]
+            contagens = serie[0]
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    contagens[i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def linhas(self):
+        yield f"# HELP {self.nome} {self.descricao}"
+        yield f"# TYPE {self.nome} histogram"
+        with self._lock:
+            series = [(chave, list(serie[0]), serie[1], serie[2]) for chave, serie in self._series.items()]
+        for rotulos, contagens, soma, total in sorted(series):
+            acumulado = 0
+            for limite, contagem in zip(self.limites, contagens):
+                acumulado += contagem
+                le = 'le="%s"' % limite
+                yield f"{self.nome}_bucket{_formatar_rotulos(rotulos, le)} {acumulado}"
+            le = 'le="+Inf"'
+            yield f"{self.nome}_bucket{_formatar_rotulos(rotulos, le)} {total}"
+            yield f"{self.nome}_sum{_formatar_rotulos(rotulos)} {soma}"
+            yield f"{self.nome}_count{_formatar_rotulos(rotulos)} {total}"
+
+
+class Metricas:
+    """Conjunto de histogramas do processo. Quando desativado, 'observar' e 'medir' não fazem nada."""
+
+    def __init__(self, ativas: bool = INSTRUMENTACAO_ATIVA):
+        self.ativas = ativas
+        self._histogramas = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, nome: str) -> Histograma:
+        histograma = self._histogramas.get(nome)
+        if histograma is None:
+            with self._lock:
+                histograma = self._histogramas.setdefault(nome, Histograma(nome, DESCRICOES.get(nome, '')))
+        return histograma
+
+    def observar(self, nome: str, segundos: float, **rotulos):
+        if self.ativas:
+            self.histograma(nome).observar(segundos, **rotulos)
+
+    def medir(self, nome: str, **rotulos):
+        """Context manager que cronometra o bloco e registra no histograma 'nome'."""
+        if not self.ativas:
+            return _NULO
+        return self._medir(nome, rotulos)
+
+    @contextmanager
+    def _medir(self, nome, rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histograma(nome).observar(time.perf_counter() - inicio, **rotulos)
+
+    def exportar(self) -> str:
+        """Todos os histogramas no formato texto de exposição do Prometheus."""
+        linhas = []
+        for nome in sorted(self._histogramas):
+            linhas.extend(self._histogramas[nome].linhas())
+        return '\n'.join(linhas) + '\n'
+
+
+metricas = Metricas()
+
+
+# ========== INTEGRAÇÃO COM O FLASK ==========
+
+def resumo_perfil(perfil: cProfile.Profile, linhas: int = LINHAS_PERFIL) -> str:
+    """Resumo do cProfile ordenado pelo tempo acumulado."""
+    saida = io.StringIO()
+    pstats.Stats(perfil, stream=saida).sort_stats('cumulative').print_stats(linhas)
+    return saida.getvalue()
+
+
+def instrumentar(app, nome_app: str):
+    """
+    Liga a instrumentação em um app Flask:
+    - registra a duração de cada requisição em 'requisicao_segundos' e serve /metrics (com INSTRUMENTACAO=1);
+    - com ?profile=1 (com INSTRUMENTACAO=1 ou com o app em modo debug), devolve o resumo do cProfile
+      da requisição no lugar da resposta.
+    """
+    @app.before_request
+    def _iniciar_medicao():
+        g.inicio_requisicao = time.perf_counter()
+        if request.args.get('profile') == '1' and (metricas.ativas or current_app.debug):
+            g.perfil = cProfile.Profile()
+            g.perfil.enable()
+
+    @app.after_request
+    def _encerrar_medicao(response):
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            perfil.disable()
+            response = Response(resumo_perfil(perfil), mimetype='text/plain')
+        inicio = g.pop('inicio_requisicao', None)
+        if inicio is not None and request.endpoint != 'metrics':
+            metricas.observar('requisicao_segundos', time.perf_counter() - inicio, app=nome_app,
+                              rota=request.endpoint or 'desconhecida', metodo=request.method,
+                              status=response.status_code)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if not metricas.ativas:
+            abort(404)
+        return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+    return app
@@ -0,0 +1,74 @@
+# probabilidades.py
+from sorteio import AmostradorPesos, TabelaD20
+
+# ========== PROBABILIDADES EXATAS ==========
+# Calcula, a partir dos próprios pesos, a chance de cada resultado dos sorteadores,
+# sem simulação. As árvores ('arvore') encadeiam tabelas: cada nó guarda a probabilidade
+# conjunta de chegar até ele a partir da raiz.
+
+
+def distribuicao(amostrador: AmostradorPesos) -> dict:
+    """
+    Chance exata de cada opção de um AmostradorPesos: peso / total.
+    Com peso total zero o sorteio é uniforme, como em 'AmostradorPesos.sortear'.
+    """
+    if amostrador.total == 0:
+        return {opcao: 1 / len(amostrador.opcoes) for opcao in amostrador.opcoes}
+
+    resultado = {}
+    anterior = 0
+    for opcao, acumulado in zip(amostrador.opcoes, amostrador.acumulados):
+        resultado[opcao] = (acumulado - anterior) / amostrador.total
+        anterior = acumulado
+    return resultado
+
+
+def distribuicao_d20(tabela: TabelaD20, rotulo=None) -> dict:
+    """
+    Chance exata de cada resultado de uma TabelaD20 (k faces = k/20).
+    'rotulo' converte o resultado da face em chave (necessário quando o resultado é um dicionário);
+    faces sem faixa chegam como None.
+    """
+    resultado = {}
+    for face in tabela.faces[1:]:
+        chave = rotulo(face) if rotulo else face
+        resultado[chave] = resultado.get(chave, 0) + 1 / 20
+    return resultado
+
+
+def agrupar(dist: dict, rotulo) -> dict:
+    """Soma as chances de opções que compartilham o mesmo rótulo (ex.: "Humanoide|humanoide/tipos.json")."""
+    resultado = {}
+    for opcao, p in dist.items():
+        chave = rotulo(opcao)
+        resultado[chave] = resultado.get(chave, 0) + p
+    return resultado
+
+
+def arvore(dist: dict, ramo=None, peso: float = 1.0) -> dict:
+    """
+    Monta a árvore {opção: {'probabilidade': p, 'resultados': {...}}} a partir de uma distribuição.
+    'ramo(opcao, p)' devolve a subárvore da opção (já multiplicada por 'p') ou None para uma folha.
+    """
+    nos = {}
+    for opcao, p in dist.items():
+        no = {'probabilidade': peso * p}
+        filhos = ramo(opcao, peso * p) if ramo else None
+        if filhos:
+            no['resultados'] = filhos
+        nos[opcao] = no
+    return nos
+
+
+def ocorrencias_com_repeticao(dist: dict, repetir, vezes: int = 2) -> dict:
+    """
+    Número esperado de vezes que cada resultado aparece por rolagem quando a opção 'repetir'
+    rola a mesma tabela 'vezes' vezes (recursivamente, como o 'double_roll').
+    E[x] = p(x) + p(repetir) * vezes * E[x]  =>  E[x] = p(x) / (1 - vezes * p(repetir)).
+    Levanta ValueError se a repetição não terminar em média (vezes * p(repetir) >= 1).
+    """
+    p_repetir = dist.get(repetir, 0)
+    if vezes * p_repetir >= 1:
+        raise ValueError(f"'{repetir}' se repete com chance {p_repetir:.2%}; o número esperado de rolagens é infinito")
+    fator = 1 / (1 - vezes * p_repetir)
+    return {opcao: p * fator for opcao, p in dist.items() if opcao != repetir}
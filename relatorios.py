@@ -0,0 +1,336 @@
+# relatorios.py
+import atexit
+import datetime
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from itertools import groupby
+
+# ========== ARQUIVO DE VIAGENS (SQLITE) COM GRAVAÇÃO EM SEGUNDO PLANO ==========
+
+PASTA_RELATORIOS = 'logs'
+DESTINO_RELATORIOS = os.environ.get('RELATORIOS_DESTINO', 'sqlite')  # 'sqlite' ou 'arquivos'
+CAMINHO_BANCO = os.environ.get('RELATORIOS_DB', os.path.join(PASTA_RELATORIOS, 'relatorios.db'))
+LIMITE_PAGINA = 200
+# Relatórios à espera de gravação; com a fila cheia, 'enviar' espera a thread de gravação abrir espaço
+MAX_FILA = int(os.environ.get('RELATORIOS_FILA', 10_000))
+TENTATIVAS_GRAVACAO = 5
+ESPERA_NOVA_TENTATIVA = 0.5  # segundos; dobra a cada falha, até ESPERA_MAXIMA
+ESPERA_MAXIMA = 30.0
+
+log = logging.getLogger(__name__)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS viagens (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE,
+    terreno TEXT,
+    dias INTEGER,
+    periodo TEXT,
+    seed INTEGER,
+    criado TEXT NOT NULL,
+    conteudo TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS encontros (
+    viagem_id INTEGER NOT NULL REFERENCES viagens(id),
+    dia INTEGER NOT NULL,
+    tipo TEXT,
+    horario TEXT,
+    descricao TEXT
+);
+CREATE INDEX IF NOT EXISTS viagens_terreno ON viagens (terreno, id);
+CREATE INDEX IF NOT EXISTS viagens_periodo ON viagens (periodo, id);
+CREATE INDEX IF NOT EXISTS viagens_criado ON viagens (criado);
+CREATE INDEX IF NOT EXISTS encontros_viagem ON encontros (viagem_id, dia);
+CREATE INDEX IF NOT EXISTS encontros_tipo ON encontros (tipo, viagem_id);
+"""
+
+COLUNAS_VIAGEM = ('nome', 'terreno', 'dias', 'periodo', 'seed', 'criado')
+
+
+def novo_id() -> str:
+    """Identificador curto e único do relatório (não depende do relógio, então não colide entre requisições)."""
+    return uuid.uuid4().hex[:12]
+
+
+def _filtros_sql(filtros: dict):
+    """
+    Monta o WHERE da busca. Filtros aceitos: terreno, periodo ('dia'/'noite'), tipo (tipo de encontro),
+    de / ate (datas AAAA-MM-DD, inclusivas). Datas inválidas levantam ValueError.
+    """
+    condicoes, parametros = [], []
+    if filtros.get('terreno'):
+        condicoes.append("v.terreno = ?")
+        parametros.append(filtros['terreno'])
+    if filtros.get('periodo'):
+        condicoes.append("v.periodo = ?")
+        parametros.append(filtros['periodo'])
+    if filtros.get('tipo'):
+        condicoes.append("v.id IN (SELECT viagem_id FROM encontros WHERE tipo = ?)")
+        parametros.append(filtros['tipo'])
+    if filtros.get('de'):
+        condicoes.append("v.criado >= ?")
+        parametros.append(datetime.date.fromisoformat(filtros['de']).isoformat())
+    if filtros.get('ate'):
+        condicoes.append("v.criado < ?")
+        parametros.append((datetime.date.fromisoformat(filtros['ate']) + datetime.timedelta(days=1)).isoformat())
+    return condicoes, parametros
+
+
+class GravadorRelatorios:
+    """
+    Fila de relatórios esvaziada por uma thread em segundo plano, que grava em lotes.
+    A requisição só enfileira o texto; até ser gravado, o relatório continua disponível
+    em memória, então o link devolvido funciona imediatamente.
+    Destinos: 'sqlite' (tabelas indexadas por terreno, data, período e tipo de encontro,
+    com busca paginada e exportação) ou 'arquivos' (um .txt por relatório na pasta, como antes;
+    não há rotação, cada relatório continua sendo lido pelo nome do arquivo em /logs/<nome>).
+
+    Um lote que falha continua pendente (e legível) e é gravado de novo, com espera crescente,
+    até TENTATIVAS_GRAVACAO vezes; se o banco continuar falhando, o lote vai para a pasta, de
+    onde 'ler' também o encontra. As falhas são registradas pelo logging.
+    """
+
+    def __init__(self, pasta: str = PASTA_RELATORIOS, destino: str = DESTINO_RELATORIOS,
+                 caminho_banco: str = CAMINHO_BANCO, lote: int = 256):
+        if destino not in ('arquivos', 'sqlite'):
+            raise ValueError(f"Destino de relatórios desconhecido: {destino}")
+        self.pasta = pasta
+        self.destino = destino
+        self.caminho_banco = caminho_banco
+        self.lote = lote
+        self.tentativas = TENTATIVAS_GRAVACAO
+        self.espera_tentativa = ESPERA_NOVA_TENTATIVA
+        self._fila = queue.Queue(maxsize=MAX_FILA)
+        self._pendentes = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._banco = None
+        self._lock_banco = threading.Lock()
+
+    # ---------- lado da requisição ----------
+
+    def enviar(self, nome: str, conteudo: str, viagem: dict = None) -> str:
+        """
+        Enfileira o relatório para gravação e devolve o nome pelo qual ele pode ser lido.
+        'viagem' traz os campos indexados: terreno, dias, periodo, seed, criado e
+        encontros (lista de (dia, tipo, horario, descricao)).
+        """
+        with self._lock:
+            self._pendentes[nome] = (conteudo, viagem or {})
+        self._garantir_thread()
+        self._fila.put(nome)
+        return nome
+
+    def ler(self, nome: str):
+        """Devolve o texto do relatório (ainda pendente ou já gravado), ou None se não existir."""
+        if os.path.basename(nome) != nome:
+            return None
+        with self._lock:
+            pendente = self._pendentes.get(nome)
+        if pendente is not None:
+            return pendente[0]
+
+        if self.destino == 'sqlite':
+            try:
+                with self._lock_banco:
+                    linha = self._conexao().execute(
+                        "SELECT conteudo FROM viagens WHERE nome = ?", (nome,)
+                    ).fetchone()
+            except sqlite3.Error:
+                log.warning("Falha ao ler o relatório '%s' do banco; procurando na pasta", nome, exc_info=True)
+                linha = None
+            if linha:
+                return linha[0]
+
+        # Relatórios antigos (ou do destino 'arquivos', ou que o banco recusou) continuam na pasta
+        try:
+            with open(os.path.join(self.pasta, nome), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def buscar(self, filtros: dict = None, limite: int = 50, antes: int = None) -> dict:
+        """
+        Página de viagens gravadas, da mais recente para a mais antiga.
+        A paginação é por cursor ('antes' = 'proximo' da página anterior), então cada
+        página é uma busca no índice, sem OFFSET. Relatórios ainda na fila não aparecem.
+        """
+        self._exigir_sqlite()
+        condicoes, parametros = _filtros_sql(filtros or {})
+        if antes is not None:
+            condicoes.append("v.id < ?")
+            parametros.append(antes)
+        limite = max(1, min(limite, LIMITE_PAGINA))
+
+        sql = (
+            "SELECT v.id, v.nome, v.terreno, v.dias, v.periodo, v.seed, v.criado, "
+            "(SELECT COUNT(*) FROM encontros e WHERE e.viagem_id = v.id) "
+            "FROM viagens v"
+        )
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY v.id DESC LIMIT ?"
+
+        with self._lock_banco:
+            linhas = self._conexao().execute(sql, parametros + [limite]).fetchall()
+
+        viagens = [dict(zip(COLUNAS_VIAGEM + ('encontros',), linha[1:])) for linha in linhas]
+        proximo = linhas[-1][0] if len(linhas) == limite else None
+        return {'viagens': viagens, 'proximo': proximo}
+
+    def exportar(self, filtros: dict = None):
+        """
+        Percorre todas as viagens que casam com os filtros, uma por vez e com os encontros de cada dia.
+        Usa uma conexão própria, então uma exportação longa não trava a gravação nem as buscas.
+        """
+        self._exigir_sqlite()
+        condicoes, parametros = _filtros_sql(filtros or {})
+        sql = (
+            "SELECT v.id, v.nome, v.terreno, v.dias, v.periodo, v.seed, v.criado, "
+            "e.dia, e.tipo, e.horario, e.descricao "
+            "FROM viagens v LEFT JOIN encontros e ON e.viagem_id = v.id"
+        )
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY v.id, e.dia"
+
+        # O servidor pode consumir o gerador em threads diferentes a cada passo
+        banco = sqlite3.connect(self.caminho_banco, check_same_thread=False)
+        try:
+            linhas = banco.execute(sql, parametros)
+            for _, grupo in groupby(linhas, key=lambda linha: linha[0]):
+                grupo = list(grupo)
+                viagem = dict(zip(COLUNAS_VIAGEM, grupo[0][1:7]))
+                viagem['encontros'] = [
+                    {'dia': dia, 'tipo': tipo, 'horario': horario, 'descricao': descricao}
+                    for *_, dia, tipo, horario, descricao in grupo if dia is not None
+                ]
+                yield viagem
+        finally:
+            banco.close()
+
+    def esvaziar(self):
+        """Bloqueia até todos os relatórios enfileirados terem sido gravados."""
+        if self._thread is not None:
+            self._fila.join()
+
+    def _exigir_sqlite(self):
+        if self.destino != 'sqlite':
+            raise RuntimeError("A busca de relatórios só está disponível com RELATORIOS_DESTINO=sqlite")
+        with self._lock_banco:
+            self._conexao()
+
+    # ---------- lado da thread de gravação ----------
+
+    def _garantir_thread(self):
+        # Depois de um fork (gunicorn, multiprocessing) a thread do processo pai não existe no filho
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._banco = None
+                self._thread = threading.Thread(target=self._laco, name='gravador-relatorios', daemon=True)
+                self._thread.start()
+
+    def _laco(self):
+        while True:
+            nomes = [self._fila.get()]
+            try:
+                while len(nomes) < self.lote:
+                    nomes.append(self._fila.get_nowait())
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                lote = [(nome, self._pendentes[nome]) for nome in nomes]
+            try:
+                self._gravar_com_tentativas(lote)
+            finally:
+                with self._lock:
+                    for nome, pendente in lote:
+                        if self._pendentes.get(nome) is pendente:
+                            del self._pendentes[nome]
+                for _ in nomes:
+                    self._fila.task_done()
+
+    def _gravar_com_tentativas(self, lote):
+        """Grava o lote, tentando de novo com espera crescente; esgotadas as tentativas, recorre à pasta."""
+        espera = self.espera_tentativa
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                self._gravar(lote)
+                return
+            except Exception:
+                log.warning("Falha ao gravar %d relatório(s) (tentativa %d de %d)",
+                            len(lote), tentativa, self.tentativas, exc_info=True)
+                if self.destino == 'sqlite':
+                    self._descartar_conexao()
+                if tentativa < self.tentativas:
+                    time.sleep(espera)
+                    espera = min(espera * 2, ESPERA_MAXIMA)
+
+        nomes = ', '.join(nome for nome, _ in lote)
+        if self.destino == 'sqlite':
+            try:
+                self._gravar_arquivos(lote)
+                log.error("Banco de relatórios indisponível; relatórios gravados em '%s': %s", self.pasta, nomes)
+                return
+            except Exception:
+                log.exception("Falha ao gravar os relatórios na pasta '%s'", self.pasta)
+        log.error("Relatórios perdidos depois de %d tentativas: %s", self.tentativas, nomes)
+
+    def _gravar(self, lote):
+        if self.destino == 'sqlite':
+            with self._lock_banco, self._conexao() as banco:
+                for nome, (conteudo, viagem) in lote:
+                    cursor = banco.execute(
+                        "INSERT INTO viagens (nome, terreno, dias, periodo, seed, criado, conteudo) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (nome, viagem.get('terreno'), viagem.get('dias'), viagem.get('periodo'), viagem.get('seed'),
+                         viagem.get('criado') or datetime.datetime.now().isoformat(sep=' ', timespec='seconds'),
+                         conteudo)
+                    )
+                    banco.executemany(
+                        "INSERT INTO encontros (viagem_id, dia, tipo, horario, descricao) VALUES (?, ?, ?, ?, ?)",
+                        ((cursor.lastrowid,) + tuple(encontro) for encontro in viagem.get('encontros', ()))
+                    )
+            return
+        self._gravar_arquivos(lote)
+
+    def _gravar_arquivos(self, lote):
+        os.makedirs(self.pasta, exist_ok=True)
+        for nome, (conteudo, _) in lote:
+            with open(os.path.join(self.pasta, nome), 'w', encoding='utf-8') as f:
+                f.write(conteudo)
+
+    def _descartar_conexao(self):
+        """Fecha a conexão depois de uma falha; a próxima tentativa abre outra."""
+        with self._lock_banco:
+            banco, self._banco = self._banco, None
+        if banco is not None:
+            try:
+                banco.close()
+            except sqlite3.Error:
+                pass
+
+    def _conexao(self):
+        # Chamado sempre com _lock_banco
+        if self._banco is None:
+            os.makedirs(os.path.dirname(self.caminho_banco) or '.', exist_ok=True)
+            banco = sqlite3.connect(self.caminho_banco, check_same_thread=False)
+            banco.execute("PRAGMA journal_mode=WAL")
+            banco.executescript(ESQUEMA)
+            banco.commit()
+            self._banco = banco
+        return self._banco
+
+
+gravador = GravadorRelatorios()
+atexit.register(gravador.esvaziar)
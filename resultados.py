@@ -0,0 +1,162 @@
+# resultados.py
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+
+# ========== REGISTROS DOS RESULTADOS GERADOS ==========
+# Os geradores devolvem estes registros, sem nenhuma formatação. A conversão para HTML, TXT
+# e JSON fica em apresentacao.py, então quem só precisa dos dados (simulações, APIs) não monta texto.
+
+# ----- Viagens -----
+
+@dataclass(frozen=True, slots=True)
+class Criatura:
+    """Criatura sorteada. Sem 'categoria', 'nome' é a mensagem de erro (ex.: "Criatura desconhecida")."""
+    nome: str
+    tipo: Optional[str] = None       # pasta da categoria, usada nas características (ex.: 'morto-vivo')
+    categoria: Optional[str] = None  # categoria exibida (ex.: 'Morto-vivo')
+    condicao: Optional[str] = None
+    raca: Optional[str] = None
+    raridade: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class Encontro:
+    """
+    Encontro sorteado. 'elementos' são as partes na ordem em que são exibidas: textos das tabelas,
+    Criatura e, no 'double_roll', os dois Encontros rolados. 'mensagem' substitui a descrição
+    quando não foi possível gerar o encontro.
+    """
+    tipo: Optional[str]
+    time_roll: int
+    elementos: tuple = ()
+    mensagem: Optional[str] = None
+
+    @property
+    def criatura(self) -> Optional[Criatura]:
+        """A criatura do encontro (None nos encontros sem criaturas e no 'double_roll')."""
+        for elemento in self.elementos:
+            if isinstance(elemento, Criatura):
+                return elemento
+        return None
+
+    @property
+    def criaturas(self) -> tuple:
+        """Todas as criaturas do encontro, incluindo as dos Encontros de um 'double_roll'."""
+        criaturas = []
+        for elemento in self.elementos:
+            if isinstance(elemento, Encontro):
+                criaturas.extend(elemento.criaturas)
+            elif isinstance(elemento, Criatura):
+                criaturas.append(elemento)
+        return tuple(criaturas)
+
+
+@dataclass(frozen=True, slots=True)
+class DiaViagem:
+    """Um dia da viagem; 'encontro' e 'horario' ficam None nos dias sem encontro."""
+    dia: int
+    encontro: Optional[Encontro] = None
+    horario: Optional[str] = None
+
+
+# ----- Hexágonos -----
+
+@dataclass(frozen=True, slots=True)
+class ConteudoHex:
+    """
+    Ponto de interesse do hexágono. 'detalhes' é uma tupla de (rótulo, valor) na ordem de exibição;
+    'texto' é a descrição dos conteúdos sem detalhes rotulados (paisagem mundana, evento);
+    'partes' guarda os conteúdos combinados (ex.: obstáculo e ruína).
+    """
+    tipo: str
+    titulo: str
+    detalhes: tuple = ()
+    texto: Optional[str] = None
+    categoria: Optional[str] = None
+    partes: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class Hexagono:
+    """Hexágono gerado; com 'erro' preenchido, os demais campos (exceto terreno e seed) ficam None."""
+    terreno: str
+    paisagem: Optional[str] = None
+    sons: Optional[str] = None
+    odores: Optional[str] = None
+    conteudo: Optional[ConteudoHex] = None
+    seed: Optional[int] = None
+    erro: Optional[str] = None
+
+
+# ----- Viagem completa em colunas -----
+
+class ResultadoViagem:
+    """
+    Viagem inteira guardada em colunas: só os dias com encontro ocupam memória, em arrays
+    paralelos (dia, código do tipo de encontro, código do horário) e na lista dos Encontros.
+    Cada tipo e cada horário aparece uma vez só em 'tipos' / 'horarios'; os códigos são os
+    índices nessas listas. Iterar entrega um DiaViagem por dia da viagem (os dias sem encontro
+    são criados na hora), então páginas e relatórios o usam como uma lista de dias.
+    """
+    __slots__ = ('dias', 'tipos', 'horarios', '_indices', '_dia', '_tipo', '_horario', '_encontros')
+
+    def __init__(self, dias: int):
+        self.dias = dias
+        self.tipos = []
+        self.horarios = []
+        self._indices = ({}, {})
+        self._dia = array('I')
+        self._tipo = array('H')
+        self._horario = array('H')
+        self._encontros = []
+
+    @staticmethod
+    def _codigo(rotulos: list, indices: dict, valor) -> int:
+        codigo = indices.get(valor)
+        if codigo is None:
+            codigo = indices[valor] = len(rotulos)
+            rotulos.append(valor)
+        return codigo
+
+    def adicionar(self, dia: DiaViagem):
+        """Guarda um dia com encontro (os dias precisam chegar em ordem crescente)."""
+        self._dia.append(dia.dia)
+        self._tipo.append(self._codigo(self.tipos, self._indices[0], dia.encontro.tipo))
+        self._horario.append(self._codigo(self.horarios, self._indices[1], dia.horario))
+        self._encontros.append(dia.encontro)
+
+    def _dia_viagem(self, i: int) -> DiaViagem:
+        return DiaViagem(self._dia[i], self._encontros[i], self.horarios[self._horario[i]])
+
+    def encontros(self):
+        """Percorre só os dias com encontro."""
+        for i in range(len(self._dia)):
+            yield self._dia_viagem(i)
+
+    def __iter__(self):
+        proximo, total = 0, len(self._dia)
+        for dia in range(1, self.dias + 1):
+            if proximo < total and self._dia[proximo] == dia:
+                yield self._dia_viagem(proximo)
+                proximo += 1
+            else:
+                yield DiaViagem(dia)
+
+    def __len__(self):
+        return self.dias
+
+    def como_numpy(self) -> dict:
+        """
+        Cópia das colunas como arrays do NumPy, para análises: 'dia', 'tipo' e 'horario'
+        (códigos), junto com as listas 'tipos' e 'horarios' que traduzem os códigos.
+        """
+        import numpy as np
+        return {
+            'dias': self.dias,
+            'dia': np.array(self._dia),
+            'tipo': np.array(self._tipo),
+            'horario': np.array(self._horario),
+            'tipos': tuple(self.tipos),
+            'horarios': tuple(self.horarios),
+        }
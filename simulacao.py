@@ -0,0 +1,85 @@
+# simulacao.py
+import numpy as np
+
+# ========== SIMULAÇÃO VETORIZADA (MONTE CARLO) ==========
+
+def _relatorio(opcoes, contagens, teoricos, amostras: int) -> dict:
+    """Monta o relatório estruturado com contagens, frequências e o qui-quadrado."""
+    esperados = teoricos * amostras
+    validos = esperados > 0
+    qui_quadrado = float((((contagens - esperados) ** 2)[validos] / esperados[validos]).sum())
+
+    resultados = [
+        {
+            'opcao': opcao,
+            'contagem': int(contagem),
+            'empirico': float(contagem / amostras) if amostras else 0.0,
+            'teorico': float(teorico),
+        }
+        for opcao, contagem, teorico in zip(opcoes, contagens, teoricos)
+    ]
+    resultados.sort(key=lambda item: item['contagem'], reverse=True)
+
+    return {
+        'amostras': amostras,
+        'resultados': resultados,
+        'qui_quadrado': qui_quadrado,
+        'graus_liberdade': max(int(validos.sum()) - 1, 0),
+    }
+
+
+def simular_pesos(pesos: dict, amostras: int = 1_000_000, seed=None, rotulo=None) -> dict:
+    """
+    Sorteia todas as amostras de uma tabela {opção: peso} de uma vez
+    (busca binária sobre os pesos acumulados, mesma regra do AmostradorPesos).
+    'rotulo' pode agrupar várias chaves em um mesmo resultado (ex.: "Humanoide|humanoide/tipos.json").
+    """
+    chaves = list(pesos.keys())
+    w = np.asarray(list(pesos.values()), dtype=float)
+    total = w.sum()
+    rng = np.random.default_rng(seed)
+
+    if total == 0:
+        indices = rng.integers(0, len(chaves), size=amostras)
+        teoricos = np.full(len(chaves), 1 / len(chaves))
+    else:
+        acumulados = np.cumsum(w)
+        indices = np.searchsorted(acumulados, rng.uniform(0, total, size=amostras), side='left')
+        np.minimum(indices, len(chaves) - 1, out=indices)
+        teoricos = w / total
+
+    contagens = np.bincount(indices, minlength=len(chaves))
+    return _agrupar(chaves, contagens, teoricos, amostras, rotulo)
+
+
+def simular_d20(faces, amostras: int = 1_000_000, seed=None) -> dict:
+    """Rola todos os d20 de uma vez para as faces de uma TabelaD20 (índices 1 a 20)."""
+    rng = np.random.default_rng(seed)
+    contagens_faces = np.bincount(rng.integers(1, 21, size=amostras), minlength=21)
+
+    opcoes = list(dict.fromkeys(r for r in faces[1:] if r is not None))
+    contagens = np.zeros(len(opcoes), dtype=np.int64)
+    teoricos = np.zeros(len(opcoes))
+    posicao = {opcao: i for i, opcao in enumerate(opcoes)}
+    for face in range(1, 21):
+        if faces[face] is not None:
+            contagens[posicao[faces[face]]] += contagens_faces[face]
+            teoricos[posicao[faces[face]]] += 1 / 20
+
+    return _relatorio(opcoes, contagens, teoricos, amostras)
+
+
+def _agrupar(chaves, contagens, teoricos, amostras, rotulo):
+    """Soma contagens e probabilidades de chaves que compartilham o mesmo rótulo."""
+    if rotulo is None:
+        return _relatorio(chaves, contagens, teoricos, amostras)
+
+    opcoes = list(dict.fromkeys(rotulo(chave) for chave in chaves))
+    posicao = {opcao: i for i, opcao in enumerate(opcoes)}
+    grupos = np.fromiter((posicao[rotulo(chave)] for chave in chaves), dtype=np.int64, count=len(chaves))
+    return _relatorio(
+        opcoes,
+        np.bincount(grupos, weights=contagens, minlength=len(opcoes)).astype(np.int64),
+        np.bincount(grupos, weights=teoricos, minlength=len(opcoes)),
+        amostras,
+    )
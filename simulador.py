@@ -0,0 +1,166 @@
+# simulador.py
+"""
+Simulador de campanhas em lote: rola muitas viagens com as mesmas funções do gerador
+(a chance diária de 'generate_trip_encounters' e o 'generate_single_encounter') e soma
+histogramas de tipos de encontro, categorias de criatura, raridades e horários.
+
+Uso:
+    python simulador.py floresta --dias 30 --noite --viagens 10000 --workers 8 --seed 42 --saida noite.json
+    python simulador.py deserto --viagens 5000 --saida deserto.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import travel
+from sorteio import criar_rng, nova_seed
+
+# ========== SIMULAÇÃO ==========
+
+HISTOGRAMAS = ('tipos_encontro', 'categorias', 'raridades', 'horarios', 'encontros_por_viagem')
+BLOCOS_POR_WORKER = 4  # blocos menores equilibram a carga entre os processos
+
+
+def semente_viagem(seed: int, indice: int) -> str:
+    """Seed da viagem 'indice': depende só da seed da campanha, então o resultado não muda com o nº de workers."""
+    return f"{seed}:{indice}"
+
+
+def simular_viagens(terrain: str, days: int, is_night: bool, seed: int, inicio: int, fim: int) -> dict:
+    """Rola as viagens [inicio, fim) e devolve os histogramas parciais (Counters)."""
+    histogramas = {nome: Counter() for nome in HISTOGRAMAS}
+    for indice in range(inicio, fim):
+        rng, _ = criar_rng(semente_viagem(seed, indice))
+        encontros = 0
+        for dia in travel.generate_trip_encounters(terrain, days, is_night, rng):
+            encontro = dia.encontro
+            encontros += 1
+            histogramas['tipos_encontro'][encontro.tipo] += 1
+            histogramas['horarios'][dia.horario] += 1
+            for criatura in encontro.criaturas:
+                if criatura.tipo is None:  # "Criatura desconhecida" e outras mensagens de erro
+                    continue
+                histogramas['categorias'][criatura.tipo] += 1
+                histogramas['raridades'][criatura.raridade] += 1
+        histogramas['encontros_por_viagem'][encontros] += 1
+    return histogramas
+
+
+def _simular_bloco(argumentos):
+    return simular_viagens(*argumentos)
+
+
+def simular_campanha(terrain: str, days: int = 30, is_night: bool = False, viagens: int = 10_000,
+                     workers: int = 1, seed: int = None) -> dict:
+    """
+    Simula 'viagens' viagens de 'days' dias e junta os histogramas.
+    Com 'workers' > 1 os blocos de viagens são distribuídos entre processos.
+    """
+    if seed is None:
+        seed = nova_seed()
+    workers = max(1, workers)
+    inicio = time.perf_counter()
+
+    if workers == 1:
+        partes = [simular_viagens(terrain, days, is_night, seed, 0, viagens)]
+    else:
+        tamanho_bloco = max(1, -(-viagens // (workers * BLOCOS_POR_WORKER)))
+        blocos = [(terrain, days, is_night, seed, i, min(i + tamanho_bloco, viagens))
+                  for i in range(0, viagens, tamanho_bloco)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partes = list(executor.map(_simular_bloco, blocos))
+
+    histogramas = {nome: Counter() for nome in HISTOGRAMAS}
+    for parte in partes:
+        for nome, contagem in parte.items():
+            histogramas[nome].update(contagem)
+
+    encontros = sum(histogramas['tipos_encontro'].values())
+    return {
+        'parametros': {
+            'terreno': terrain,
+            'dias': days,
+            'periodo': 'noite' if is_night else 'dia',
+            'viagens': viagens,
+            'seed': seed,
+            'workers': workers,
+        },
+        'totais': {
+            'dias': viagens * days,
+            'encontros': encontros,
+            'encontros_por_dia': encontros / (viagens * days) if viagens and days else 0.0,
+            'segundos': round(time.perf_counter() - inicio, 3),
+        },
+        'histogramas': {
+            nome: {str(valor): quantidade for valor, quantidade in contagem.most_common()}
+            for nome, contagem in histogramas.items()
+        },
+    }
+
+
+# ========== SAÍDA ==========
+
+def salvar_json(resultado: dict, caminho: str):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+def salvar_csv(resultado: dict, caminho: str):
+    """Uma linha por barra de histograma: histograma, valor, contagem, fração do histograma."""
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['histograma', 'valor', 'contagem', 'fracao'])
+        for nome, contagem in resultado['histogramas'].items():
+            total = sum(contagem.values())
+            for valor, quantidade in contagem.items():
+                escritor.writerow([nome, valor, quantidade, f"{quantidade / total:.6f}" if total else "0"])
+
+
+def imprimir_resumo(resultado: dict):
+    parametros, totais = resultado['parametros'], resultado['totais']
+    print(f"=== {parametros['viagens']} viagens de {parametros['dias']} dias em {parametros['terreno']} "
+          f"({parametros['periodo']}, seed {parametros['seed']}) ===")
+    print(f"Encontros: {totais['encontros']} ({totais['encontros_por_dia']:.2%} dos dias) em {totais['segundos']}s")
+    for nome in ('tipos_encontro', 'categorias', 'raridades', 'horarios'):
+        contagem = resultado['histogramas'][nome]
+        total = sum(contagem.values())
+        print(f"\n{nome}:")
+        for valor, quantidade in contagem.items():
+            print(f"  {valor}: {quantidade} ({quantidade / total:.2%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simula viagens em lote e gera histogramas de encontros.")
+    parser.add_argument('terreno')
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--noite', action='store_true', help="viagens noturnas (padrão: de dia)")
+    parser.add_argument('--viagens', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=None, help="repete uma campanha já simulada")
+    parser.add_argument('--saida', help="arquivo .json ou .csv com os histogramas")
+    args = parser.parse_args(argv)
+
+    if args.dias < 1 or args.viagens < 1:
+        parser.error("'--dias' e '--viagens' devem ser positivos")
+    if not travel.terreno_conhecido(args.terreno):
+        parser.error(f"terreno desconhecido: '{args.terreno}' (opções: {', '.join(travel.load_json('tipos_terreno.json'))})")
+
+    resultado = simular_campanha(args.terreno, args.dias, args.noite, args.viagens, args.workers, args.seed)
+    imprimir_resumo(resultado)
+
+    if args.saida:
+        if args.saida.endswith('.csv'):
+            salvar_csv(resultado, args.saida)
+        else:
+            salvar_json(resultado, args.saida)
+        print(f"\nHistogramas salvos em {args.saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# sorteio.py
+import random
+from bisect import bisect_left
+from itertools import accumulate
+
+# ========== GERADORES ALEATÓRIOS ==========
+
+SEED_MAXIMA = 2 ** 53  # cabe sem perda em um número do JavaScript
+
+_fonte_de_seeds = random.SystemRandom()
+
+
+def nova_seed() -> int:
+    """Sorteia uma seed nova, independente do gerador global."""
+    return _fonte_de_seeds.randrange(SEED_MAXIMA)
+
+
+def criar_rng(seed=None):
+    """Cria um gerador independente para uma requisição. Retorna (rng, seed) para permitir repetir o resultado."""
+    if seed is None:
+        seed = nova_seed()
+    return random.Random(seed), seed
+
+
+def como_rng(rng=None):
+    """Aceita None (gerador global do módulo random), uma seed ou uma instância de random.Random."""
+    if rng is None:
+        return random
+    if isinstance(rng, random.Random):
+        return rng
+    return random.Random(rng)
+
+
+# ========== SORTEIO POR PESO ==========
+
+class AmostradorPesos:
+    """
+    Sorteador pré-compilado para uma tabela {opção: peso}.
+    Os pesos acumulados são calculados uma vez; cada sorteio é uma busca binária (O(log n)).
+    Mantém o comportamento do antigo 'select_by_weight': a primeira opção cujo peso
+    acumulado alcança o valor sorteado vence, e uma tabela com peso total zero
+    sorteia entre as opções de forma uniforme.
+    """
+    __slots__ = ('opcoes', 'acumulados', 'total')
+
+    def __init__(self, options: dict):
+        if not isinstance(options, dict):
+            raise TypeError(f"AmostradorPesos esperava um dicionário, mas recebeu {type(options)}")
+        self.opcoes = tuple(options.keys())
+        self.acumulados = list(accumulate(options.values()))
+        self.total = self.acumulados[-1] if self.acumulados else 0
+
+    def sortear(self, rng=random):
+        """Sorteia uma opção de acordo com os pesos, usando 'rng' (o módulo random por padrão)."""
+        if self.total == 0:
+            return rng.choice(self.opcoes)
+
+        r = rng.uniform(0, self.total)
+        i = bisect_left(self.acumulados, r)
+        if i < len(self.opcoes):
+            return self.opcoes[i]
+        return self.opcoes[-1]  # Fallback
+
+    def mapear(self, funcao):
+        """Cópia com os mesmos pesos e cada opção trocada por funcao(opção); sorteia consumindo o rng do mesmo jeito."""
+        copia = AmostradorPesos.__new__(AmostradorPesos)
+        copia.opcoes = tuple(funcao(opcao) for opcao in self.opcoes)
+        copia.acumulados = self.acumulados
+        copia.total = self.total
+        return copia
+
+    def __len__(self):
+        return len(self.opcoes)
+
+
+# ========== TABELAS DE D20 ==========
+
+def _faixa(faixa):
+    """Converte "3-7", "6", [3, 7] ou 6 em (mínimo, máximo). Levanta ValueError se não reconhecer."""
+    if isinstance(faixa, str):
+        if '-' in faixa:
+            minimo, maximo = map(int, faixa.split('-'))
+        else:
+            minimo = maximo = int(faixa)
+    elif isinstance(faixa, list) and len(faixa) == 2:
+        minimo, maximo = faixa
+    elif isinstance(faixa, int) and not isinstance(faixa, bool):
+        minimo = maximo = faixa
+    else:
+        raise ValueError(f"Faixa de d20 inválida: {faixa!r}")
+    return minimo, maximo
+
+
+class TabelaD20:
+    """
+    Mapa de faixas do d20 já convertido em 20 posições: cada rolagem é um acesso por índice.
+    Mantém a regra das buscas antigas: se duas faixas cobrem a mesma face, vale a primeira;
+    faces sem faixa não têm resultado (None).
+    As faces descobertas e as repetidas ficam em 'lacunas' e 'sobreposicoes' para validação.
+    """
+    __slots__ = ('faces', 'lacunas', 'sobreposicoes')
+
+    def __init__(self, pares):
+        faces = [None] * 21  # índice 0 nunca é usado
+        cobertas = [False] * 21
+        sobreposicoes = []
+        for faixa, resultado in pares:
+            minimo, maximo = _faixa(faixa)
+            for face in range(max(minimo, 1), min(maximo, 20) + 1):
+                if cobertas[face]:
+                    sobreposicoes.append(face)
+                    continue
+                cobertas[face] = True
+                faces[face] = resultado
+        self.faces = tuple(faces)
+        self.lacunas = tuple(face for face in range(1, 21) if not cobertas[face])
+        self.sobreposicoes = tuple(sorted(set(sobreposicoes)))
+
+    @classmethod
+    def por_chave(cls, tabela: dict):
+        """Tabela no formato {"3-7": resultado, ...} (ex.: categories.json por faixas)."""
+        return cls(tabela.items())
+
+    @classmethod
+    def por_valor(cls, tabela: dict):
+        """Tabela no formato {resultado: [3, 7], ...} (ex.: tipos_encontro.json, horario.json)."""
+        return cls((faixa, resultado) for resultado, faixa in tabela.items())
+
+    def rolar(self, rng=random):
+        """Rola 1d20 com 'rng' e devolve o resultado da face (ou None, se a face não tiver faixa)."""
+        return self.faces[rng.randint(1, 20)]
+
+    sortear = rolar  # mesma interface do AmostradorPesos
+
+    def mapear(self, funcao):
+        """Cópia com o resultado de cada face trocado por funcao(resultado) (inclusive None nas faces sem faixa)."""
+        copia = TabelaD20.__new__(TabelaD20)
+        copia.faces = (None,) + tuple(funcao(resultado) for resultado in self.faces[1:])
+        copia.lacunas = self.lacunas
+        copia.sobreposicoes = self.sobreposicoes
+        return copia
+
+    def __getitem__(self, rolagem: int):
+        return self.faces[rolagem] if 1 <= rolagem <= 20 else None
+
+
+# ========== FORMATOS DAS TABELAS ==========
+# Cada tabela é classificada uma vez, na carga (ver tabelas.py e esquemas.py); os geradores
+# recebem os sorteadores já compilados e não conferem o formato a cada rolagem.
+
+PESOS = 'pesos'                            # {opção: peso}
+CATEGORIAS_POR_PESO = 'categorias_por_peso'  # {"Categoria|arquivo": peso} (categories.json)
+FAIXAS_POR_CHAVE = 'faixas_por_chave'      # {"3-7": resultado} (categories.json por faixas)
+FAIXAS_POR_VALOR = 'faixas_por_valor'      # {resultado: [3, 7]} (tipos_encontro.json, horario.json)
+RARIDADES = 'raridades'                    # {raridade: {opção: peso}} (tipos.json das criaturas)
+TEXTOS = 'textos'                          # {texto: descrição} (alarmes falsos, anomalias, eventos...)
+LISTA = 'lista'                            # [opção, ...] (palavras-chave)
+VAZIA = 'vazia'
+DESCONHECIDO = 'desconhecido'
+
+
+def _eh_peso(valor) -> bool:
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _eh_faixa(valor) -> bool:
+    try:
+        minimo, maximo = _faixa(valor)
+    except (ValueError, TypeError):
+        return False
+    return isinstance(minimo, int) and isinstance(maximo, int)
+
+
+def formato(tabela) -> str:
+    """Classifica uma tabela em um dos formatos acima (DESCONHECIDO se não reconhecer nenhum)."""
+    if isinstance(tabela, list):
+        return LISTA if tabela else VAZIA
+    if not isinstance(tabela, dict):
+        return DESCONHECIDO
+    if not tabela:
+        return VAZIA
+    valores = tabela.values()
+    if all(_eh_peso(valor) for valor in valores):
+        return CATEGORIAS_POR_PESO if all('|' in chave for chave in tabela) else PESOS
+    if all(_eh_faixa(chave) for chave in tabela):
+        return FAIXAS_POR_CHAVE
+    if all(_eh_faixa(valor) for valor in valores):
+        return FAIXAS_POR_VALOR
+    # Raridades sem opções são aceitas: quem sorteia recua para "comum"
+    if all(isinstance(valor, dict) and (not valor or formato(valor) == PESOS) for valor in valores):
+        return RARIDADES
+    if all(isinstance(valor, str) for valor in valores):
+        return TEXTOS
+    return DESCONHECIDO
@@ -0,0 +1,529 @@
+# tabelas.py
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from sorteio import AmostradorPesos, TabelaD20, formato, PESOS, CATEGORIAS_POR_PESO, FAIXAS_POR_CHAVE, FAIXAS_POR_VALOR
+from metricas import metricas
+
+# ========== REGISTRO DE TABELAS EM MEMÓRIA ==========
+
+RAIZ_TABELAS = 'encounters'
+ARQUIVOS_AVULSOS = ['tipos_terreno.json', 'chance_encontro.json', 'tipos_encontro.json', 'horario.json']
+CAMINHO_SNAPSHOT = os.environ.get('TABELAS_SNAPSHOT', 'tabelas.snapshot')
+# Arquivo regravado a cada 'publicar'; avisa os outros processos mesmo quando não há snapshot.
+# Só o aviso é compartilhado: cada processo mantém a sua cópia das tabelas.
+CAMINHO_GERACAO = os.environ.get('TABELAS_GERACAO', 'tabelas.geracao')
+FORMATO_SNAPSHOT = 4
+INTERVALO_SINCRONIZACAO = float(os.environ.get('TABELAS_SINCRONIZACAO', 1.0))
+# Pastas cujas subpastas (uma por marco, por exemplo) só são lidas quando alguma tabela delas é usada
+SUBARVORES_SOB_DEMANDA = ('marcos_paisagem',)
+
+_AUSENTE = object()
+
+
+def normalizar_caminho(caminho: str) -> str:
+    """Normaliza um caminho para ser usado como chave do registro."""
+    return os.path.normpath(caminho)
+
+
+def _sob_demanda(caminho: str) -> bool:
+    """Indica se o arquivo está em uma subpasta de SUBARVORES_SOB_DEMANDA (ex.: marcos_paisagem/<marco>/)."""
+    partes = caminho.split(os.sep)
+    return len(partes) >= 3 and partes[-3] in SUBARVORES_SOB_DEMANDA
+
+
+class _TabelaSobDemanda:
+    """
+    Tabela de uma subárvore sob demanda: na carga fica só o stat do arquivo (mtime e tamanho);
+    o arquivo é lido e processado no primeiro uso.
+    """
+    __slots__ = ('mtime_ns', 'tamanho')
+
+    def __init__(self, mtime_ns: int, tamanho: int):
+        self.mtime_ns = mtime_ns
+        self.tamanho = tamanho
+
+
+def _processar_sob_demanda(caminho: str):
+    """
+    Lê e processa uma tabela sob demanda, devolvendo o json.JSONDecodeError se ela for inválida
+    e _AUSENTE se o arquivo tiver sido removido depois da carga.
+    """
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return _AUSENTE
+    except json.JSONDecodeError as e:
+        print(f"Erro ao processar o arquivo JSON '{caminho}': {e}")
+        return e
+
+
+class _Carga:
+    """Uma versão completa das tabelas, junto com os sorteadores e hashes já calculados a partir dela."""
+    __slots__ = ('tabelas', 'amostradores', 'tabelas_d20', 'versoes', 'processadas')
+
+    def __init__(self, tabelas: dict, amostradores: dict = None, tabelas_d20: dict = None):
+        self.tabelas = tabelas
+        self.amostradores = dict(amostradores or {})
+        self.tabelas_d20 = tabelas_d20 if tabelas_d20 is not None else compilar_tabelas_d20(tabelas)
+        self.versoes = {}
+        self.processadas = {}  # tabelas sob demanda já processadas
+
+
+def _eh_tabela_de_pesos(tabela) -> bool:
+    return formato(tabela) in (PESOS, CATEGORIAS_POR_PESO)
+
+
+def compilar_amostradores(tabelas: dict) -> dict:
+    """Pré-compila os sorteadores de todas as tabelas de pesos e das subtabelas (raridades, terrenos)."""
+    amostradores = {}
+    for caminho, tabela in tabelas.items():
+        if _eh_tabela_de_pesos(tabela):
+            amostradores[(caminho,)] = AmostradorPesos(tabela)
+        elif isinstance(tabela, dict):
+            for chave, subtabela in tabela.items():
+                if _eh_tabela_de_pesos(subtabela):
+                    amostradores[(caminho, chave)] = AmostradorPesos(subtabela)
+    return amostradores
+
+
+def _compilar_d20(compiladas: dict, chave: tuple, construtor, tabela: dict):
+    """Compila uma tabela de faixas e avisa sobre faces sem resultado ou cobertas mais de uma vez."""
+    nome = ' / '.join(chave)
+    try:
+        tabela_d20 = construtor(tabela)
+    except (ValueError, TypeError) as e:
+        print(f"AVISO: faixas de d20 inválidas em {nome}: {e}")
+        return
+    if tabela_d20.lacunas:
+        print(f"AVISO: faces do d20 sem resultado em {nome}: {list(tabela_d20.lacunas)}")
+    if tabela_d20.sobreposicoes:
+        print(f"AVISO: faces do d20 em mais de uma faixa em {nome} (vale a primeira): {list(tabela_d20.sobreposicoes)}")
+    compiladas[chave] = tabela_d20
+
+
+def compilar_tabelas_d20(tabelas: dict) -> dict:
+    """
+    Converte as tabelas no formato de faixas do d20 em TabelaD20, validando lacunas e sobreposições:
+    horario.json, os terrenos de tipos_encontro.json em faixas e os categories.json em faixas.
+    """
+    compiladas = {}
+    for caminho, tabela in tabelas.items():
+        if not isinstance(tabela, dict) or not tabela:
+            continue
+        if caminho == 'horario.json':
+            _compilar_d20(compiladas, (caminho,), TabelaD20.por_valor, tabela)
+        elif caminho == 'tipos_encontro.json':
+            for terreno, subtabela in tabela.items():
+                if formato(subtabela) == FAIXAS_POR_VALOR:
+                    _compilar_d20(compiladas, (caminho, terreno), TabelaD20.por_valor, subtabela)
+        elif (caminho.split(os.sep)[-2:] == ['creatures', 'categories.json']
+                and formato(tabela) == FAIXAS_POR_CHAVE):
+            _compilar_d20(compiladas, (caminho,), TabelaD20.por_chave, tabela)
+    return compiladas
+
+
+class RegistroTabelas:
+    """
+    Lê toda a árvore de tabelas JSON uma única vez e serve os dados já processados da memória.
+    Cada (re)carga monta um dicionário novo que substitui o anterior de uma só vez,
+    junto com o cache de sorteadores, então uma rolagem em andamento nunca vê uma
+    mistura de versões.
+    As tabelas são compartilhadas entre requisições e não devem ser modificadas por quem as lê.
+    Das subpastas de SUBARVORES_SOB_DEMANDA (os marcos de cada terreno) a carga guarda só o stat
+    de cada arquivo; cada um é lido e processado quando a tabela é usada pela primeira vez.
+
+    Se existir um snapshot compilado ('python tabelas.py compilar') e ele ainda corresponder
+    aos arquivos no disco, a carga é feita dele em uma única leitura; caso contrário,
+    os arquivos JSON soltos são lidos normalmente.
+
+    Com vários processos (ex.: workers do gunicorn), o que é compartilhado é só o sinal de recarga:
+    cada processo continua com a sua própria cópia das tabelas na memória, e o snapshot só poupa
+    o trabalho de ler e processar os JSON. Um processo que chama 'publicar' regrava o arquivo de
+    geração (e recompila o snapshot, se houver um); os outros percebem a troca em 'sincronizar'
+    e recarregam.
+    """
+
+    def __init__(self, raiz: str = RAIZ_TABELAS, avulsos=ARQUIVOS_AVULSOS, snapshot: str = CAMINHO_SNAPSHOT,
+                 geracao: str = CAMINHO_GERACAO):
+        self.raiz = raiz
+        self.avulsos = list(avulsos)
+        self.snapshot = snapshot
+        self.arquivo_geracao = geracao
+        self.origem = None
+        self.intervalo_sincronizacao = INTERVALO_SINCRONIZACAO
+        self._carga = None
+        self._geracao = None
+        self._proxima_sincronizacao = 0.0
+        self._ao_recarregar = []
+        self._lock = threading.Lock()
+        self._lock_escrita = threading.Lock()  # uma troca de carga por vez (recarga completa ou incremental)
+
+    def _listar_arquivos(self):
+        """Lista os arquivos avulsos e todos os .json dentro da raiz."""
+        caminhos = list(self.avulsos)
+        for pasta, _, arquivos in os.walk(self.raiz):
+            caminhos.extend(os.path.join(pasta, nome) for nome in sorted(arquivos) if nome.endswith('.json'))
+        return caminhos
+
+    @staticmethod
+    def _ler_arquivo(caminho: str):
+        """
+        Lê e processa um arquivo; devolve o json.JSONDecodeError se for inválido e _AUSENTE se não existir.
+        Os arquivos das subárvores sob demanda não são lidos: fica só o stat deles.
+        """
+        try:
+            if _sob_demanda(normalizar_caminho(caminho)):
+                info = os.stat(caminho)
+                return _TabelaSobDemanda(info.st_mtime_ns, info.st_size)
+            with open(caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return _AUSENTE
+        except json.JSONDecodeError as e:
+            print(f"Erro ao processar o arquivo JSON '{caminho}': {e}")
+            return e
+
+    def _ler_arvore(self) -> dict:
+        """Lê e processa todos os arquivos, guardando o erro de quem tiver JSON inválido."""
+        tabelas = {}
+        for caminho in self._listar_arquivos():
+            tabela = self._ler_arquivo(caminho)
+            if tabela is not _AUSENTE:
+                tabelas[normalizar_caminho(caminho)] = tabela
+        return tabelas
+
+    def vigiado(self, caminho: str) -> bool:
+        """Indica se o caminho (relativo, já normalizado) é uma tabela do registro: um avulso ou um .json da raiz."""
+        return (caminho in (normalizar_caminho(a) for a in self.avulsos)
+                or (caminho.endswith('.json') and caminho.startswith(normalizar_caminho(self.raiz) + os.sep)))
+
+    def estado_arquivos(self) -> dict:
+        """mtime e tamanho de cada arquivo de tabela no disco ({caminho: (mtime_ns, tamanho)})."""
+        arquivos = {}
+        for caminho in self._listar_arquivos():
+            try:
+                info = os.stat(caminho)
+            except FileNotFoundError:
+                continue
+            arquivos[normalizar_caminho(caminho)] = (info.st_mtime_ns, info.st_size)
+        return arquivos
+
+    # ----- Snapshot compilado -----
+
+    def _manifesto(self):
+        """Registra mtime/tamanho de cada arquivo e o mtime de cada pasta, para detectar snapshots desatualizados."""
+        arquivos = self.estado_arquivos()
+        pastas = {normalizar_caminho(pasta): os.stat(pasta).st_mtime_ns for pasta, _, _ in os.walk(self.raiz)}
+        ausentes = [a for a in self.avulsos if normalizar_caminho(a) not in arquivos]
+        return {'arquivos': arquivos, 'pastas': pastas, 'ausentes': ausentes}
+
+    @staticmethod
+    def _manifesto_confere(manifesto: dict) -> bool:
+        """Confere o manifesto com o disco usando apenas stat (uma pasta com arquivos novos muda de mtime)."""
+        try:
+            for caminho, (mtime, tamanho) in manifesto['arquivos'].items():
+                info = os.stat(caminho)
+                if info.st_mtime_ns != mtime or info.st_size != tamanho:
+                    return False
+            for pasta, mtime in manifesto['pastas'].items():
+                if os.stat(pasta).st_mtime_ns != mtime:
+                    return False
+        except FileNotFoundError:
+            return False
+        return not any(os.path.exists(caminho) for caminho in manifesto['ausentes'])
+
+    def _ler_snapshot(self, somente_cabecalho: bool = False):
+        """
+        Lê o snapshot em uma única leitura. O arquivo tem dois pickles: o cabeçalho (formato e
+        manifesto) e o conteúdo. Retorna None se ele não existir, for inválido ou estiver desatualizado.
+        """
+        try:
+            with open(self.snapshot, 'rb') as f:
+                cabecalho = pickle.load(f)
+                if cabecalho.get('formato') != FORMATO_SNAPSHOT or cabecalho.get('raiz') != self.raiz:
+                    return None
+                if not self._manifesto_confere(cabecalho['manifesto']):
+                    print(f"AVISO: snapshot '{self.snapshot}' desatualizado, lendo os arquivos JSON")
+                    return None
+                return cabecalho if somente_cabecalho else pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"AVISO: snapshot '{self.snapshot}' inválido, lendo os arquivos JSON: {e}")
+            return None
+
+    def snapshot_atualizado(self) -> bool:
+        """Indica se existe um snapshot que corresponde aos arquivos atuais (lê só o cabeçalho)."""
+        return self._ler_snapshot(somente_cabecalho=True) is not None
+
+    def compilar(self, destino: str = None) -> int:
+        """
+        Lê e valida toda a árvore e grava o snapshot (tabelas + sorteadores e tabelas de d20 pré-compilados).
+        Levanta ValueError se algum arquivo tiver JSON inválido. Retorna o nº de tabelas.
+        """
+        destino = destino or self.snapshot
+        manifesto = self._manifesto()
+        tabelas = self._ler_arvore()
+        erros = [caminho for caminho, tabela in tabelas.items()
+                 if isinstance(tabela, json.JSONDecodeError)
+                 or (isinstance(tabela, _TabelaSobDemanda)
+                     and isinstance(_processar_sob_demanda(caminho), json.JSONDecodeError))]
+        if erros:
+            raise ValueError(f"JSON inválido em: {', '.join(erros)}")
+
+        cabecalho = {'formato': FORMATO_SNAPSHOT, 'raiz': self.raiz, 'manifesto': manifesto}
+        conteudo = {
+            'tabelas': tabelas,
+            'amostradores': compilar_amostradores(tabelas),
+            'tabelas_d20': compilar_tabelas_d20(tabelas),
+        }
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        with open(temporario, 'wb') as f:
+            pickle.dump(cabecalho, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(conteudo, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, destino)  # troca atômica: quem lê nunca vê um arquivo pela metade
+        return len(tabelas)
+
+    # ----- Carga -----
+
+    @staticmethod
+    def _identificar(caminho: str):
+        """Identifica a versão atual de um arquivo; muda a cada regravação com os.replace (novo inode)."""
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError:
+            return None
+        return (info.st_ino, info.st_mtime_ns)
+
+    def _geracao_atual(self):
+        """Geração das tabelas vista por todos os processos: o arquivo de geração e o snapshot."""
+        return (self._identificar(self.arquivo_geracao), self._identificar(self.snapshot))
+
+    def _marcar_geracao(self):
+        """Regrava o arquivo de geração para que os outros processos recarreguem em 'sincronizar'."""
+        temporario = f"{self.arquivo_geracao}.{os.getpid()}.tmp"
+        try:
+            with open(temporario, 'w') as f:
+                f.write(f"{os.getpid()} {time.time_ns()}\n")
+            os.replace(temporario, self.arquivo_geracao)
+        except OSError as e:
+            print(f"Erro ao gravar o arquivo de geração '{self.arquivo_geracao}': {e}")
+
+    def _nova_carga(self) -> _Carga:
+        inicio = time.perf_counter()
+        self._geracao = self._geracao_atual()
+        dados = self._ler_snapshot()
+        if dados is not None:
+            self.origem = 'snapshot'
+            carga = _Carga(dados['tabelas'], dados['amostradores'], dados['tabelas_d20'])
+        else:
+            self.origem = 'json'
+            carga = _Carga(self._ler_arvore())
+        metricas.observar('tabelas_carga_segundos', time.perf_counter() - inicio, origem=self.origem)
+        return carga
+
+    def carregar(self):
+        """Carrega a árvore se ainda não tiver sido carregada."""
+        with self._lock:
+            if self._carga is None:
+                self._carga = self._nova_carga()
+        return self
+
+    def recarregar(self) -> int:
+        """Relê toda a árvore do disco e troca o conteúdo do registro. Retorna o nº de tabelas."""
+        with self._lock_escrita:
+            carga = self._nova_carga()
+            with self._lock:
+                self._carga = carga
+        for funcao in self._ao_recarregar:
+            funcao()
+        return len(carga.tabelas)
+
+    def atualizar(self, caminhos) -> int:
+        """
+        Recarga incremental: relê só os arquivos indicados (alterados, criados ou removidos) e troca
+        a carga atual, de uma só vez, por uma cópia com essas tabelas substituídas. Os sorteadores e
+        tabelas de d20 das demais tabelas são reaproveitados; os dos arquivos alterados são descartados
+        (os sorteadores voltam a ser compilados no primeiro uso) e as tabelas de d20, recompiladas.
+        Retorna o nº de tabelas atualizadas.
+        """
+        inicio = time.perf_counter()
+        chaves = {normalizar_caminho(c) for c in caminhos}
+        chaves = {c for c in chaves if self.vigiado(c)}
+        if not chaves:
+            return 0
+
+        with self._lock_escrita:
+            atual = self._atual()
+            tabelas = dict(atual.tabelas)
+            for chave in chaves:
+                tabela = self._ler_arquivo(chave)
+                if tabela is _AUSENTE:
+                    tabelas.pop(chave, None)
+                else:
+                    tabelas[chave] = tabela
+
+            alteradas = {chave: tabelas[chave] for chave in chaves if chave in tabelas}
+            amostradores = {k: v for k, v in atual.amostradores.items() if k[0] not in chaves}
+            tabelas_d20 = {k: v for k, v in atual.tabelas_d20.items() if k[0] not in chaves}
+            tabelas_d20.update(compilar_tabelas_d20(alteradas))
+
+            carga = _Carga(tabelas, amostradores, tabelas_d20)
+            carga.processadas = {k: v for k, v in atual.processadas.items() if k not in chaves}
+            with self._lock:
+                self._carga = carga
+
+        for funcao in self._ao_recarregar:
+            funcao()
+        metricas.observar('tabelas_carga_segundos', time.perf_counter() - inicio, origem='incremental')
+        return len(chaves)
+
+    def ao_recarregar(self, funcao):
+        """Registra uma função a ser chamada depois de cada recarga (ex.: limpar caches derivados)."""
+        self._ao_recarregar.append(funcao)
+        return funcao
+
+    def sincronizar(self) -> bool:
+        """
+        Recarrega se outro processo publicou tabelas novas (ou regravou o snapshot) desde a última carga.
+        Faz no máximo um stat a cada 'intervalo_sincronizacao' segundos. Retorna True se recarregou.
+        """
+        agora = time.monotonic()
+        if self._carga is None or agora < self._proxima_sincronizacao:
+            return False
+        self._proxima_sincronizacao = agora + self.intervalo_sincronizacao
+        if self._geracao_atual() == self._geracao:
+            return False
+        self.recarregar()
+        return True
+
+    def publicar(self) -> int:
+        """
+        Recarrega as tabelas para todos os processos: se houver um snapshot, ele é recompilado,
+        e o arquivo de geração é regravado; os outros processos recarregam em 'sincronizar'.
+        """
+        if os.path.exists(self.snapshot):
+            try:
+                self.compilar()
+            except ValueError as e:
+                print(f"Erro ao recompilar o snapshot: {e}")
+        self._marcar_geracao()
+        return self.recarregar()
+
+    def _atual(self) -> _Carga:
+        carga = self._carga
+        if carga is None:
+            carga = self.carregar()._carga
+        return carga
+
+    @staticmethod
+    def _buscar(carga: _Carga, caminho: str):
+        chave = normalizar_caminho(caminho)
+        tabela = carga.tabelas.get(chave, _AUSENTE)
+        if tabela is _AUSENTE:
+            raise FileNotFoundError(f"Tabela não encontrada: {caminho}")
+        if isinstance(tabela, _TabelaSobDemanda):
+            if chave not in carga.processadas:
+                carga.processadas[chave] = _processar_sob_demanda(chave)
+            processada = carga.processadas[chave]
+            if processada is _AUSENTE:
+                raise FileNotFoundError(f"Tabela não encontrada: {caminho}")
+            tabela = processada
+        if isinstance(tabela, json.JSONDecodeError):
+            raise json.JSONDecodeError(tabela.msg, tabela.doc, tabela.pos)
+        return tabela
+
+    def get(self, caminho: str):
+        """
+        Devolve a tabela já processada. Levanta FileNotFoundError se o arquivo não existia
+        na última carga, ou o json.JSONDecodeError original se o arquivo era inválido.
+        """
+        return self._buscar(self._atual(), caminho)
+
+    def amostrador(self, caminho: str, *chaves) -> AmostradorPesos:
+        """
+        Devolve o sorteador compilado da tabela (ou de uma subtabela, navegando por 'chaves').
+        É compilado na primeira vez e reaproveitado até a próxima recarga.
+        """
+        carga = self._atual()
+        chave_cache = (normalizar_caminho(caminho),) + chaves
+        amostrador = carga.amostradores.get(chave_cache)
+        if amostrador is None:
+            tabela = self._buscar(carga, caminho)
+            for chave in chaves:
+                tabela = tabela[chave]
+            amostrador = AmostradorPesos(tabela)
+            carga.amostradores[chave_cache] = amostrador
+        return amostrador
+
+    def tabela_d20(self, caminho: str, *chaves):
+        """
+        Devolve a TabelaD20 pré-compilada de uma tabela de faixas (ou de uma subtabela, pelas 'chaves'),
+        ou None se a tabela não existir, não estiver no formato de faixas ou tiver faixas inválidas.
+        """
+        return self._atual().tabelas_d20.get((normalizar_caminho(caminho),) + chaves)
+
+    def versao(self, *prefixos: str) -> str:
+        """
+        Hash do conteúdo das tabelas indicadas (arquivos ou pastas inteiras).
+        Muda sempre que uma dessas tabelas é editada, criada ou removida (após a recarga).
+        """
+        carga = self._atual()
+        prefixos = tuple(normalizar_caminho(p) for p in prefixos)
+        versao = carga.versoes.get(prefixos)
+        if versao is None:
+            h = hashlib.sha256()
+            pastas = tuple(p + os.sep for p in prefixos)
+            for caminho in sorted(carga.tabelas):
+                if caminho in prefixos or caminho.startswith(pastas):
+                    tabela = carga.tabelas[caminho]
+                    h.update(caminho.encode())
+                    if isinstance(tabela, _TabelaSobDemanda):
+                        # Hash do stat, para não ler as tabelas sob demanda só para calcular a versão
+                        h.update(f"{tabela.mtime_ns}:{tabela.tamanho}".encode())
+                        continue
+                    conteudo = tabela.doc if isinstance(tabela, json.JSONDecodeError) else tabela
+                    h.update(json.dumps(conteudo, sort_keys=True, ensure_ascii=False).encode())
+            versao = h.hexdigest()[:16]
+            carga.versoes[prefixos] = versao
+        return versao
+
+    def existe(self, caminho: str) -> bool:
+        """Indica se a tabela existia na última carga."""
+        return normalizar_caminho(caminho) in self._atual().tabelas
+
+    def listar(self, pasta: str) -> list:
+        """Caminhos (em ordem) de todas as tabelas dentro da pasta, sem processar as tabelas sob demanda."""
+        prefixo = normalizar_caminho(pasta) + os.sep
+        return sorted(caminho for caminho in self._atual().tabelas if caminho.startswith(prefixo))
+
+    def __len__(self):
+        return len(self._atual().tabelas)
+
+
+registro = RegistroTabelas()
+
+
+def load_json(caminho: str):
+    """Atalho para ler uma tabela do registro compartilhado."""
+    return registro.get(caminho)
+
+
+if __name__ == '__main__':
+    # Uso: python tabelas.py compilar [destino]
+    if len(sys.argv) < 2 or sys.argv[1] != 'compilar':
+        print("Uso: python tabelas.py compilar [destino]")
+        sys.exit(1)
+    destino = sys.argv[2] if len(sys.argv) > 2 else CAMINHO_SNAPSHOT
+    try:
+        total = registro.compilar(destino)
+    except ValueError as e:
+        print(f"Erro ao compilar o snapshot: {e}")
+        sys.exit(1)
+    print(f"Snapshot '{destino}' gravado com {total} tabelas")
@@ -0,0 +1,29 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Os módulos do app ficam na raiz do repositório, sem pacote, e leem as tabelas a partir da pasta atual
+RAIZ_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ_REPOSITORIO)
+os.chdir(RAIZ_REPOSITORIO)
+# Os relatórios das viagens dos testes não entram no arquivo de viagens de verdade
+os.environ.setdefault('RELATORIOS_DB', os.path.join(tempfile.mkdtemp(prefix='testes-'), 'relatorios.db'))
+
+
+class RngFixo:
+    """Gerador que sempre devolve o mesmo valor em 'uniform', para testar os limites da busca binária."""
+
+    def __init__(self, valor):
+        self.valor = valor
+
+    def uniform(self, a, b):
+        return self.valor
+
+
+@pytest.fixture
+def rng_fixo():
+    """Fábrica de RngFixo: rng_fixo(0.5) sorteia sempre 0.5."""
+    return RngFixo
@@ -0,0 +1,122 @@
+# tests/test_cache_resultados.py
+import os
+import sqlite3
+
+import pytest
+
+import cache_resultados
+from cache_resultados import CacheResultados
+
+
+class _Relogio:
+    """Substitui time.time() do módulo para avançar o tempo sem esperar."""
+
+    def __init__(self, agora=1_000_000.0):
+        self.agora = agora
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = _Relogio()
+    monkeypatch.setattr(cache_resultados.time, 'time', relogio)
+    return relogio
+
+
+# ========== MEMÓRIA (LRU + TTL) ==========
+
+def test_lru_descarta_o_menos_usado():
+    cache = CacheResultados(maximo=2)
+    cache.set(('a', 1), 'A')
+    cache.set(('b', 1), 'B')
+    assert cache.get(('a', 1)) == 'A'  # 'a' passa a ser o mais recente
+    cache.set(('c', 1), 'C')
+
+    assert cache.get(('b', 1)) is None
+    assert cache.get(('a', 1)) == 'A'
+    assert cache.get(('c', 1)) == 'C'
+    assert len(cache) == 2
+
+
+def test_ttl_expira(relogio):
+    cache = CacheResultados(ttl=10)
+    cache.set(('a', 1), 'A')
+    relogio.agora += 9
+    assert cache.get(('a', 1)) == 'A'
+    relogio.agora += 2
+    assert cache.get(('a', 1)) is None
+    assert len(cache) == 0
+
+
+def test_sem_ttl_nao_expira(relogio):
+    cache = CacheResultados(ttl=None)
+    cache.set(('a', 1), 'A')
+    relogio.agora += 10 ** 9
+    assert cache.get(('a', 1)) == 'A'
+
+
+# ========== CAMADA EM DISCO ==========
+
+def test_disco_sobrevive_a_uma_nova_instancia(tmp_path):
+    caminho = str(tmp_path / 'cache.db')
+    CacheResultados(caminho_disco=caminho).set(('floresta', 7, 'v1'), {'nome': 'Ruína'})
+
+    novo = CacheResultados(caminho_disco=caminho)
+    assert len(novo) == 0
+    assert novo.get(('floresta', 7, 'v1')) == {'nome': 'Ruína'}
+    assert len(novo) == 1  # promovido para a memória
+    assert novo.get(('floresta', 7, 'v2')) is None
+
+
+def test_disco_codifica_e_decodifica(tmp_path):
+    caminho = str(tmp_path / 'cache.db')
+    opcoes = dict(caminho_disco=caminho, codificar=lambda v: list(v), decodificar=lambda v: tuple(v))
+    CacheResultados(**opcoes).set(('k',), (1, 2, 3))
+    assert CacheResultados(**opcoes).get(('k',)) == (1, 2, 3)
+
+
+def test_disco_respeita_o_ttl(tmp_path, relogio):
+    caminho = str(tmp_path / 'cache.db')
+    CacheResultados(ttl=10, caminho_disco=caminho).set(('a',), 'A')
+    relogio.agora += 11
+    assert CacheResultados(ttl=10, caminho_disco=caminho).get(('a',)) is None
+
+
+def test_disco_apaga_as_linhas_expiradas(tmp_path, relogio):
+    caminho = str(tmp_path / 'cache.db')
+    cache = CacheResultados(ttl=100, caminho_disco=caminho)
+    cache.set(('velha',), 'V')
+    relogio.agora += 150
+    cache.set(('nova',), 'N')  # passou mais de ttl/10 desde a última limpeza
+
+    with sqlite3.connect(caminho) as banco:
+        chaves = [linha[0] for linha in banco.execute("SELECT chave FROM resultados")]
+    assert chaves == ['["nova"]']
+
+
+def test_limpar_esvazia_as_duas_camadas(tmp_path):
+    caminho = str(tmp_path / 'cache.db')
+    cache = CacheResultados(caminho_disco=caminho)
+    cache.set(('a',), 'A')
+    cache.limpar()
+    assert cache.get(('a',)) is None
+    assert CacheResultados(caminho_disco=caminho).get(('a',)) is None
+
+
+def test_conexao_aberta_so_no_primeiro_uso_e_por_processo(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'cache.db')
+    cache = CacheResultados(caminho_disco=caminho)
+    assert cache._disco is None
+    assert not os.path.exists(caminho)
+
+    cache.set(('a',), 'A')
+    primeira = cache._disco
+    assert primeira is not None
+
+    # Depois de um fork o pid muda: o processo filho abre a própria conexão
+    monkeypatch.setattr(cache_resultados.os, 'getpid', lambda: -1)
+    cache._memoria.clear()
+    assert cache.get(('a',)) == 'A'
+    assert cache._disco is not primeira
@@ -0,0 +1,126 @@
+# tests/test_hex.py
+from dataclasses import replace
+
+import pytest
+
+import hex as hexmap
+
+
+@pytest.fixture
+def cliente():
+    return hexmap.app.test_client()
+
+
+@pytest.fixture
+def pool_de_teste(monkeypatch):
+    """Força o uso do pool de processos mesmo em mapas pequenos e o encerra no fim do teste."""
+    monkeypatch.setattr(hexmap, 'MAX_PROCESSOS_MAPA', 2)
+    monkeypatch.setattr(hexmap, 'MIN_HEXES_POR_PROCESSO', 1)
+    monkeypatch.setattr(hexmap, '_pool_mapas', None)
+    monkeypatch.setattr(hexmap, '_pid_pool_mapas', None)
+    yield
+    if hexmap._pool_mapas is not None:
+        hexmap._pool_mapas.shutdown()
+
+
+# ========== MAPAS EM LOTE ==========
+
+def test_hexmap_retangulo_em_coordenadas_axiais(cliente):
+    resposta = cliente.get('/api/hexmap?terrain=floresta&width=3&height=2&seed=5')
+    assert resposta.status_code == 200
+    dados = resposta.get_json()
+    assert dados['terreno'] == 'floresta'
+    assert dados['seed'] == 5
+    esperadas = {"%d,%d" % hexmap.offset_para_axial(col, row) for row in range(2) for col in range(3)}
+    assert set(dados['hexes']) == esperadas
+
+
+def test_hexmap_mesma_seed_mesmo_mapa(cliente):
+    primeiro = cliente.get('/api/hexmap?terrain=floresta&width=4&height=4&seed=11').get_json()
+    segundo = cliente.get('/api/hexmap?terrain=floresta&width=4&height=4&seed=11').get_json()
+    assert primeiro == segundo
+
+
+def test_hexmap_celula_repete_sozinha():
+    mapa = hexmap.generate_hex_map([(0, 0, 'floresta'), (1, 0, 'floresta')], seed=3)
+    celula = hexmap.generate_hex_map([(1, 0, 'floresta')], seed=3)
+    assert celula['1,0'] == mapa['1,0']
+
+
+@pytest.mark.parametrize('consulta', ['width=0&height=2', 'width=-1&height=2', 'width=1000&height=1000'])
+def test_hexmap_dimensoes_invalidas(cliente, consulta):
+    assert cliente.get(f'/api/hexmap?terrain=floresta&{consulta}').status_code == 400
+
+
+def test_hexmap_post_um_terreno_por_celula(cliente):
+    celulas = [{'q': 0, 'r': 0, 'terrain': 'floresta'}, {'q': 1, 'r': -1, 'terrain': 'deserto'}]
+    dados = cliente.post('/api/hexmap?seed=2', json={'cells': celulas}).get_json()
+    assert set(dados['hexes']) == {'0,0', '1,-1'}
+    assert dados['hexes']['0,0']['terreno'] == 'floresta'
+    assert dados['hexes']['1,-1']['terreno'] == 'deserto'
+
+
+@pytest.mark.parametrize('celulas', [
+    [{'q': 0, 'r': 0}],
+    [{'q': 'x', 'r': 0, 'terrain': 'floresta'}],
+    [{'q': 0, 'r': 0, 'terrain': ['floresta']}],
+    ['0,0'],
+])
+def test_hexmap_post_celulas_invalidas(cliente, celulas):
+    assert cliente.post('/api/hexmap', json={'cells': celulas}).status_code == 400
+
+
+def test_hexmap_com_processos_gera_o_mesmo_mapa(pool_de_teste):
+    celulas = [(q, r, 'floresta') for q in range(4) for r in range(3)]
+    sozinho = hexmap.generate_hex_map(celulas, workers=1, seed=9)
+    com_pool = hexmap.generate_hex_map(celulas, workers=8, seed=9)
+    assert com_pool == sozinho
+
+    pool = hexmap._pool_mapas
+    assert pool is not None and pool._max_workers == 2  # 'workers' limitado a MAX_PROCESSOS_MAPA
+    hexmap.generate_hex_map(celulas, workers=2, seed=9)
+    assert hexmap._pool_mapas is pool  # reaproveitado entre requisições
+
+
+# ========== CACHE DE HEXÁGONOS ==========
+
+@pytest.fixture
+def cache_vazio():
+    hexmap.cache_hexes.limpar()
+    yield hexmap.cache_hexes
+    hexmap.cache_hexes.limpar()
+
+
+def test_cache_reaproveita_o_hexagono_da_seed(cache_vazio):
+    primeiro = hexmap.generate_hex_cached('floresta', 42)
+    assert len(cache_vazio) == 1
+    assert hexmap.generate_hex_cached('floresta', 42) is primeiro
+    assert primeiro == replace(hexmap.generate_hex_description('floresta', rng=hexmap.random.Random(42)), seed=42)
+
+
+def test_cache_muda_com_a_versao_das_tabelas(cache_vazio, monkeypatch):
+    primeiro = hexmap.generate_hex_cached('floresta', 42)
+    monkeypatch.setattr(hexmap, 'versao_tabelas_hex', lambda terrain: 'outra-versao')
+    segundo = hexmap.generate_hex_cached('floresta', 42)
+    assert segundo is not primeiro
+    assert segundo == primeiro
+    assert len(cache_vazio) == 2
+
+
+def test_cache_ignora_terrenos_desconhecidos(cache_vazio):
+    hex_data = hexmap.generate_hex_cached('atlantida', 1)
+    assert hex_data.erro is not None
+    assert hex_data.seed == 1
+    assert len(cache_vazio) == 0
+
+
+def test_replay_da_seed_mostra_o_mesmo_hexagono(cliente, cache_vazio):
+    primeira = cliente.get('/hex/floresta/77')
+    segunda = cliente.get('/hex/floresta/77')
+    assert primeira.status_code == segunda.status_code == 200
+    assert primeira.data == segunda.data
+
+
+def test_post_sem_terreno_mostra_a_pagina_de_erro(cliente, cache_vazio):
+    assert cliente.post('/generate', data={}).status_code == 200
+    assert len(cache_vazio) == 0
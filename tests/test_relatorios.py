@@ -0,0 +1,191 @@
+# tests/test_relatorios.py
+import os
+
+import pytest
+
+import relatorios
+from relatorios import GravadorRelatorios, novo_id
+
+
+@pytest.fixture
+def gravador(tmp_path):
+    gravador = GravadorRelatorios(pasta=str(tmp_path / 'logs'), caminho_banco=str(tmp_path / 'relatorios.db'))
+    gravador.espera_tentativa = 0
+    return gravador
+
+
+def _falhar_com(erro):
+    def falhar(*args):
+        raise erro
+    return falhar
+
+
+# ========== GRAVAÇÃO EM SEGUNDO PLANO ==========
+
+def test_relatorio_legivel_antes_e_depois_de_gravado(gravador):
+    nome = gravador.enviar('viagem_a.txt', 'Dia 1: nada', {'terreno': 'floresta'})
+    assert gravador.ler(nome) == 'Dia 1: nada'
+    gravador.esvaziar()
+    assert gravador._pendentes == {}
+    assert gravador.ler(nome) == 'Dia 1: nada'
+
+
+def test_ler_recusa_caminhos_e_nomes_inexistentes(gravador):
+    gravador.enviar('viagem_a.txt', 'x')
+    gravador.esvaziar()
+    assert gravador.ler('../viagem_a.txt') is None
+    assert gravador.ler('nao_existe.txt') is None
+
+
+def test_ids_nao_colidem():
+    assert len({novo_id() for _ in range(10_000)}) == 10_000
+
+
+def test_destino_arquivos_grava_um_arquivo_por_relatorio(tmp_path):
+    gravador = GravadorRelatorios(pasta=str(tmp_path / 'logs'), destino='arquivos')
+    gravador.enviar('a.txt', 'A')
+    gravador.enviar('b.txt', 'B')
+    gravador.esvaziar()
+    assert sorted(os.listdir(tmp_path / 'logs')) == ['a.txt', 'b.txt']
+    assert gravador.ler('b.txt') == 'B'
+
+
+def test_destino_desconhecido():
+    with pytest.raises(ValueError):
+        GravadorRelatorios(destino='s3')
+
+
+def test_fila_limitada(gravador):
+    assert gravador._fila.maxsize == relatorios.MAX_FILA > 0
+
+
+def test_falha_passageira_e_gravada_de_novo(gravador, monkeypatch):
+    gravar = gravador._gravar
+    chamadas = []
+
+    def falhar_uma_vez(lote):
+        chamadas.append(len(lote))
+        if len(chamadas) == 1:
+            # O relatório continua pendente (e legível) enquanto não é gravado
+            assert gravador.ler('a.txt') == 'A'
+            raise OSError("disco cheio")
+        gravar(lote)
+
+    monkeypatch.setattr(gravador, '_gravar', falhar_uma_vez)
+    gravador.enviar('a.txt', 'A', {'terreno': 'floresta'})
+    gravador.esvaziar()
+
+    assert len(chamadas) == 2
+    assert gravador.buscar()['viagens'][0]['nome'] == 'a.txt'
+
+
+def test_banco_indisponivel_recorre_a_pasta(gravador, monkeypatch, caplog):
+    gravador.tentativas = 2
+    monkeypatch.setattr(gravador, '_conexao', _falhar_com(relatorios.sqlite3.OperationalError("travado")))
+    gravador.enviar('a.txt', 'A', {'terreno': 'floresta'})
+    gravador.esvaziar()
+
+    assert os.path.exists(os.path.join(gravador.pasta, 'a.txt'))
+    assert gravador.ler('a.txt') == 'A'
+    assert "gravados em" in caplog.text
+
+
+def test_relatorio_perdido_e_registrado(tmp_path, monkeypatch, caplog):
+    gravador = GravadorRelatorios(pasta=str(tmp_path / 'logs'), destino='arquivos')
+    gravador.espera_tentativa = 0
+    gravador.tentativas = 2
+    monkeypatch.setattr(gravador, '_gravar', _falhar_com(OSError("somente leitura")))
+    gravador.enviar('a.txt', 'A')
+    gravador.esvaziar()
+
+    assert gravador.ler('a.txt') is None
+    assert "Relatórios perdidos" in caplog.text and 'a.txt' in caplog.text
+
+
+# ========== BUSCA E EXPORTAÇÃO ==========
+
+@pytest.fixture
+def arquivo(gravador):
+    """Seis viagens gravadas: três na floresta (de dia) e três no deserto (à noite), em dias seguidos."""
+    for i in range(6):
+        terreno, periodo = ('floresta', 'dia') if i % 2 == 0 else ('deserto', 'noite')
+        encontros = [(1, 'creatures', 'Manhã', 'Lobo'), (3, 'event', 'Tarde', 'Chuva')] if i < 3 else []
+        gravador.enviar(f'viagem_{i}.txt', f'relatório {i}', {
+            'terreno': terreno, 'dias': 5, 'periodo': periodo, 'seed': i,
+            'criado': f'2024-03-0{i + 1} 12:00:00', 'encontros': encontros,
+        })
+    gravador.esvaziar()
+    return gravador
+
+
+def _nomes(pagina):
+    return [viagem['nome'] for viagem in pagina['viagens']]
+
+
+def test_busca_da_mais_recente_para_a_mais_antiga(arquivo):
+    pagina = arquivo.buscar()
+    assert _nomes(pagina) == [f'viagem_{i}.txt' for i in range(5, -1, -1)]
+    assert pagina['proximo'] is None
+    assert pagina['viagens'][-1] == {
+        'nome': 'viagem_0.txt', 'terreno': 'floresta', 'dias': 5, 'periodo': 'dia', 'seed': 0,
+        'criado': '2024-03-01 12:00:00', 'encontros': 2,
+    }
+
+
+def test_busca_paginada_por_cursor(arquivo):
+    vistas = []
+    antes = None
+    while True:
+        pagina = arquivo.buscar(limite=4, antes=antes)
+        vistas += _nomes(pagina)
+        antes = pagina['proximo']
+        if antes is None:
+            break
+    assert vistas == [f'viagem_{i}.txt' for i in range(5, -1, -1)]
+
+
+def test_busca_limite_entre_1_e_o_maximo(arquivo):
+    assert len(arquivo.buscar(limite=0)['viagens']) == 1
+    assert len(arquivo.buscar(limite=10 ** 6)['viagens']) == 6
+
+
+@pytest.mark.parametrize('filtros, esperados', [
+    ({'terreno': 'deserto'}, [5, 3, 1]),
+    ({'periodo': 'dia'}, [4, 2, 0]),
+    ({'tipo': 'event'}, [2, 1, 0]),
+    ({'terreno': 'floresta', 'tipo': 'creatures'}, [2, 0]),
+    ({'de': '2024-03-02', 'ate': '2024-03-04'}, [3, 2, 1]),  # datas inclusivas
+    ({'ate': '2024-03-01'}, [0]),
+    ({'de': '2024-04-01'}, []),
+])
+def test_busca_com_filtros(arquivo, filtros, esperados):
+    assert _nomes(arquivo.buscar(filtros)) == [f'viagem_{i}.txt' for i in esperados]
+
+
+def test_busca_com_data_invalida(arquivo):
+    with pytest.raises(ValueError):
+        arquivo.buscar({'de': '01/03/2024'})
+
+
+def test_exportar_traz_os_encontros_de_cada_viagem(arquivo):
+    viagens = list(arquivo.exportar({'terreno': 'floresta'}))
+    assert [viagem['nome'] for viagem in viagens] == ['viagem_0.txt', 'viagem_2.txt', 'viagem_4.txt']
+    assert viagens[0]['encontros'] == [
+        {'dia': 1, 'tipo': 'creatures', 'horario': 'Manhã', 'descricao': 'Lobo'},
+        {'dia': 3, 'tipo': 'event', 'horario': 'Tarde', 'descricao': 'Chuva'},
+    ]
+    assert viagens[2]['encontros'] == []
+
+
+def test_exportar_e_um_gerador(arquivo):
+    viagens = arquivo.exportar()
+    assert next(viagens)['nome'] == 'viagem_0.txt'
+    viagens.close()
+
+
+def test_busca_so_no_destino_sqlite(tmp_path):
+    gravador = GravadorRelatorios(pasta=str(tmp_path / 'logs'), destino='arquivos')
+    with pytest.raises(RuntimeError):
+        gravador.buscar()
+    with pytest.raises(RuntimeError):
+        next(gravador.exportar())
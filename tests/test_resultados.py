@@ -0,0 +1,25 @@
+# tests/test_resultados.py
+from resultados import Criatura, Encontro
+
+
+def test_criaturas_de_um_encontro_simples():
+    lobo = Criatura('Lobo', tipo='animal', raridade='comum')
+    encontro = Encontro('creatures_anomaly', 5, (lobo, 'Névoa densa'))
+    assert encontro.criatura is lobo
+    assert encontro.criaturas == (lobo,)
+
+
+def test_criaturas_do_double_roll_em_qualquer_nivel():
+    lobo = Criatura('Lobo', tipo='animal', raridade='comum')
+    urso = Criatura('Urso', tipo='animal', raridade='incomum')
+    espectro = Criatura('Espectro', tipo='espirito', raridade='raro')
+    interno = Encontro('double_roll', 3, (Encontro('creatures', 1, (urso,)), Encontro('event', 2, ('Chuva',))))
+    encontro = Encontro('double_roll', 7, (Encontro('creatures', 4, (lobo,)), interno,
+                                           Encontro('obstacle_creatures', 9, ('Ponte caída', espectro))))
+    assert encontro.criatura is None
+    assert encontro.criaturas == (lobo, urso, espectro)
+
+
+def test_encontro_sem_criaturas():
+    assert Encontro('event', 1, ('Chuva',)).criaturas == ()
+    assert Encontro(None, 1, mensagem="Encontro indefinido").criaturas == ()
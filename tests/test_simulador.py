@@ -0,0 +1,63 @@
+# tests/test_simulador.py
+import json
+
+import pytest
+
+# simulador.py usa o travel.py, que depende do gerador de equipamentos (fora deste repositório)
+pytest.importorskip('gerador_equipamentos')
+
+import simulador  # noqa: E402
+from resultados import Criatura, DiaViagem, Encontro  # noqa: E402
+
+
+def test_mesmo_resultado_com_qualquer_numero_de_workers():
+    sozinho = simulador.simular_campanha('floresta', days=10, viagens=40, workers=1, seed=123)
+    em_paralelo = simulador.simular_campanha('floresta', days=10, viagens=40, workers=3, seed=123)
+    assert em_paralelo['histogramas'] == sozinho['histogramas']
+    assert em_paralelo['totais']['encontros'] == sozinho['totais']['encontros']
+    assert sum(sozinho['histogramas']['encontros_por_viagem'].values()) == 40
+
+
+def test_blocos_somam_o_mesmo_que_a_campanha_inteira():
+    inteira = simulador.simular_viagens('floresta', 10, True, 7, 0, 30)
+    partes = [simulador.simular_viagens('floresta', 10, True, 7, i, i + 10) for i in (0, 10, 20)]
+    for nome in simulador.HISTOGRAMAS:
+        assert sum((parte[nome] for parte in partes), type(inteira[nome])()) == inteira[nome]
+
+
+def test_conta_as_criaturas_do_double_roll_e_ignora_erros(monkeypatch):
+    lobo = Criatura('Lobo', tipo='animal', raridade='comum')
+    urso = Criatura('Urso', tipo='animal', raridade='raro')
+    erro = Criatura('Criatura desconhecida')
+    dias = [
+        DiaViagem(1, Encontro('double_roll', 2, (Encontro('creatures', 3, (lobo,)),
+                                                 Encontro('creatures', 4, (urso,)))), 'Manhã'),
+        DiaViagem(2, Encontro('creatures', 5, (erro,)), 'Noite'),
+    ]
+    monkeypatch.setattr(simulador.travel, 'generate_trip_encounters', lambda *args: iter(dias))
+
+    histogramas = simulador.simular_viagens('floresta', 2, False, 1, 0, 1)
+    assert histogramas['tipos_encontro'] == {'double_roll': 1, 'creatures': 1}
+    assert histogramas['categorias'] == {'animal': 2}
+    assert histogramas['raridades'] == {'comum': 1, 'raro': 1}
+
+
+def test_main_recusa_terreno_desconhecido(capsys):
+    with pytest.raises(SystemExit) as saida:
+        simulador.main(['florsta', '--viagens', '1', '--workers', '1'])
+    assert saida.value.code == 2
+    assert "terreno desconhecido: 'florsta'" in capsys.readouterr().err
+
+
+def test_main_grava_json_e_csv(tmp_path, capsys):
+    destino_json = tmp_path / 'campanha.json'
+    destino_csv = tmp_path / 'campanha.csv'
+    argumentos = ['floresta', '--dias', '5', '--viagens', '10', '--workers', '1', '--seed', '4']
+    assert simulador.main(argumentos + ['--saida', str(destino_json)]) == 0
+    assert simulador.main(argumentos + ['--saida', str(destino_csv)]) == 0
+
+    resultado = json.loads(destino_json.read_text(encoding='utf-8'))
+    assert resultado['parametros']['seed'] == 4
+    linhas = destino_csv.read_text(encoding='utf-8').splitlines()
+    assert linhas[0] == 'histograma,valor,contagem,fracao'
+    assert len(linhas) > 1
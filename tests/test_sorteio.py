@@ -0,0 +1,121 @@
+# tests/test_sorteio.py
+import random
+from collections import Counter
+
+import pytest
+
+from sorteio import AmostradorPesos, TabelaD20
+
+
+# ========== SORTEIO POR PESO ==========
+
+def test_amostrador_segue_os_pesos():
+    amostrador = AmostradorPesos({'comum': 6, 'incomum': 3, 'raro': 1})
+    rng = random.Random(42)
+    contagem = Counter(amostrador.sortear(rng) for _ in range(20_000))
+    assert contagem['comum'] / 20_000 == pytest.approx(0.6, abs=0.02)
+    assert contagem['incomum'] / 20_000 == pytest.approx(0.3, abs=0.02)
+    assert contagem['raro'] / 20_000 == pytest.approx(0.1, abs=0.02)
+
+
+def test_amostrador_nunca_sorteia_peso_zero_no_meio():
+    amostrador = AmostradorPesos({'a': 1, 'nunca': 0, 'b': 1})
+    rng = random.Random(7)
+    assert 'nunca' not in {amostrador.sortear(rng) for _ in range(5_000)}
+
+
+def test_amostrador_mesma_seed_mesmo_resultado():
+    amostrador = AmostradorPesos({'a': 1, 'b': 2, 'c': 3})
+    primeira = [amostrador.sortear(random.Random(99)) for _ in range(5)]
+    segunda = [amostrador.sortear(random.Random(99)) for _ in range(5)]
+    assert primeira == segunda
+
+
+def test_amostrador_limites_da_busca_binaria(rng_fixo):
+    amostrador = AmostradorPesos({'a': 1, 'b': 2, 'c': 3})  # acumulados: 1, 3, 6
+    assert amostrador.sortear(rng_fixo(0)) == 'a'
+    assert amostrador.sortear(rng_fixo(1)) == 'a'  # o primeiro acumulado que alcança o valor vence
+    assert amostrador.sortear(rng_fixo(1.0001)) == 'b'
+    assert amostrador.sortear(rng_fixo(3)) == 'b'
+    assert amostrador.sortear(rng_fixo(6)) == 'c'
+    assert amostrador.sortear(rng_fixo(6.5)) == 'c'  # além do total (arredondamento): última opção
+
+
+def test_amostrador_pesos_zero_sorteia_uniforme():
+    amostrador = AmostradorPesos({'a': 0, 'b': 0})
+    assert amostrador.total == 0
+    rng = random.Random(3)
+    contagem = Counter(amostrador.sortear(rng) for _ in range(4_000))
+    assert set(contagem) == {'a', 'b'}
+    assert contagem['a'] / 4_000 == pytest.approx(0.5, abs=0.05)
+
+
+def test_amostrador_tabela_vazia():
+    amostrador = AmostradorPesos({})
+    assert len(amostrador) == 0
+    assert amostrador.total == 0
+    with pytest.raises(IndexError):
+        amostrador.sortear(random.Random(1))
+
+
+def test_amostrador_recusa_o_que_nao_e_dicionario():
+    with pytest.raises(TypeError):
+        AmostradorPesos([('a', 1)])
+
+
+def test_amostrador_mapear_consome_o_rng_do_mesmo_jeito():
+    amostrador = AmostradorPesos({'a': 1, 'b': 2, 'c': 3})
+    mapeado = amostrador.mapear(str.upper)
+    originais = [amostrador.sortear(random.Random(s)) for s in range(50)]
+    mapeados = [mapeado.sortear(random.Random(s)) for s in range(50)]
+    assert mapeados == [o.upper() for o in originais]
+
+
+# ========== TABELAS DE D20 ==========
+
+def test_d20_faixas_completas():
+    tabela = TabelaD20.por_chave({"1-5": 'a', "6": 'b', "7-20": 'c'})
+    assert tabela.lacunas == ()
+    assert tabela.sobreposicoes == ()
+    assert [tabela[face] for face in (1, 5, 6, 7, 20)] == ['a', 'a', 'b', 'c', 'c']
+
+
+def test_d20_lacunas():
+    tabela = TabelaD20.por_valor({'a': [1, 4], 'b': [10, 12], 'c': 20})
+    assert tabela.lacunas == (5, 6, 7, 8, 9, 13, 14, 15, 16, 17, 18, 19)
+    assert tabela[5] is None
+    assert tabela[20] == 'c'
+
+
+def test_d20_sobreposicoes_vale_a_primeira_faixa():
+    tabela = TabelaD20([("1-10", 'a'), ("8-20", 'b'), ("10", 'c')])
+    assert tabela.sobreposicoes == (8, 9, 10)
+    assert tabela.lacunas == ()
+    assert [tabela[face] for face in (7, 8, 10, 11)] == ['a', 'a', 'a', 'b']
+
+
+def test_d20_faixas_fora_do_dado_sao_cortadas():
+    tabela = TabelaD20([([-3, 2], 'a'), ([3, 25], 'b')])
+    assert tabela.lacunas == ()
+    assert tabela[0] is None and tabela[21] is None
+    assert tabela[1] == 'a' and tabela[20] == 'b'
+
+
+def test_d20_faixa_invalida():
+    with pytest.raises(ValueError):
+        TabelaD20([("dez", 'a')])
+
+
+def test_d20_rolar_usa_o_rng():
+    tabela = TabelaD20.por_chave({"1-10": 'baixo', "11-20": 'alto'})
+    rolagens = [random.Random(s).randint(1, 20) for s in range(30)]
+    resultados = [tabela.rolar(random.Random(s)) for s in range(30)]
+    assert resultados == ['baixo' if r <= 10 else 'alto' for r in rolagens]
+
+
+def test_d20_mapear_preserva_validacao():
+    tabela = TabelaD20.por_chave({"1-10": 'a', "5-15": 'b'})
+    mapeada = tabela.mapear(lambda resultado: resultado and resultado.upper())
+    assert mapeada[1] == 'A' and mapeada[12] == 'B' and mapeada[18] is None
+    assert mapeada.lacunas == tabela.lacunas
+    assert mapeada.sobreposicoes == tabela.sobreposicoes
@@ -0,0 +1,129 @@
+# tests/test_tabelas.py
+import json
+import os
+
+import pytest
+
+from tabelas import RegistroTabelas
+
+
+def _gravar(caminho, conteudo):
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f)
+
+
+@pytest.fixture
+def registro(tmp_path, monkeypatch):
+    """Registro com uma árvore pequena em uma pasta temporária (sem snapshot)."""
+    monkeypatch.chdir(tmp_path)
+    _gravar('tipos_terreno.json', {'floresta': 'Floresta'})
+    _gravar('encounters/floresta/pesos.json', {'a': 1, 'b': 0})
+    _gravar('encounters/floresta/outros.json', {'x': 1, 'y': 1})
+    _gravar('horario.json', {'Dia': [1, 10], 'Noite': [11, 20]})
+    registro = RegistroTabelas(raiz='encounters', avulsos=['tipos_terreno.json', 'horario.json'],
+                               snapshot=str(tmp_path / 'tabelas.snapshot'),
+                               geracao=str(tmp_path / 'tabelas.geracao'))
+    return registro.carregar()
+
+
+# ========== RECARGA INCREMENTAL ==========
+
+def test_atualizar_troca_so_os_arquivos_alterados(registro, rng_fixo):
+    pesos = registro.amostrador('encounters/floresta/pesos.json')
+    outros = registro.amostrador('encounters/floresta/outros.json')
+    assert registro.tabela_d20('horario.json')[15] == 'Noite'
+
+    _gravar('encounters/floresta/pesos.json', {'a': 0, 'b': 1})
+    _gravar('horario.json', {'Dia': [1, 15], 'Noite': [16, 20]})
+    assert registro.atualizar(['encounters/floresta/pesos.json', 'horario.json']) == 2
+
+    novo = registro.amostrador('encounters/floresta/pesos.json')
+    assert novo is not pesos
+    assert novo.sortear(rng_fixo(0.5)) == 'b'
+    assert registro.amostrador('encounters/floresta/outros.json') is outros
+    assert registro.tabela_d20('horario.json')[15] == 'Dia'
+    assert registro.get('encounters/floresta/pesos.json') == {'a': 0, 'b': 1}
+
+
+def test_atualizar_chama_os_callbacks_e_renova_as_versoes(registro):
+    chamadas = []
+    registro.ao_recarregar(lambda: chamadas.append(1))
+    versao_pesos = registro.versao('encounters/floresta/pesos.json')
+    versao_outros = registro.versao('encounters/floresta/outros.json')
+
+    _gravar('encounters/floresta/pesos.json', {'a': 5})
+    registro.atualizar(['encounters/floresta/pesos.json'])
+
+    assert chamadas == [1]
+    assert registro.versao('encounters/floresta/pesos.json') != versao_pesos
+    assert registro.versao('encounters/floresta/outros.json') == versao_outros
+
+
+def test_atualizar_arquivos_criados_e_removidos(registro):
+    os.remove('encounters/floresta/outros.json')
+    _gravar('encounters/floresta/novo.json', {'z': 1})
+    assert registro.atualizar(['encounters/floresta/outros.json', 'encounters/floresta/novo.json']) == 2
+
+    with pytest.raises(FileNotFoundError):
+        registro.get('encounters/floresta/outros.json')
+    assert registro.get('encounters/floresta/novo.json') == {'z': 1}
+
+
+def test_atualizar_ignora_o_que_nao_e_tabela(registro):
+    chamadas = []
+    registro.ao_recarregar(lambda: chamadas.append(1))
+    pesos = registro.amostrador('encounters/floresta/pesos.json')
+
+    assert registro.atualizar(['encounters/floresta/notas.txt', 'fora/da/raiz.json']) == 0
+    assert chamadas == []
+    assert registro.amostrador('encounters/floresta/pesos.json') is pesos
+
+
+def test_atualizar_json_invalido_so_falha_ao_usar(registro):
+    with open('encounters/floresta/pesos.json', 'w', encoding='utf-8') as f:
+        f.write('{"a": ')
+    registro.atualizar(['encounters/floresta/pesos.json'])
+
+    with pytest.raises(json.JSONDecodeError):
+        registro.get('encounters/floresta/pesos.json')
+    assert registro.get('encounters/floresta/outros.json') == {'x': 1, 'y': 1}
+
+
+# ========== SUBÁRVORES SOB DEMANDA ==========
+
+def test_marcos_so_sao_lidos_no_primeiro_uso(registro):
+    _gravar('encounters/hex/floresta/marcos_paisagem/Ruina/interior.json', {'salao': 1})
+    registro.recarregar()
+    assert registro.existe('encounters/hex/floresta/marcos_paisagem/Ruina/interior.json')
+
+    # A carga guardou só o stat: o conteúdo é o do disco no primeiro uso
+    _gravar('encounters/hex/floresta/marcos_paisagem/Ruina/interior.json', {'cripta': 1})
+    assert registro.get('encounters/hex/floresta/marcos_paisagem/Ruina/interior.json') == {'cripta': 1}
+
+
+def test_marco_removido_depois_da_carga(registro):
+    _gravar('encounters/hex/floresta/marcos_paisagem/Ruina/interior.json', {'salao': 1})
+    registro.recarregar()
+    os.remove('encounters/hex/floresta/marcos_paisagem/Ruina/interior.json')
+
+    with pytest.raises(FileNotFoundError):
+        registro.get('encounters/hex/floresta/marcos_paisagem/Ruina/interior.json')
+
+
+# ========== SINCRONIZAÇÃO ENTRE PROCESSOS ==========
+
+def test_publicar_sem_snapshot_faz_os_outros_registros_recarregarem(registro):
+    outro = RegistroTabelas(raiz=registro.raiz, avulsos=registro.avulsos,
+                            snapshot=registro.snapshot, geracao=registro.arquivo_geracao).carregar()
+    registro.intervalo_sincronizacao = outro.intervalo_sincronizacao = 0
+    assert not os.path.exists(registro.snapshot)
+    assert outro.sincronizar() is False
+
+    _gravar('encounters/floresta/pesos.json', {'c': 1})
+    registro.publicar()
+
+    assert outro.sincronizar() is True
+    assert outro.get('encounters/floresta/pesos.json') == {'c': 1}
+    assert outro.sincronizar() is False
+    assert registro.sincronizar() is False
@@ -0,0 +1,243 @@
+# tests/test_travel.py
+import json
+
+import pytest
+
+# travel.py depende do gerador de equipamentos, que não faz parte deste repositório
+pytest.importorskip('gerador_equipamentos')
+
+import travel  # noqa: E402
+
+
+@pytest.fixture
+def cliente():
+    return travel.app.test_client()
+
+
+def _linhas_json(resposta):
+    return [json.loads(linha) for linha in resposta.data.decode().splitlines()]
+
+
+# ========== /api/travel/stream ==========
+
+def test_stream_uma_linha_por_dia(cliente):
+    resposta = cliente.get('/api/travel/stream?terrain=floresta&days=40&seed=3')
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'application/x-ndjson'
+    assert resposta.headers['X-Seed'] == '3'
+    dias = _linhas_json(resposta)
+    assert [dia['day'] for dia in dias] == list(range(1, 41))
+    assert set(dias[0]) == {'day', 'encounter', 'encounter_type', 'time_of_day', 'encounter_data'}
+
+
+def test_stream_mesma_seed_mesma_viagem(cliente):
+    consulta = '/api/travel/stream?terrain=floresta&days=60&time=night&seed=8'
+    assert cliente.get(consulta).data == cliente.get(consulta).data
+    assert cliente.post('/api/travel/stream', data={'terrain': 'floresta', 'days': 60,
+                                                    'time': 'night', 'seed': 8}).data == cliente.get(consulta).data
+
+
+def test_stream_igual_ao_gerador_dia_a_dia(cliente):
+    rng, _ = travel.criar_rng(5)
+    esperado = [travel.dia_json(dia) for dia in travel.generate_trip_days('floresta', 30, False, rng)]
+    assert _linhas_json(cliente.get('/api/travel/stream?terrain=floresta&days=30&seed=5')) == esperado
+
+
+@pytest.mark.parametrize('consulta', ['days=0', f'days={travel.MAX_STREAM_DAYS + 1}', 'days=10&terrain=atlantida'])
+def test_stream_parametros_invalidos(cliente, consulta):
+    resposta = cliente.get(f'/api/travel/stream?{consulta}')
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
+
+
+def test_generate_trip_days_nao_guarda_a_lista():
+    dias = travel.generate_trip_days('floresta', 10 ** 9, False, 1)
+    assert [next(dias).dia for _ in range(3)] == [1, 2, 3]
+
+
+def test_stream_no_asgi_igual_ao_flask(cliente):
+    testclient = pytest.importorskip('starlette.testclient')
+    import asgi
+
+    consulta = '/api/travel/stream?terrain=floresta&days=50&seed=21'
+    with testclient.TestClient(asgi.travel_app) as cliente_asgi:
+        resposta = cliente_asgi.get(consulta)
+        assert resposta.status_code == 200
+        assert resposta.headers['X-Seed'] == '21'
+        assert resposta.content == cliente.get(consulta).data
+        assert cliente_asgi.get('/api/travel/stream?terrain=atlantida').status_code == 400
+
+
+# ========== /api/logs ==========
+
+@pytest.fixture
+def viagens_gravadas():
+    """Três viagens com um terreno só delas, para não depender do que outros testes gravaram."""
+    terreno = f'teste-{travel.novo_id()}'
+    nomes = [f'viagem_teste_{travel.novo_id()}.txt' for _ in range(3)]
+    for i, nome in enumerate(nomes):
+        travel.gravador.enviar(nome, f'relatório {i}', {
+            'terreno': terreno, 'dias': 2, 'periodo': 'dia', 'seed': i,
+            'criado': f'2024-05-0{i + 1} 08:00:00', 'encontros': [(1, 'creatures', 'Manhã', 'Lobo')],
+        })
+    travel.gravador.esvaziar()
+    return terreno, nomes
+
+
+def test_api_logs_pagina_e_link(cliente, viagens_gravadas):
+    terreno, nomes = viagens_gravadas
+    primeira = cliente.get(f'/api/logs?terreno={terreno}&limite=2').get_json()
+    assert [v['nome'] for v in primeira['viagens']] == nomes[:0:-1]
+    assert primeira['proximo'] is not None
+
+    segunda = cliente.get(f"/api/logs?terreno={terreno}&limite=2&antes={primeira['proximo']}").get_json()
+    assert [v['nome'] for v in segunda['viagens']] == nomes[:1]
+
+    viagem = primeira['viagens'][0]
+    assert cliente.get(viagem['url']).data.decode() == 'relatório 2'
+
+
+def test_api_logs_filtro_de_datas(cliente, viagens_gravadas):
+    terreno, nomes = viagens_gravadas
+    pagina = cliente.get(f'/api/logs?terreno={terreno}&de=2024-05-02&ate=2024-05-02').get_json()
+    assert [v['nome'] for v in pagina['viagens']] == [nomes[1]]
+    assert cliente.get('/api/logs?de=ontem').status_code == 400
+
+
+def test_api_logs_export_em_ndjson(cliente, viagens_gravadas):
+    terreno, nomes = viagens_gravadas
+    resposta = cliente.get(f'/api/logs/export?terreno={terreno}')
+    assert resposta.mimetype == 'application/x-ndjson'
+    viagens = _linhas_json(resposta)
+    assert [v['nome'] for v in viagens] == nomes
+    assert viagens[0]['encontros'] == [{'dia': 1, 'tipo': 'creatures', 'horario': 'Manhã', 'descricao': 'Lobo'}]
+    assert cliente.get('/api/logs/export?ate=amanha').status_code == 400
+
+
+def test_logs_inexistente(cliente):
+    assert cliente.get('/logs/nao_existe.txt').status_code == 404
+
+
+# ========== /api/caracteristicas ==========
+
+def test_caracteristicas_lote_na_ordem_dos_pedidos(cliente):
+    pedidos = [{'tipo': 'lefeu', 'qtd': 3}, {'tipo': 'dragao', 'qtd': 1}, {'tipo': 'lefeu'}]
+    dados = cliente.post('/api/caracteristicas', json={'pedidos': pedidos, 'seed': 10}).get_json()
+    assert dados['seed'] == 10
+    primeiro, invalido, terceiro = dados['resultados']
+    assert primeiro['tipo'] == 'lefeu' and len(primeiro['caracteristicas']) == 3
+    assert invalido == {'tipo': 'dragao', 'error': "Tipo dragao não suportado"}
+    assert len(terceiro['caracteristicas']) == 1  # 'qtd' padrão
+
+
+def test_caracteristicas_lote_repete_com_a_seed(cliente):
+    corpo = {'pedidos': [{'tipo': 'lefeu', 'qtd': 5}] * 4, 'seed': 99}
+    assert cliente.post('/api/caracteristicas', json=corpo).data == cliente.post('/api/caracteristicas', json=corpo).data
+
+
+def test_caracteristicas_sem_repeticao_e_limitadas_ao_total():
+    total = len(travel.characteristic_keys('lefeu'))
+    sorteadas = travel.sortear_caracteristicas('lefeu', total + 50, travel.criar_rng(1)[0])
+    nomes = [item['caracteristica'] for item in sorteadas]
+    assert len(nomes) == len(set(nomes)) == total
+    assert travel.sortear_caracteristicas('lefeu', -3) == []
+
+
+@pytest.mark.parametrize('corpo', [
+    None,
+    {'pedidos': 'lefeu'},
+    {'pedidos': [{'qtd': 1}]},
+    {'pedidos': [{'tipo': 'lefeu', 'qtd': 'muitas'}]},
+    {'pedidos': [{'tipo': 'lefeu'}] * (travel.MAX_PEDIDOS_CARACTERISTICAS + 1)},
+])
+def test_caracteristicas_lote_pedidos_invalidos(cliente, corpo):
+    resposta = cliente.post('/api/caracteristicas', json=corpo)
+    assert resposta.status_code == 400
+    assert 'error' in resposta.get_json()
+
+
+# ========== /api/equipamentos ==========
+
+def test_ler_pedido_equipamentos_por_lista_e_por_quantidade():
+    npcs = travel.ler_pedido_equipamentos({'npcs': [{'qtd_armas': 2}, {'qtd_armas': 1, 'qtd_armaduras': 1}]})
+    assert npcs == [(2, 0), (1, 1)]
+    assert travel.ler_pedido_equipamentos({'quantidade': 3, 'qtd_armaduras': 1}) == [(0, 1)] * 3
+
+
+@pytest.mark.parametrize('corpo', [
+    None,
+    [],
+    {},
+    {'quantidade': 'muitos'},
+    {'npcs': [{'qtd_armas': 'duas'}]},
+    {'npcs': [{'qtd_armas': -1}]},
+    {'npcs': [{'qtd_armas': travel.MAX_ITENS_POR_NPC + 1}]},
+    {'quantidade': travel.MAX_NPCS_EQUIPAMENTOS + 1},
+    {'npcs': [{}] * (travel.MAX_NPCS_EQUIPAMENTOS + 1)},
+])
+def test_ler_pedido_equipamentos_invalido(corpo):
+    with pytest.raises(ValueError):
+        travel.ler_pedido_equipamentos(corpo)
+
+
+def test_api_equipamentos_um_resultado_por_npc(cliente):
+    resposta = cliente.post('/api/equipamentos', json={'quantidade': 4, 'qtd_armas': 1, 'qtd_armaduras': 1})
+    assert resposta.status_code == 200
+    npcs = resposta.get_json()['npcs']
+    assert len(npcs) == 4
+    assert all(set(npc) == {'armaduras', 'armas'} for npc in npcs)
+
+
+def test_api_equipamentos_sem_formatar(cliente):
+    npcs = cliente.post('/api/equipamentos', json={'npcs': [{'qtd_armas': 1}], 'formatar': False}).get_json()['npcs']
+    assert all(set(arma) == {'arma', 'escudo', 'arma_secundaria'} for arma in npcs[0]['armas'])
+
+
+def test_api_equipamentos_limites(cliente):
+    assert cliente.post('/api/equipamentos', json={'quantidade': travel.MAX_NPCS_EQUIPAMENTOS + 1}).status_code == 400
+    assert cliente.post('/api/equipamentos', data='npcs').status_code == 400
+
+
+def test_parear_armas_busca_escudo_e_secundaria():
+    equipamentos = {
+        'armas_primarias': [{'nome': 'Espada'}, {'nome': 'Adaga'}, {'nome': 'Lança'}],
+        'armas_com_escudos': {'Espada': {'nome': 'Broquel'}},
+        'armas_duplas': {'Adaga': {'nome': 'Adaga'}},
+    }
+    assert travel.parear_armas(equipamentos) == [
+        ({'nome': 'Espada'}, {'nome': 'Broquel'}, None),
+        ({'nome': 'Adaga'}, None, {'nome': 'Adaga'}),
+        ({'nome': 'Lança'}, None, None),
+    ]
+    assert travel.parear_armas({}) == []
+
+
+def test_gerador_de_equipamentos_reaproveitado_ate_a_recarga():
+    gerador = travel.equipment_generator()
+    assert travel.equipment_generator() is gerador
+    travel.registro.recarregar()
+    assert travel.equipment_generator() is not gerador
+
+
+# ========== Plano de viagem ==========
+
+def test_plano_viagem_segue_chance_encontro():
+    chances = travel.registro.get('chance_encontro.json')['floresta']
+    for noite, periodo in ((False, 'dia'), (True, 'noite')):
+        plano = travel.plano_viagem('floresta', noite)
+        assert plano.peso_encontro == chances[periodo]
+        assert travel.exact_encounter_chance('floresta', noite) == pytest.approx(chances[periodo] / 100)
+
+
+def test_plano_viagem_reaproveitado_ate_a_recarga():
+    plano = travel.plano_viagem('floresta', False)
+    assert travel.plano_viagem('floresta', False) is plano
+    travel.registro.recarregar()
+    assert travel.plano_viagem('floresta', False) is not plano
+
+
+def test_terreno_desconhecido_nao_entra_no_cache(cliente):
+    travel.plano_viagem.cache_clear()
+    assert cliente.get('/generate?terrain=atlantida&days=3').status_code == 400
+    assert cliente.get('/api/travel/stream?terrain=atlantida&days=3').status_code == 400
+    assert travel.plano_viagem.cache_info().currsize == 0
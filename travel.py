@@ -1,16 +1,30 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory, session
+from flask import Flask, render_template, request, jsonify, session, abort, Response, stream_with_context, url_for
 import json
 import random
 import os
 import datetime
+import time
 from functools import lru_cache
 from pathlib import Path
 import sys
 from io import StringIO
 from gerador_equipamentos import GeradorEquipamentos
+from tabelas import registro, load_json
+from vigia import vigia
+from sorteio import AmostradorPesos, como_rng, criar_rng, formato, PESOS, CATEGORIAS_POR_PESO, FAIXAS_POR_CHAVE
+from simulacao import simular_pesos, simular_d20
+from probabilidades import distribuicao, distribuicao_d20, agrupar, arvore, ocorrencias_com_repeticao
+from relatorios import gravador, novo_id
+from metricas import metricas, instrumentar, rotulo
+from resultados import Criatura, Encontro, DiaViagem, ResultadoViagem
+from apresentacao import registrar_filtros, linha_txt, descricao_encontro, dia_json
+from esquemas import (category_folder, sorteio_categorias, sorteio_raridades, sorteio_tipos_encontro,
+                      plano_encontros, plano_viagem, validar_carga)
 
 app = Flask(__name__)
 app.secret_key = 'sua_chave_secreta_aqui_123'
+instrumentar(app, 'travel')
+registrar_filtros(app.jinja_env)
 
 # ========== CONFIGURAÇÃO INICIAL ==========
 def create_folder_structure():
@@ -78,252 +92,227 @@ def create_folder_structure():
                 with open(f'encounters/{terrain}/{file}', 'w', encoding='utf-8') as f:
                     json.dump({"Exemplo": "Descrição do evento"}, f)
 
-create_folder_structure()
-
-# ========== FUNÇÕES DE DEBUG ==========
-def debug_category_probabilities(terrain='floresta', samples=100000):
-    """Analisa as probabilidades reais de encontro por categoria"""
+# Com um snapshot atualizado a estrutura já existia quando ele foi compilado
+# (compile com 'python travel.py compilar' para garantir isso)
+if not registro.snapshot_atualizado():
+    create_folder_structure()
+
+# Lê toda a árvore de tabelas para a memória depois que os arquivos padrão existem
+# e avisa sobre as tabelas com formato inesperado
+registro.recarregar()
+validar_carga()
+
+# ========== PROBABILIDADES EXATAS ==========
+def _categoria_da_faixa(data):
+    """Categoria de uma faixa de categories.json (None se a faixa estiver vazia ou sem 'category', como na geração)"""
+    return data['category'] if isinstance(data, dict) and data.get('category') else None
+
+def exact_categories(terrain):
+    """Chance exata de cada categoria de criatura do terreno (None se o formato de categories.json não for reconhecido)"""
+    path = f'encounters/{terrain}/creatures/categories.json'
+    formato_categorias = formato(load_json(path))
+    
+    if formato_categorias == CATEGORIAS_POR_PESO:
+        return agrupar(distribuicao(registro.amostrador(path)), lambda key: key.split('|')[0].strip())
+    elif formato_categorias == FAIXAS_POR_CHAVE:
+        tabela = registro.tabela_d20(path)
+        if tabela is None:
+            return None
+        return distribuicao_d20(tabela, lambda data: _categoria_da_faixa(data) or "Criatura desconhecida")
+    return None
+
+def exact_rarity_types(file_path, terrain, peso=1.0):
+    """Árvore exata raridade -> tipo de 'roll_for_type_by_rarity', incluindo o recuo para "comum" """
     try:
-        with open(f'encounters/{terrain}/creatures/categories.json', 'r', encoding='utf-8') as f:
-            categories_data = json.load(f)
+        raridades = distribuicao(registro.amostrador(f'encounters/{terrain}/creatures/rarity_weights.json'))
+        types_by_rarity = load_json(file_path)
         
-        if isinstance(categories_data, dict) and all('|' in key for key in categories_data.keys()):
-            categories = list(categories_data.keys())
-            weights = list(categories_data.values())
-            
-            results = {cat.split('|')[0]: 0 for cat in categories}
-            
-            for _ in range(samples):
-                selected = select_by_weight(categories_data)
-                category = selected.split('|')[0]
-                results[category] += 1
-            
-            print(f"<br>=== DEBUG DE PROBABILIDADES ({terrain.upper()}) ===")
-            print(f"Baseado em {samples} simulações:")
-            total_weight = sum(weights)
-            
-            for category, count in sorted(results.items(), key=lambda x: x[1], reverse=True):
-                cat_weight = next(v for k, v in categories_data.items() if k.startswith(category))
-                theoretical = cat_weight / total_weight
-                actual = count / samples
-                print(f"{category}: {actual:.2%} (Teórico: {theoretical:.2%} | Diferença: {(actual-theoretical):+.2f}%)")
-            
-            return results
+        # Raridades sem tipos definidos caem em "comum"
+        efetivas = agrupar(raridades, lambda rarity: rarity if types_by_rarity.get(rarity) else "comum")
         
-        elif isinstance(categories_data, dict):
-            results = {data['category']: 0 for data in categories_data.values()}
-            
-            for _ in range(samples):
-                roll = random.randint(1, 20)
-                for range_str, data in categories_data.items():
-                    if '-' in range_str:
-                        min_val, max_val = map(int, range_str.split('-'))
-                        if min_val <= roll <= max_val:
-                            results[data['category']] += 1
-                            break
-                    elif int(range_str) == roll:
-                        results[data['category']] += 1
-                        break
-            
-            print(f"<br>=== DEBUG DE PROBABILIDADES ({terrain.upper()}) ===")
-            print(f"Baseado em {samples} simulações:")
-            for category, count in sorted(results.items(), key=lambda x: x[1], reverse=True):
-                theoretical = calculate_theoretical_chance(categories_data, category)
-                diff = (count/samples*100) - (theoretical*100)
-                print(f"{category}: {count/samples:.2%} (Teórico: {theoretical:.2%} | Diferença: {diff:+.2f}%)")
-            
-            return results
+        def tipos(rarity, p):
+            if not types_by_rarity.get(rarity):
+                return {"Tipo Padrão (sem raridade definida)": {'probabilidade': p}}
+            return arvore(distribuicao(registro.amostrador(file_path, rarity)), peso=p)
         
-        else:
-            print("Formato de categories.json não reconhecido")
+        return arvore(efetivas, tipos, peso)
+    except FileNotFoundError:
+        return {"Indefinido (Arquivo não encontrado)": {'probabilidade': peso}}
+    except Exception as e:
+        print(f"Erro ao calcular tipos por raridade: {str(e)}")
+        return {"Indefinido (Erro de sistema)": {'probabilidade': peso}}
+
+def exact_creature_types(terrain):
+    """Árvore exata categoria -> raridade -> tipo de criatura do terreno"""
+    categorias = exact_categories(terrain)
+    if categorias is None:
+        return None
+    
+    def tipos_da_categoria(category, p):
+        if category == "Criatura desconhecida":
+            return None
+        base_path = f'encounters/{terrain}/creatures/{category_folder(category)}/'
+        return exact_rarity_types(base_path + 'tipos.json', terrain, p)
+    
+    return arvore(categorias, tipos_da_categoria)
+
+def exact_encounter_types(terrain):
+    """
+    Chance exata de cada tipo de encontro do terreno ('tipos') e, como o 'double_roll' rola dois
+    encontros (que podem rolar outros), quantas vezes cada tipo aparece em média por encontro ('ocorrencias').
+    """
+    sorteador = sorteio_tipos_encontro(terrain)
+    if sorteador is None:
+        # Sem tabela válida para o terreno, todo encontro sai como "Encontro indefinido"
+        tipos = {"indefinido": 1.0}
+    elif isinstance(sorteador, AmostradorPesos):
+        tipos = distribuicao(sorteador)
+    else:
+        tipos = distribuicao_d20(sorteador, lambda encounter: encounter or "indefinido")
+    return {'tipos': tipos, 'ocorrencias': ocorrencias_com_repeticao(tipos, 'double_roll')}
+
+def exact_encounter_chance(terrain, is_night):
+    """Chance exata de haver encontro em um dia (mesma regra de 'generate_trip_days')"""
+    peso_encontro = plano_viagem(terrain, is_night).peso_encontro
+    return peso_encontro / (peso_encontro + max(0, 100 - peso_encontro))
+
+def print_exact_report(probabilidades, saida=None):
+    """Imprime as chances exatas, da maior para a menor ('saida' é o arquivo de destino; padrão: stdout)"""
+    for opcao, p in sorted(probabilidades.items(), key=lambda item: item[1], reverse=True):
+        print(f"{opcao}: {p:.2%}", file=saida)
+
+# ========== FUNÇÕES DE DEBUG ==========
+def simulate_categories(terrain='floresta', samples=100000, seed=None):
+    """Simula as categorias de criatura de um terreno e devolve o relatório estruturado"""
+    categories_data = load_json(f'encounters/{terrain}/creatures/categories.json')
+    formato_categorias = formato(categories_data)
+    
+    if formato_categorias == CATEGORIAS_POR_PESO:
+        return simular_pesos(categories_data, samples, seed, rotulo=lambda key: key.split('|')[0])
+    elif formato_categorias == FAIXAS_POR_CHAVE:
+        tabela = registro.tabela_d20(f'encounters/{terrain}/creatures/categories.json')
+        if tabela is None:
+            return None
+        return simular_d20([_categoria_da_faixa(data) for data in tabela.faces], samples, seed)
+    return None
+
+def simulate_encounter_types(terrain='floresta', samples=100000, seed=None):
+    """Simula os tipos de encontro de um terreno e devolve o relatório estruturado"""
+    config = load_json('tipos_encontro.json')
+    terrain_config = config.get(terrain, {})
+    
+    if formato(terrain_config) == PESOS:
+        return simular_pesos(terrain_config, samples, seed)
+    tabela = registro.tabela_d20('tipos_encontro.json', terrain)
+    return simular_d20(tabela.faces if tabela else [None] * 21, samples, seed)
+
+def print_simulation_report(relatorio):
+    """Imprime as linhas de um relatório de simulação"""
+    for item in relatorio['resultados']:
+        diff = (item['empirico'] - item['teorico']) * 100
+        print(f"{item['opcao']}: {item['empirico']:.2%} (Teórico: {item['teorico']:.2%} | Diferença: {diff:+.2f}%)")
+    print(f"Qui-quadrado: {relatorio['qui_quadrado']:.2f} ({relatorio['graus_liberdade']} graus de liberdade)")
+
+def debug_category_probabilities(terrain='floresta', saida=None):
+    """Mostra a chance exata de cada categoria de criatura (calculada dos pesos, sem simulação)"""
+    try:
+        probabilidades = exact_categories(terrain)
+        if probabilidades is None:
+            print("Formato de categories.json não reconhecido", file=saida)
             return {}
+        
+        print(f"<br>=== DEBUG DE PROBABILIDADES ({terrain.upper()}) ===", file=saida)
+        print("Probabilidades exatas:", file=saida)
+        print_exact_report(probabilidades, saida)
+        
+        return probabilidades
 
     except Exception as e:
-        print(f"Erro no debug: {str(e)}")
+        print(f"Erro no debug: {str(e)}", file=saida)
         return {}
 
-def calculate_theoretical_chance(categories, target_category):
-    """Calcula a probabilidade teórica de uma categoria"""
-    total = 0
-    for range_str, data in categories.items():
-        if data['category'] == target_category:
-            if '-' in range_str:
-                min_val, max_val = map(int, range_str.split('-'))
-                total += (max_val - min_val + 1)
-            else:
-                total += 1
-    return total / 20
-
-def debug_encounter_types(terrain='floresta', samples=10000):
-    """Analisa a distribuição dos tipos de encontro"""
+def debug_encounter_types(terrain='floresta', saida=None):
+    """Mostra a chance exata de cada tipo de encontro e o efeito do 'double_roll'"""
     try:
-        config = json.load(open('tipos_encontro.json', encoding='utf-8'))
-        terrain_config = config.get(terrain, {})
+        exato = exact_encounter_types(terrain)
         
-        if isinstance(terrain_config, dict) and all(isinstance(v, int) for v in terrain_config.values()):
-            results = {t: 0 for t in terrain_config.keys()}
-            total = sum(terrain_config.values())
-            
-            for _ in range(samples):
-                selected = select_by_weight(terrain_config)
-                results[selected] += 1
-            
-            print(f"<br>=== DEBUG DE TIPOS DE ENCONTRO ({terrain.upper()}) ===")
-            for encounter, count in sorted(results.items(), key=lambda x: x[1], reverse=True):
-                theoretical = terrain_config[encounter] / total
-                print(f"{encounter}: {count/samples:.2%} (Teórico: {theoretical:.2%})")
+        print(f"<br>=== DEBUG DE TIPOS DE ENCONTRO ({terrain.upper()}) ===", file=saida)
+        print("Probabilidades exatas:", file=saida)
+        print_exact_report(exato['tipos'], saida)
+        if exato['tipos'].get('double_roll'):
+            print("Ocorrências médias por encontro (com o evento duplo expandido):", file=saida)
+            print_exact_report(exato['ocorrencias'], saida)
         
-        else:
-            results = {t: 0 for t in terrain_config.keys()}
-            
-            for _ in range(samples):
-                roll = random.randint(1, 20)
-                for encounter, range_values in terrain_config.items():
-                    if isinstance(range_values, list) and len(range_values) == 2:
-                        if range_values[0] <= roll <= range_values[1]:
-                            results[encounter] += 1
-                            break
-                    elif isinstance(range_values, int) and roll == range_values:
-                        results[encounter] += 1
-                        break
-            
-            print(f"<br>=== DEBUG DE TIPOS DE ENCONTRO ({terrain.upper()}) ===")
-            for encounter, count in sorted(results.items(), key=lambda x: x[1], reverse=True):
-                print(f"{encounter}: {count/samples:.2%}")
-        
-        return results
+        return exato['tipos']
     except Exception as e:
-        print(f"Erro no debug: {str(e)}")
+        print(f"Erro no debug: {str(e)}", file=saida)
         return {}
 
 # ========== FUNÇÕES PRINCIPAIS ==========
-def load_terrain_encounters(terrain):
-    """Carrega encontros específicos do terreno"""
-    return {
-        'false_alarms': json.load(open(f'encounters/{terrain}/false_alarms.json', encoding='utf-8')),
-        'anomalies': json.load(open(f'encounters/{terrain}/anomalies.json', encoding='utf-8')),
-        'temporary_obstacles': json.load(open(f'encounters/{terrain}/temporary_obstacles.json', encoding='utf-8')),
-        'events': json.load(open(f'encounters/{terrain}/events.json', encoding='utf-8'))
-    }
-
-def select_by_weight(options):
-    """Seleciona uma opção baseada em pesos, aceitando tanto o formato novo quanto o antigo"""
-    if isinstance(options, dict):
-        items = list(options.items())
-        descriptions = [item[0] for item in items]
-        weights = [item[1] for item in items]
-    elif isinstance(options, dict) and 'options' in options:
-        descriptions = [opt['description'] for opt in options['options']]
-        weights = [opt['weight'] for opt in options['options']]
-    elif isinstance(options, dict) and any('-' in k for k in options.keys()):
-        descriptions = list(options.values())
-        weights = [1] * len(descriptions)
-    else:
+def select_by_weight(options, rng=random):
+    """Seleciona uma opção baseada em pesos (compila um sorteador para a tabela recebida)"""
+    if not isinstance(options, dict):
         return "Indefinido"
     
-    total = sum(weights)
-    r = random.uniform(0, total)
-    upto = 0
-    for i, weight in enumerate(weights):
-        if upto + weight >= r:
-            return descriptions[i]
-        upto += weight
-    return descriptions[-1]
-
-def roll_for_detail(file_path):
-    """Rola detalhes específicos, compatível com vários formatos"""
+    return AmostradorPesos(options).sortear(rng)
+
+def roll_for_detail(file_path, rng=random):
+    """Rola detalhes específicos usando o sorteador em cache da tabela"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            details = json.load(f)
-        
-        return select_by_weight(details)
+        return registro.amostrador(file_path).sortear(rng)
     except Exception as e:
         print(f"Erro ao rolar detalhe: {str(e)}")
         return "Indefinido"
 
-def roll_for_type_by_rarity(file_path, terrain):
+def roll_for_type_by_rarity(file_path, terrain, rng=random):
     """Rola um tipo de criatura baseado em um sistema de raridade aninhado."""
+    return roll_type_and_rarity(file_path, terrain, rng)[0]
+
+def roll_type_and_rarity(file_path, terrain, rng=random):
+    """Como 'roll_for_type_by_rarity', mas devolve (tipo, raridade usada); a raridade é None em caso de erro."""
     try:
         rarity_weights_path = f'encounters/{terrain}/creatures/rarity_weights.json'
 
-        with open(rarity_weights_path, 'r', encoding='utf-8') as f:
-            rarity_weights = json.load(f)
-        chosen_rarity = select_by_weight(rarity_weights)
+        chosen_rarity = registro.amostrador(rarity_weights_path).sortear(rng)
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            types_by_rarity = json.load(f)
+        types_by_rarity = sorteio_raridades(file_path)
+        amostrador = types_by_rarity.get(chosen_rarity)
 
-        creature_options = types_by_rarity.get(chosen_rarity)
-        if not creature_options:
-             creature_options = types_by_rarity.get("comum", {})
-             if not creature_options:
-                 return "Tipo Padrão (sem raridade definida)"
+        if amostrador is None:
+             chosen_rarity = "comum"
+             amostrador = types_by_rarity.get(chosen_rarity)
+             if amostrador is None:
+                 return "Tipo Padrão (sem raridade definida)", None
 
-        return select_by_weight(creature_options)
+        return amostrador.sortear(rng), chosen_rarity
 
     except FileNotFoundError as e:
         print(f"Erro de arquivo não encontrado na rolagem por raridade: {e}")
-        return "Indefinido (Arquivo não encontrado)"
+        return "Indefinido (Arquivo não encontrado)", None
     except Exception as e:
         print(f"Erro ao rolar tipo por raridade: {str(e)}")
-        return "Indefinido (Erro de sistema)"
+        return "Indefinido (Erro de sistema)", None
 
-    except FileNotFoundError as e:
-        print(f"Erro de arquivo não encontrado na rolagem por raridade: {e}")
-        return "Indefinido (Arquivo não encontrado)"
-    except Exception as e:
-        print(f"Erro ao rolar tipo por raridade: {str(e)}")
-        return "Indefinido (Erro de sistema)"
-
-def generate_creature(terrain):
-    """Gera uma criatura com tipo e características"""
+def generate_creature(terrain, rng=None):
+    """Gera uma Criatura com tipo e características ('rng' aceita uma seed ou um random.Random)"""
+    rng = como_rng(rng)
     try:
-        with open(f'encounters/{terrain}/creatures/categories.json', 'r', encoding='utf-8') as f:
-            categories_data = json.load(f)
-        
-        if isinstance(categories_data, dict) and all('|' in key for key in categories_data.keys()):
-            selected = select_by_weight(categories_data)
-            category, file_path = selected.split('|')
-            category_data = {'category': category.strip(), 'file': file_path.strip()}
-        elif isinstance(categories_data, dict):
-            roll = random.randint(1, 20)
-            category_data = None
-            for range_str, data in categories_data.items():
-                if '-' in range_str:
-                    min_val, max_val = map(int, range_str.split('-'))
-                    if min_val <= roll <= max_val:
-                        category_data = data
-                        break
-                elif int(range_str) == roll:
-                    category_data = data
-                    break
-        else:
-            return {'descricao': "Criatura desconhecida", 'tipo': None}
+        # Categoria já compilada (os dois formatos de categories.json), com a pasta e os arquivos resolvidos
+        categorias = sorteio_categorias(terrain)
+        categoria = categorias.sortear(rng) if categorias else None
 
-        if not category_data:
-            return {'descricao': "Criatura desconhecida", 'tipo': None}
+        if categoria is None:
+            return Criatura("Criatura desconhecida")
 
-        folder_name = category_data['category'].lower().replace('í', 'i').replace(' ', '-')
-        base_path = f'encounters/{terrain}/creatures/{folder_name}/'
-        
-        tipo = roll_for_type_by_rarity(base_path + 'tipos.json', terrain)
-        condicao = roll_for_detail(base_path + 'condicoes.json')
-        
-        if category_data['category'].lower() == 'humanoide':
-            raca = roll_for_detail(base_path + 'racas.json')
-            return {
-                'descricao': f"Humanoide - {tipo} ({condicao}, {raca})",
-                'tipo': 'humanoide'
-            }
+        tipo, raridade = roll_type_and_rarity(categoria.tipos, terrain, rng)
+        condicao = roll_for_detail(categoria.condicoes, rng)
+        raca = roll_for_detail(categoria.racas, rng) if categoria.racas else None
         
-        return {
-            'descricao': f"{category_data['category']} - {tipo} ({condicao})",
-            'tipo': folder_name
-        }
+        return Criatura(tipo, categoria.tipo, categoria.categoria, condicao, raca, raridade)
 
     except Exception as e:
         print(f"Erro ao gerar criatura: {str(e)}")
-        return {'descricao': "Criatura indefinida", 'tipo': None}
+        return Criatura("Criatura indefinida")
 
 def map_category_to_type(category):
     """Mapeia categorias para tipos de características"""
@@ -338,164 +327,144 @@ def map_category_to_type(category):
     }
     return mapeamento.get(category, 'monstro')
 
-def generate_single_encounter(is_night, terrain, encounter_type=None):
-    """Gera um encontro completo com probabilidades por terreno"""
+def generate_single_encounter(is_night, terrain, encounter_type=None, rng=None):
+    """Gera um Encontro completo com probabilidades por terreno ('rng' aceita uma seed ou um random.Random)"""
+    rng = como_rng(rng)
     try:
-        encounters = load_terrain_encounters(terrain)
-        type_names = {
-            'false_alarm': 'Alarme falso',
-            'creatures': 'Criaturas',
-            'anomaly': 'Anomalia',
-            'creatures_anomaly': 'Criaturas + Anomalia',
-            'temporary_obstacle': 'Obstáculo temporário',
-            'obstacle_creatures': 'Obstáculo + Criaturas',
-            'event': 'Evento especial',
-            'double_roll': 'Evento duplo'
-        }
+        # Sorteadores e textos do terreno já compilados (ver esquemas.plano_encontros)
+        plano = plano_encontros(terrain)
+        textos = plano.textos
 
         if not encounter_type:
-            config = json.load(open('tipos_encontro.json', encoding='utf-8'))
-            terrain_config = config.get(terrain, {})
-            
-            if isinstance(terrain_config, dict) and all(isinstance(v, int) for v in terrain_config.values()):
-                encounter_type = select_by_weight(terrain_config)
-            else:
-                roll = random.randint(1, 20)
-                for encounter, range_values in terrain_config.items():
-                    if isinstance(range_values, list) and len(range_values) == 2:
-                        if range_values[0] <= roll <= range_values[1]:
-                            encounter_type = encounter
-                            break
-                    elif isinstance(range_values, int) and roll == range_values:
-                        encounter_type = encounter
-                        break
+            encounter_type = plano.tipos.sortear(rng) if plano.tipos else None
 
         if not encounter_type:
-            return {
-                'description': "Encontro indefinido",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': None
-            }
+            return Encontro(encounter_type, rng.randint(1, 20), mensagem="Encontro indefinido")
 
         if encounter_type == 'false_alarm':
-            options = encounters['false_alarms']
-            chosen = random.choice(list(options.items()))
-            return {
-                'description': f"{type_names['false_alarm']}: {chosen[0]}",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': None
-            }
+            elementos = (rng.choice(textos['false_alarm']),)
         
         elif encounter_type == 'creatures':
-            creature_data = generate_creature(terrain)
-            return {
-                'description': f"{type_names['creatures']}: {creature_data['descricao']}",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': {
-                    'tipo': creature_data['tipo']
-                }
-            }
+            elementos = (generate_creature(terrain, rng),)
         
         elif encounter_type == 'anomaly':
-            options = encounters['anomalies']
-            chosen = random.choice(list(options.items()))
-            return {
-                'description': f"{type_names['anomaly']}: {chosen[0]}",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': None
-            }
+            elementos = (rng.choice(textos['anomaly']),)
         
         elif encounter_type == 'creatures_anomaly':
-            creature_data = generate_creature(terrain)
-            anomaly = random.choice(list(encounters['anomalies'].items()))
-            return {
-                'description': f"{type_names['creatures_anomaly']}: {creature_data['descricao']} e {anomaly[0]}",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': {
-                    'tipo': creature_data['tipo']
-                }
-            }
+            creature = generate_creature(terrain, rng)
+            elementos = (creature, rng.choice(textos['anomaly']))
         
         elif encounter_type == 'temporary_obstacle':
-            options = encounters['temporary_obstacles']
-            chosen = random.choice(list(options.items()))
-            return {
-                'description': f"{type_names['temporary_obstacle']}: {chosen[0]}",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': None
-            }
+            elementos = (rng.choice(textos['temporary_obstacle']),)
         
         elif encounter_type == 'obstacle_creatures':
-            obstacle = random.choice(list(encounters['temporary_obstacles'].items()))
-            creature_data = generate_creature(terrain)
-            return {
-                'description': f"{type_names['obstacle_creatures']}: {obstacle[0]} e {creature_data['descricao']}",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': {
-                    'tipo': creature_data['tipo']
-                }
-            }
+            obstacle = rng.choice(textos['temporary_obstacle'])
+            elementos = (obstacle, generate_creature(terrain, rng))
         
         elif encounter_type == 'event':
-            options = encounters['events']
-            chosen = random.choice(list(options.items()))
-            return {
-                'description': f"{type_names['event']}: {chosen[0]}",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': None
-            }
+            elementos = (rng.choice(textos['event']),)
         
         elif encounter_type == 'double_roll':
-            first = generate_single_encounter(is_night, terrain)
-            second = generate_single_encounter(is_night, terrain)
-            
-            if not first or not second:
-                return {
-                    'description': "Evento duplo falhou",
-                    'time_roll': random.randint(1, 20),
-                    'encounter_data': None
-                }
-            
-            first_desc = first['description'].split(": ", 1)[-1]
-            second_desc = second['description'].split(": ", 1)[-1]
-            return {
-                'description': f"Evento duplo: {first_desc} e também {second_desc}",
-                'time_roll': random.randint(1, 20),
-                'encounter_data': None
-            }
+            first = generate_single_encounter(is_night, terrain, rng=rng)
+            second = generate_single_encounter(is_night, terrain, rng=rng)
+            elementos = (first, second)
         
-        return {
-            'description': "Tipo de encontro desconhecido",
-            'time_roll': random.randint(1, 20),
-            'encounter_data': None
-        }
+        else:
+            return Encontro(encounter_type, rng.randint(1, 20), mensagem="Tipo de encontro desconhecido")
+
+        return Encontro(encounter_type, rng.randint(1, 20), elementos)
 
     except Exception as e:
         print(f"Erro ao gerar encontro: {str(e)}")
-        return {
-            'description': "Erro no sistema",
-            'time_roll': random.randint(1, 20),
-            'encounter_data': None
-        }
+        return Encontro(encounter_type, rng.randint(1, 20), mensagem="Erro no sistema")
+
+def _roll_days(terrain, days, is_night, rng):
+    """Rola a viagem dia a dia, entregando o DiaViagem de cada dia com encontro e None nos demais."""
+    rng = como_rng(rng)
+    # Plano compilado do terreno e período (chance diária e horários), reaproveitado entre viagens
+    plano = plano_viagem(terrain, is_night)
+    sortear_dia = plano.chance.sortear
+    horarios = plano.horarios
+    # Sem instrumentação, o laço não cronometra nem monta rótulos
+    medir = metricas.ativas
+    terreno_metricas = rotulo_terreno(terrain) if medir else None
 
-def save_to_txt(results, terrain, days, is_night):
-    """Salva os resultados em arquivo TXT"""
+    for day in range(1, days + 1):
+        # Cada dia é um só sorteio: "encontro" ou "sem_encontro"
+        if sortear_dia(rng) == "encontro":
+            if medir:
+                inicio = time.perf_counter()
+                encontro = generate_single_encounter(is_night, terrain, rng=rng)
+                metricas.observar('encontro_segundos', time.perf_counter() - inicio,
+                                  terreno=terreno_metricas, tipo=encontro.tipo)
+            else:
+                encontro = generate_single_encounter(is_night, terrain, rng=rng)
+            
+            time_of_day = horarios[encontro.time_roll] if horarios else None
+            
+            yield DiaViagem(day, encontro, time_of_day)
+        else: # Se o resultado foi "sem_encontro"
+            yield None
+
+def generate_trip_days(terrain, days, is_night, rng=None):
+    """
+    Rola a viagem dia a dia, entregando cada DiaViagem assim que é sorteado (sem guardar a lista).
+    Com a mesma seed em 'rng', a mesma viagem é gerada novamente.
+    """
+    for day, dia in enumerate(_roll_days(terrain, days, is_night, rng), 1):
+        yield dia or DiaViagem(day)
+
+def generate_trip_encounters(terrain, days, is_night, rng=None):
+    """Mesma rolagem de 'generate_trip_days', mas entrega só os dias com encontro."""
+    for dia in _roll_days(terrain, days, is_night, rng):
+        if dia:
+            yield dia
+
+def generate_trip(terrain, days, is_night, rng=None):
+    """Rola a viagem inteira e devolve um ResultadoViagem (só os dias com encontro ficam em memória)."""
+    resultado = ResultadoViagem(days)
+    for dia in generate_trip_encounters(terrain, days, is_night, rng):
+        resultado.adicionar(dia)
+    return resultado
+
+def save_to_txt(results, terrain, days, is_night, seed=None, chave_terreno=None):
+    """
+    Monta o relatório TXT e o entrega ao gravador em segundo plano (a requisição não espera o disco).
+    'chave_terreno' (ex.: 'floresta') é o valor indexado para a busca em /api/logs; 'terrain' é o nome exibido.
+    """
     try:
-        os.makedirs('logs', exist_ok=True)
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"viagem_{terrain}_{timestamp}.txt"
-        full_path = os.path.join('logs', filename)
+        agora = datetime.datetime.now()
+        timestamp = agora.strftime("%Y%m%d_%H%M%S")
+        filename = f"viagem_{terrain}_{timestamp}_{novo_id()}.txt"
         
-        content = f"=== Relatório de Viagem ===\n"
-        content += f"Terreno: {terrain}\nDias: {days}\nPeríodo: {'noite' if is_night else 'dia'}\n\n"
+        linhas = [
+            "=== Relatório de Viagem ===",
+            f"Terreno: {terrain}",
+            f"Dias: {days}",
+            f"Período: {'noite' if is_night else 'dia'}",
+        ]
+        if seed is not None:
+            linhas.append(f"Semente: {seed}")
+        linhas.append("")
         
+        # Cada descrição é montada uma vez só, para o texto e para a linha indexada do encontro
+        encontros = []
         for r in results:
-            content += f"Dia {r['day']}: "
-            content += f"{r['encounter']} ({r['time_of_day']})\n" if r['encounter'] else "Sem encontros\n"
-        
-        with open(full_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+            descricao = None
+            if r.encontro:
+                descricao = descricao_encontro(r.encontro)
+                encontros.append((r.dia, r.encontro.tipo, r.horario, descricao))
+            linhas.append(linha_txt(r, descricao))
         
+        viagem = {
+            'terreno': chave_terreno or terrain,
+            'dias': days,
+            'periodo': 'noite' if is_night else 'dia',
+            'seed': seed,
+            'criado': agora.isoformat(sep=' ', timespec='seconds'),
+            'encontros': encontros
+        }
+        gravador.enviar(filename, "\n".join(linhas) + "\n", viagem)
         return f"logs/{filename}"
     except Exception as e:
         print(f"Erro ao salvar TXT: {str(e)}")
@@ -520,21 +489,155 @@ def load_characteristics_file(tipo: str) -> dict:
     
     caminho = os.path.join('encounters', 'caracteristicas', arquivo)
     
-    if not os.path.exists(caminho):
+    if not registro.existe(caminho):
         raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
     
-    with open(caminho, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return load_json(caminho)
+
+@lru_cache(maxsize=8)
+def characteristic_keys(tipo: str) -> tuple:
+    """Nomes das características do tipo, guardados como tupla para o sorteio"""
+    return tuple(load_characteristics_file(tipo))
+
+def sortear_caracteristicas(tipo, qtd, rng=random):
+    """Sorteia até 'qtd' características distintas do tipo"""
+    caracteristicas = load_characteristics_file(tipo)
+    chaves = characteristic_keys(tipo)
+    
+    qtd = max(0, min(qtd, len(chaves)))
+    return [
+        {'caracteristica': chave, 'efeito': caracteristicas[chave]}
+        for chave in rng.sample(chaves, qtd)
+    ]
+
+def sortear_caracteristicas_lote(pedidos, rng=random):
+    """
+    Sorteia as características de vários pedidos (tipo, qtd) de uma vez, na ordem recebida.
+    Um tipo inválido não interrompe o lote: o item correspondente volta com 'error'.
+    """
+    resultados = []
+    for tipo, qtd in pedidos:
+        try:
+            resultados.append({'tipo': tipo, 'caracteristicas': sortear_caracteristicas(tipo, qtd, rng)})
+        except (ValueError, FileNotFoundError) as e:
+            resultados.append({'tipo': tipo, 'error': str(e)})
+    return resultados
+
+def ler_pedidos_caracteristicas(payload):
+    """
+    Valida o corpo de /api/caracteristicas: {"pedidos": [{"tipo": "animal", "qtd": 2}, ...]}.
+    Devolve a lista de (tipo, qtd); levanta ValueError com a mensagem para o cliente.
+    """
+    pedidos = payload.get('pedidos') if isinstance(payload, dict) else None
+    if not isinstance(pedidos, list):
+        raise ValueError("O corpo deve ser {'pedidos': [{'tipo': ..., 'qtd': ...}, ...]}.")
+    if len(pedidos) > MAX_PEDIDOS_CARACTERISTICAS:
+        raise ValueError(f"No máximo {MAX_PEDIDOS_CARACTERISTICAS} pedidos por requisição.")
+    try:
+        return [(str(p['tipo']), int(p.get('qtd', 1))) for p in pedidos]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError("Cada pedido precisa de 'tipo' e de um 'qtd' inteiro.")
+
+@lru_cache(maxsize=1)
+def equipment_generator():
+    """GeradorEquipamentos do processo: criado (e 'equipamentos.json' lido) uma única vez, até a próxima recarga"""
+    return GeradorEquipamentos()
+
+def parear_armas(equipamentos):
+    """Lista (arma, escudo, arma secundária) de cada arma primária, buscando os pares uma única vez"""
+    escudos = equipamentos.get("armas_com_escudos") or {}
+    duplas = equipamentos.get("armas_duplas") or {}
+    pares = []
+    for arma in equipamentos.get("armas_primarias", []):
+        nome_arma = arma.get('nome', '')
+        pares.append((arma, escudos.get(nome_arma), duplas.get(nome_arma)))
+    return pares
+
+def gerar_equipamentos(qtd_armas, qtd_armaduras, formatar=True):
+    """
+    Gera armas e armaduras com o GeradorEquipamentos do processo. Com 'formatar' (padrão), cada item
+    volta como texto para o front-end; sem, volta com os dados do gerador (para APIs).
+    """
+    gerador = equipment_generator()
+    equipamentos = gerador.gerar_equipamentos(qtd_armas=qtd_armas, qtd_armaduras=qtd_armaduras)
+    armaduras = equipamentos.get("armaduras", [])
+    pares = parear_armas(equipamentos)
+
+    if not formatar:
+        return {
+            'armaduras': armaduras,
+            'armas': [{'arma': arma, 'escudo': escudo, 'arma_secundaria': secundaria}
+                      for arma, escudo, secundaria in pares]
+        }
+
+    formatar_equipamento = gerador.formatar_equipamento
+    return {
+        'armaduras': [formatar_equipamento(armadura) for armadura in armaduras],
+        'armas': [formatar_equipamento(arma, escudo, secundaria) for arma, escudo, secundaria in pares]
+    }
+
+def equipar_grupo(npcs, formatar=True):
+    """Equipa vários NPCs [(qtd_armas, qtd_armaduras), ...] com o mesmo gerador; um resultado por NPC"""
+    return [gerar_equipamentos(qtd_armas, qtd_armaduras, formatar) for qtd_armas, qtd_armaduras in npcs]
+
+def ler_pedido_equipamentos(payload):
+    """
+    Valida o corpo de /api/equipamentos: {"npcs": [{"qtd_armas": 1, "qtd_armaduras": 1}, ...]} ou,
+    para um grupo uniforme, {"quantidade": 200, "qtd_armas": 1, "qtd_armaduras": 1}.
+    Devolve a lista de (qtd_armas, qtd_armaduras); levanta ValueError com a mensagem para o cliente.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("O corpo deve ser um objeto JSON com 'npcs' ou 'quantidade'.")
+    try:
+        quantidade = len(payload['npcs']) if 'npcs' in payload else int(payload['quantidade'])
+        if quantidade > MAX_NPCS_EQUIPAMENTOS:
+            raise OverflowError
+        if 'npcs' in payload:
+            npcs = [(int(n.get('qtd_armas', 0)), int(n.get('qtd_armaduras', 0))) for n in payload['npcs']]
+        else:
+            npcs = [(int(payload.get('qtd_armas', 0)), int(payload.get('qtd_armaduras', 0)))] * max(0, quantidade)
+    except OverflowError:
+        raise ValueError(f"No máximo {MAX_NPCS_EQUIPAMENTOS} NPCs por requisição.")
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError("Informe 'npcs' (lista de {'qtd_armas', 'qtd_armaduras'}) ou 'quantidade' inteira.")
+    if any(not 0 <= qtd <= MAX_ITENS_POR_NPC for npc in npcs for qtd in npc):
+        raise ValueError(f"As quantidades por NPC devem estar entre 0 e {MAX_ITENS_POR_NPC}.")
+    return npcs
+
+# Cada worker limpa o próprio cache de características quando recarrega as tabelas
+registro.ao_recarregar(load_characteristics_file.cache_clear)
+registro.ao_recarregar(characteristic_keys.cache_clear)
+registro.ao_recarregar(equipment_generator.cache_clear)
 
 # ========== ROTAS PRINCIPAIS ==========
+MAX_STREAM_DAYS = 1_000_000
+MAX_AMOSTRAS = 10_000_000  # cada simulação aloca arrays do NumPy desse tamanho
+MAX_PEDIDOS_CARACTERISTICAS = 1_000
+MAX_NPCS_EQUIPAMENTOS = 1_000
+MAX_ITENS_POR_NPC = 10
+
+def terreno_conhecido(terrain) -> bool:
+    """Indica se o terreno está em tipos_terreno.json; as rotas recusam os demais antes de compilar um plano."""
+    return terrain in load_json('tipos_terreno.json')
+
+def rotulo_terreno(terrain) -> str:
+    """Rótulo do terreno nas métricas: os terrenos fora de tipos_terreno.json viram 'desconhecido'."""
+    return rotulo(terrain, load_json('tipos_terreno.json'))
+
+@app.before_request
+def sincronizar_tabelas():
+    """Recarrega as tabelas se outro worker publicou uma versão nova (e inicia o vigia, se ativo)."""
+    vigia.garantir()
+    registro.sincronizar()
+
 @app.route('/')
 def index():
-    terrains = json.load(open('tipos_terreno.json', encoding='utf-8'))
+    terrains = load_json('tipos_terreno.json')
     return render_template('index.html', terrains=terrains)
 
 @app.route('/generate', methods=['POST', 'GET'])
 def generate():
-    terrains = json.load(open('tipos_terreno.json', encoding='utf-8'))
+    terrains = load_json('tipos_terreno.json')
     
     if request.method == 'POST':
         terrain = request.form['terrain']
@@ -547,108 +650,86 @@ def generate():
             'is_night': is_night
         }
     else:
+        # Parâmetros na URL (ex.: link de repetição com seed) têm prioridade sobre a sessão
         params = session.get('viagem_params', {})
-        terrain = params.get('terrain', 'floresta')
-        days = params.get('days', 1)
-        is_night = params.get('is_night', False)
+        terrain = request.args.get('terrain', params.get('terrain', 'floresta'))
+        days = request.args.get('days', default=params.get('days', 1), type=int)
+        is_night = request.args.get('time', 'night' if params.get('is_night', False) else 'day') == 'night'
     
-    with open('chance_encontro.json', 'r', encoding='utf-8') as f:
-        chances_data = json.load(f)
-
-    # Define o período como uma string para usar como chave no JSON
-    periodo = "noite" if is_night else "dia"
-
-    # Busca a chance no JSON, com um valor padrão para segurança
-    # Se o terreno não for encontrado, usa a chance padrão de 8.
-    default_chance = 8 
-    encounter_chance = chances_data.get(terrain, {}).get(periodo, default_chance)
-
-    results = []
+    if not terreno_conhecido(terrain):
+        return jsonify({'error': f"Terreno desconhecido: '{terrain}'"}), 400
     
-    for day in range(1, days + 1):
-        peso_encontro = encounter_chance
-
-        # O peso total da "rolagem" será 100
-        # O peso para "não ter encontro" é o que falta para chegar em 100
-        # Garantimos que não seja negativo se o peso do encontro for > 100
-        peso_sem_encontro = max(0, 100 - peso_encontro)
-
-        # Criamos as opções para a função de seleção por peso.
-        opcoes_de_evento = {
-            "encontro": peso_encontro,
-            "sem_encontro": peso_sem_encontro
-        }
-
-        # Sorteamos o resultado do dia usando a função que já conhecemos.
-        resultado_do_dia = select_by_weight(opcoes_de_evento)
-
-        # Verificamos se o resultado sorteado foi "encontro".
-        if resultado_do_dia == "encontro":
-            encounter_data = generate_single_encounter(is_night, terrain)
-            
-            horarios = json.load(open('horario.json', encoding='utf-8'))
-            time_of_day = None
-            
-            for time, time_range in horarios.items():
-                if isinstance(time_range, list):
-                    if time_range[0] <= encounter_data['time_roll'] <= time_range[1]:
-                        time_of_day = time
-                        break
-                elif time_range == encounter_data['time_roll']:
-                    time_of_day = time
-                    break
-            
-            results.append({
-                'day': day,
-                'encounter': encounter_data['description'],
-                'time_of_day': time_of_day,
-                'encounter_data': encounter_data['encounter_data']
-            })
-        else: # Se o resultado foi "sem_encontro"
-            results.append({
-                'day': day,
-                'encounter': None,
-                'time_of_day': None,
-                'encounter_data': None
-            })
+    rng, seed = criar_rng(request.values.get('seed', type=int))
+    with metricas.medir('viagem_segundos', terreno=rotulo_terreno(terrain)):
+        results = generate_trip(terrain, days, is_night, rng)
     
-    txt_file = save_to_txt(results, terrains.get(terrain, terrain), days, is_night)
+    with metricas.medir('relatorio_segundos'):
+        txt_file = save_to_txt(results, terrains.get(terrain, terrain), days, is_night, seed, terrain)
     caracteristicas_qtd = request.args.get('qtd_carac', default=1, type=int)
+    replay_url = url_for('generate', terrain=terrain, days=days, time='night' if is_night else 'day', seed=seed)
+    
+    with metricas.medir('renderizacao_segundos', template='results.html'):
+        return render_template('results.html',
+                               results=results,
+                               terrain=terrains.get(terrain, terrain),
+                               days=days,
+                               txt_file=txt_file,
+                               qtd_caracteristicas=caracteristicas_qtd,
+                               seed=seed,
+                               replay_url=replay_url)
+
+@app.route('/api/travel/stream', methods=['GET', 'POST'])
+def travel_stream():
+    """Gera a viagem como NDJSON, enviando uma linha por dia assim que ele é rolado"""
+    params = request.values
+    terrain = params.get('terrain', 'floresta')
+    days = params.get('days', default=1, type=int)
+    is_night = params.get('time') == 'night'
     
-    return render_template('results.html',
-                           results=results,
-                           terrain=terrains.get(terrain, terrain),
-                           days=days,
-                           txt_file=txt_file,
-                           qtd_caracteristicas=caracteristicas_qtd)
+    if days is None or not 1 <= days <= MAX_STREAM_DAYS:
+        return jsonify({'error': f"'days' deve estar entre 1 e {MAX_STREAM_DAYS}"}), 400
+    if not terreno_conhecido(terrain):
+        return jsonify({'error': f"Terreno desconhecido: '{terrain}'"}), 400
+    
+    rng, seed = criar_rng(params.get('seed', type=int))
+    
+    def linhas():
+        for dia in generate_trip_days(terrain, days, is_night, rng):
+            yield json.dumps(dia_json(dia), ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(linhas()), mimetype='application/x-ndjson', headers={'X-Seed': str(seed)})
 
 @app.route('/gerar-caracteristicas/<tipo>')
 def gerar_caracteristicas(tipo):
-    """Gera múltiplas características para o tipo especificado"""
+    """Gera múltiplas características para o tipo especificado (a seed usada volta no cabeçalho X-Seed)"""
     try:
         qtd = request.args.get('qtd', default=1, type=int)
-        caracteristicas = load_characteristics_file(tipo)
-        
-        qtd = min(qtd, len(caracteristicas))
-        resultados = []
-        chaves = list(caracteristicas.keys())
-        
-        for _ in range(qtd):
-            if not chaves:
-                break
-            chave = random.choice(chaves)
-            resultados.append({
-                'caracteristica': chave,
-                'efeito': caracteristicas[chave]
-            })
-            chaves.remove(chave)
+        rng, seed = criar_rng(request.args.get('seed', type=int))
+        resultados = sortear_caracteristicas(tipo, qtd, rng)
             
-        return jsonify(resultados)
+        response = jsonify(resultados)
+        response.headers['X-Seed'] = str(seed)
+        return response
         
     except Exception as e:
         print(f"Erro ao gerar características: {str(e)}")
         return jsonify({'error': str(e)}), 400
     
+@app.route('/api/caracteristicas', methods=['POST'])
+def caracteristicas_lote():
+    """
+    Gera as características de vários tipos em uma única requisição (ex.: todas as criaturas de uma viagem).
+    Corpo: {"pedidos": [{"tipo": "animal", "qtd": 2}, ...], "seed": N (opcional)}.
+    Resposta: {"seed": N, "resultados": [{"tipo": ..., "caracteristicas": [...]} ou {"tipo": ..., "error": ...}]}.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        pedidos = ler_pedidos_caracteristicas(payload)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rng, seed = criar_rng(payload.get('seed') if isinstance(payload.get('seed'), int) else None)
+    return jsonify({'seed': seed, 'resultados': sortear_caracteristicas_lote(pedidos, rng)})
+
 @app.route('/gerar-equipamentos')
 def gerar_equipamentos_route():
     """Gera armas e armaduras usando o GeradorEquipamentos."""
@@ -657,30 +738,7 @@ def gerar_equipamentos_route():
         qtd_armas = request.args.get('qtd_armas', default=0, type=int)
         qtd_armaduras = request.args.get('qtd_armaduras', default=0, type=int)
 
-        # Cria a instância do gerador
-        # (Certifique-se que 'equipamentos.json' está na mesma pasta)
-        gerador = GeradorEquipamentos()
-
-        # Gera os equipamentos
-        equipamentos = gerador.gerar_equipamentos(qtd_armas=qtd_armas, qtd_armaduras=qtd_armaduras)
-
-        # Formata os resultados para facilitar a exibição no front-end
-        armaduras_formatadas = []
-        for armadura in equipamentos.get("armaduras", []):
-            armaduras_formatadas.append(gerador.formatar_equipamento(armadura))
-
-        armas_formatadas = []
-        for arma_primaria in equipamentos.get("armas_primarias", []):
-            # Procura por escudos ou armas secundárias associadas
-            nome_arma = arma_primaria.get('nome', '')
-            escudo = equipamentos["armas_com_escudos"].get(nome_arma)
-            arma_secundaria = equipamentos["armas_duplas"].get(nome_arma)
-            armas_formatadas.append(gerador.formatar_equipamento(arma_primaria, escudo, arma_secundaria))
-            
-        return jsonify({
-            'armaduras': armaduras_formatadas,
-            'armas': armas_formatadas
-        })
+        return jsonify(gerar_equipamentos(qtd_armas, qtd_armaduras))
 
     except FileNotFoundError:
         return jsonify({'error': "Arquivo 'equipamentos.json' não encontrado no servidor."}), 500
@@ -688,34 +746,91 @@ def gerar_equipamentos_route():
         print(f"Erro ao gerar equipamentos: {str(e)}")
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/equipamentos', methods=['POST'])
+def equipamentos_lote():
+    """
+    Equipa um grupo inteiro de NPCs em uma única requisição.
+    Corpo: {"npcs": [{"qtd_armas": 1, "qtd_armaduras": 1}, ...]} ou {"quantidade": N, "qtd_armas": ..., "qtd_armaduras": ...};
+    "formatar": false devolve os itens com os dados do gerador em vez do texto formatado.
+    """
+    payload = request.get_json(silent=True)
+    try:
+        npcs = ler_pedido_equipamentos(payload)
+        return jsonify({'npcs': equipar_grupo(npcs, payload.get('formatar', True) is not False)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': "Arquivo 'equipamentos.json' não encontrado no servidor."}), 500
+
 @app.route('/limpar-cache')
 def limpar_cache():
-    load_characteristics_file.cache_clear()
-    return jsonify({'status': 'Cache de características limpo'})
+    total = registro.publicar()
+    return jsonify({'status': f'Cache de características limpo e tabelas recarregadas ({total} arquivos)'})
 
 @app.route('/logs/<filename>')
 def serve_log(filename):
-    return send_from_directory('logs', filename)
+    conteudo = gravador.ler(filename)
+    if conteudo is None:
+        abort(404)
+    return Response(conteudo, mimetype='text/plain')
+
+def _filtros_logs(params):
+    """Filtros da busca de relatórios vindos da query string."""
+    return {campo: params.get(campo) for campo in ('terreno', 'periodo', 'tipo', 'de', 'ate')}
+
+@app.route('/api/logs')
+def api_logs():
+    """
+    Busca paginada nos relatórios de viagem: ?terreno=&periodo=&tipo=&de=AAAA-MM-DD&ate=AAAA-MM-DD&limite=50.
+    A próxima página é pedida com ?antes=<proximo> da resposta anterior.
+    """
+    try:
+        pagina = gravador.buscar(
+            _filtros_logs(request.args),
+            limite=request.args.get('limite', default=50, type=int),
+            antes=request.args.get('antes', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': f"Data inválida: {str(e)}"}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 400
+    for viagem in pagina['viagens']:
+        viagem['url'] = url_for('serve_log', filename=viagem['nome'])
+    return jsonify(pagina)
+
+@app.route('/api/logs/export')
+def api_logs_export():
+    """Exporta todas as viagens que casam com os filtros (mesmos de /api/logs) como NDJSON, em streaming."""
+    try:
+        viagens = gravador.exportar(_filtros_logs(request.args))
+        primeira = next(viagens, None)
+    except ValueError as e:
+        return jsonify({'error': f"Data inválida: {str(e)}"}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def linhas():
+        if primeira is None:
+            return
+        yield json.dumps(primeira, ensure_ascii=False) + '\n'
+        for viagem in viagens:
+            yield json.dumps(viagem, ensure_ascii=False) + '\n'
+    
+    return Response(linhas(), mimetype='application/x-ndjson')
 
 # ========== ROTAS DE DEBUG ==========
+# Os relatórios são escritos direto em um buffer da requisição (sem trocar o sys.stdout do processo).
+# Para ver onde o tempo de qualquer rota é gasto, use ?profile=1 (veja metricas.instrumentar).
 @app.route('/debug/probabilidades/<terrain>')
 def debug_probabilidades_route(terrain):
-    old_stdout = sys.stdout
-    sys.stdout = buffer = StringIO()
-    
-    debug_category_probabilities(terrain)
-    
-    sys.stdout = old_stdout
+    buffer = StringIO()
+    debug_category_probabilities(terrain, buffer)
     return f"<pre>{buffer.getvalue()}</pre>"
 
 @app.route('/debug/encontros/<terrain>')
 def debug_encontros_route(terrain):
-    old_stdout = sys.stdout
-    sys.stdout = buffer = StringIO()
-    
-    debug_encounter_types(terrain)
-    
-    sys.stdout = old_stdout
+    buffer = StringIO()
+    debug_encounter_types(terrain, buffer)
     return f"<pre>{buffer.getvalue()}</pre>"
 
 @app.route('/debug/all')
@@ -724,22 +839,60 @@ def debug_all():
     terrains = ['floresta', 'deserto', 'cidade', 'planicie', 'costa']
     
     for terrain in terrains:
-        old_stdout = sys.stdout
-        sys.stdout = buffer = StringIO()
-        debug_category_probabilities(terrain, samples=5000)
-        sys.stdout = old_stdout
+        buffer = StringIO()
+        debug_category_probabilities(terrain, buffer)
         results.append(f"<h2>{terrain.upper()}</h2><pre>{buffer.getvalue()}</pre>")
         
-        old_stdout = sys.stdout
-        sys.stdout = buffer = StringIO()
-        debug_encounter_types(terrain, samples=5000)
-        sys.stdout = old_stdout
+        buffer = StringIO()
+        debug_encounter_types(terrain, buffer)
         results.append(f"<pre>{buffer.getvalue()}</pre><hr>")
     
     return ''.join(results)
 
+@app.route('/api/probabilidades/<terrain>')
+def probabilidades_api(terrain):
+    """Probabilidades exatas do terreno em JSON: categorias, árvore categoria -> raridade -> tipo, tipos de encontro e chance diária"""
+    if not terreno_conhecido(terrain):
+        return jsonify({'error': f"Terreno desconhecido: '{terrain}'"}), 404
+    try:
+        return jsonify({
+            'terreno': terrain,
+            'chance_encontro': {
+                'dia': exact_encounter_chance(terrain, False),
+                'noite': exact_encounter_chance(terrain, True)
+            },
+            'tipos_encontro': exact_encounter_types(terrain),
+            'categorias': exact_categories(terrain),
+            'criaturas': exact_creature_types(terrain)
+        })
+    except Exception as e:
+        print(f"Erro ao calcular probabilidades: {str(e)}")
+        return jsonify({'error': f"Erro ao calcular as probabilidades de '{terrain}': {str(e)}"}), 500
+
+@app.route('/api/debug/<terrain>')
+def debug_api(terrain):
+    """Relatórios de simulação em JSON (contagens, empírico x teórico e qui-quadrado)"""
+    amostras = request.args.get('amostras', default=1_000_000, type=int)
+    seed = request.args.get('seed', default=None, type=int)
+    if not 1 <= amostras <= MAX_AMOSTRAS:
+        return jsonify({'error': f"'amostras' deve estar entre 1 e {MAX_AMOSTRAS}"}), 400
+    try:
+        return jsonify({
+            'terreno': terrain,
+            'categorias': simulate_categories(terrain, amostras, seed),
+            'tipos_encontro': simulate_encounter_types(terrain, amostras, seed)
+        })
+    except Exception as e:
+        print(f"Erro no debug: {str(e)}")
+        return jsonify({'error': str(e)}), 400
+
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'compilar':
+        # A estrutura padrão já foi criada na importação; o snapshot a inclui
+        print(f"Snapshot gravado com {registro.compilar()} tabelas")
+        sys.exit(0)
+
     if os.environ.get('DEBUG') == '1':
         print("<br>=== INICIANDO DEBUG ===")
         debug_category_probabilities('floresta')
@@ -0,0 +1,143 @@
+# vigia.py
+import os
+import threading
+import time
+from tabelas import registro, normalizar_caminho
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # sem o watchdog, o vigia confere os arquivos por mtime
+    FileSystemEventHandler = object
+    Observer = None
+
+# ========== RECARGA AUTOMÁTICA DAS TABELAS EDITADAS ==========
+# Com TABELAS_VIGIAR=1, cada processo vigia a pasta 'encounters' e os arquivos avulsos e aplica
+# no registro só as tabelas alteradas ('registro.atualizar'), sem precisar do /limpar-cache.
+# Usa o watchdog (inotify e equivalentes) se estiver instalado; senão, ou com TABELAS_VIGIAR=polling,
+# compara o mtime dos arquivos a cada TABELAS_VIGIAR_INTERVALO segundos.
+
+MODO_VIGIA = os.environ.get('TABELAS_VIGIAR', '')  # '', '1' (automático) ou 'polling'
+INTERVALO_VIGIA = float(os.environ.get('TABELAS_VIGIAR_INTERVALO', 1.0))
+ESPERA_EVENTOS = 0.2  # junta os vários eventos que um editor gera ao salvar um arquivo
+
+EVENTOS_DE_ESCRITA = ('created', 'modified', 'deleted', 'moved')
+
+
+class _Eventos(FileSystemEventHandler):
+    def __init__(self, vigia):
+        super().__init__()
+        self.vigia = vigia
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in EVENTOS_DE_ESCRITA:
+            return
+        self.vigia.notificar(event.src_path)
+        if getattr(event, 'dest_path', None):
+            self.vigia.notificar(event.dest_path)
+
+
+class VigiaTabelas:
+    """
+    Thread que percebe as tabelas editadas no disco e as troca no registro, uma recarga
+    incremental por lote de alterações. Como as threads não sobrevivem a um fork,
+    'garantir' (chamado a cada requisição) inicia o vigia no processo atual se preciso.
+    """
+
+    def __init__(self, registro_tabelas=registro, modo: str = MODO_VIGIA, intervalo: float = INTERVALO_VIGIA):
+        self.registro = registro_tabelas
+        self.modo = modo
+        self.intervalo = intervalo
+        self.base = os.getcwd()
+        self._thread = None
+        self._observador = None
+        self._pid = None
+        self._pendentes = set()
+        self._novos_eventos = threading.Event()
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        return self.modo in ('1', 'polling')
+
+    def garantir(self):
+        """Inicia o vigia neste processo, se ele estiver ativo e ainda não estiver rodando."""
+        if not self.ativo or (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._iniciar()
+
+    def _iniciar(self):
+        self._pid = os.getpid()
+        self._parar.clear()
+        if Observer is not None and self.modo != 'polling':
+            self._observador = Observer()
+            eventos = _Eventos(self)
+            self._observador.schedule(eventos, self.registro.raiz, recursive=True)
+            for pasta in {os.path.dirname(a) or '.' for a in self.registro.avulsos}:
+                self._observador.schedule(eventos, pasta, recursive=False)
+            self._observador.daemon = True
+            self._observador.start()
+            alvo = self._laco_eventos
+        else:
+            self._observador = None
+            alvo = self._laco_polling
+        self._thread = threading.Thread(target=alvo, name='vigia-tabelas', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """Encerra o vigia (e o observador do watchdog, se houver)."""
+        self._parar.set()
+        self._novos_eventos.set()
+        if self._observador is not None:
+            self._observador.stop()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        self._thread = None
+
+    # ----- watchdog -----
+
+    def notificar(self, caminho: str):
+        """Registra um arquivo alterado (caminho absoluto ou relativo à pasta do app)."""
+        chave = normalizar_caminho(os.path.relpath(caminho, self.base))
+        if self.registro.vigiado(chave):
+            with self._lock:
+                self._pendentes.add(chave)
+            self._novos_eventos.set()
+
+    def _laco_eventos(self):
+        while not self._parar.is_set():
+            self._novos_eventos.wait()
+            if self._parar.is_set():
+                break
+            time.sleep(ESPERA_EVENTOS)
+            self._novos_eventos.clear()
+            with self._lock:
+                alterados, self._pendentes = self._pendentes, set()
+            if alterados:
+                self._aplicar(alterados)
+
+    # ----- polling -----
+
+    def _laco_polling(self):
+        anterior = self.registro.estado_arquivos()
+        while not self._parar.wait(self.intervalo):
+            atual = self.registro.estado_arquivos()
+            alterados = {caminho for caminho in anterior.keys() | atual.keys()
+                         if anterior.get(caminho) != atual.get(caminho)}
+            anterior = atual
+            if alterados:
+                self._aplicar(alterados)
+
+    def _aplicar(self, alterados):
+        try:
+            total = self.registro.atualizar(alterados)
+            if total:
+                print(f"Tabelas atualizadas ({total}): {', '.join(sorted(alterados))}")
+        except Exception as e:
+            print(f"Erro ao atualizar tabelas alteradas: {str(e)}")
+
+
+vigia = VigiaTabelas()